@@ -1,7 +1,17 @@
 import argparse
+import sys
+from functools import partial
 from threading import Thread
+from typing import Callable
 
-from scrabble.engine import ClientEngine, ReplayEngine, ServerEngine
+from scrabble.analysis import run_analysis
+from scrabble.engine import ClientEngine, ReplayEngine, ServerEngine, ShardedServerEngine
+from scrabble.loadtest import MoveKind, run_load_test
+from scrabble.storage import ArchiveCompression, Durability, EventStore, FileEventStore, SQLiteEventStore
+from scrabble.storage.file import DEFAULT_EVENTS_DIRECTORY
+from scrabble.storage.sqlite import DEFAULT_DATABASE_PATH
+from scrabble.transport import SlowConsumerPolicy
+from scrabble.verification import run_verification
 
 
 def init_parser():
@@ -11,6 +21,45 @@ def init_parser():
     server = subparsers.add_parser('host', help='Server part')
     server.add_argument('--port', type=str, help='Server port', default='5678')
     server.add_argument('--host', type=str, help='Server host', default=None)
+    server.add_argument('--storage', type=str, choices=['file', 'sqlite'], default='file', help='Events storage')
+    server.add_argument('--storage-path', type=str, default=None,
+                        help='Directory of events files or SQLite database file')
+    server.add_argument('--durability', type=str, choices=[durability.value for durability in Durability],
+                        default=Durability.EVENT.value,
+                        help='Sync events to the disk before publishing every commit ("event"), every commit interval '
+                             '("interval") or leave it to the OS ("os")')
+    server.add_argument('--commit-interval-ms', type=int, default=50,
+                        help='How long events are grouped before syncing with "interval" durability')
+    server.add_argument('--idle-timeout-min', type=int, default=60,
+                        help='Games without players are archived and dropped from memory once idle for that long')
+    server.add_argument('--archive-compression', type=str, default=ArchiveCompression.LZMA.value,
+                        choices=[compression.value for compression in ArchiveCompression],
+                        help='Compression of archived games')
+    server.add_argument('--max-games', type=int, default=None,
+                        help='Most games kept in memory, the least recently active ones without players are evicted '
+                             'and loaded again once a player connects')
+    server.add_argument('--max-resident-events', type=int, default=None,
+                        help='Most events of all games kept in memory')
+    server.add_argument('--send-queue-size', type=int, default=1000,
+                        help='Most messages queued to a single player connection')
+    server.add_argument('--slow-consumer-policy', type=str, default=SlowConsumerPolicy.DROP_PRESENCE.value,
+                        choices=[policy.value for policy in SlowConsumerPolicy],
+                        help='Once the queue of a connection is full, drop the oldest presence message '
+                             '("drop-presence"), keep only the latest presence message of every player ("coalesce") '
+                             'or disconnect ("disconnect"); the connection is closed if nothing can be dropped')
+    server.add_argument('--ping-interval', type=float, default=5.0,
+                        help='Seconds without messages from a player before it is pinged')
+    server.add_argument('--ping-timeout', type=float, default=5.0,
+                        help='Seconds to wait for the pong before the player is disconnected')
+    server.add_argument('--max-msg-size', type=int, default=64 * 1024,
+                        help='Most characters of a message from a player, longer messages are dropped')
+    server.add_argument('--msg-rate', type=float, default=10.0,
+                        help='Messages a second allowed from a player on average, the rest are dropped')
+    server.add_argument('--msg-burst', type=int, default=20,
+                        help='Messages allowed from a player at once over the rate')
+    server.add_argument('--workers', type=int, default=1,
+                        help='Number of worker processes, games are split between them by ids and players connect '
+                             'to them through the router at the port (workers listen at the next ports)')
     server.set_defaults(mode='host')
 
     client = subparsers.add_parser('player', help='Player part')
@@ -18,6 +67,7 @@ def init_parser():
     client.add_argument('game_id', type=int, help='Game ID')
     client.add_argument('host', type=str, help='Host address or IP to connect')
     client.add_argument('port', type=int, help='Host port to connect')
+    client.add_argument('--spectate', action='store_true', help='Watch the game without playing it')
     client.set_defaults(mode='player')
 
     tester = subparsers.add_parser('replay', help='Replay game events')
@@ -27,6 +77,40 @@ def init_parser():
     tester.add_argument('--player', type=str, default='__tester__', help='Player of the game')
     tester.set_defaults(mode='replay')
 
+    analyze = subparsers.add_parser('analyze', help='Collect statistics of archived games')
+    analyze.add_argument('directory', type=str, help='Directory with game events files')
+    analyze.add_argument('--format', type=str, choices=['csv', 'json'], default='csv', help='Statistics format')
+    analyze.add_argument('--output', type=str, default=None, help='File for per-game statistics (stdout by default)')
+    analyze.add_argument('--summary', type=str, default=None,
+                         help='File for aggregate statistics (stderr by default)')
+    analyze.add_argument('--jobs', type=int, default=None, help='Number of processes (number of CPUs by default)')
+    analyze.set_defaults(mode='analyze')
+
+    verify = subparsers.add_parser('verify', help='Check integrity of archived games')
+    verify.add_argument('directory', type=str, help='Directory with game events files')
+    verify.add_argument('--quarantine', type=str, default=None, help='Directory to move broken games to')
+    verify.add_argument('--jobs', type=int, default=None, help='Number of processes (number of CPUs by default)')
+    verify.set_defaults(mode='verify')
+
+    loadtest = subparsers.add_parser('loadtest', help='Measure a local server under synthetic load')
+    loadtest.add_argument('--games', type=int, default=10, help='Number of games')
+    loadtest.add_argument('--players', type=int, default=2, help='Number of players of every game')
+    loadtest.add_argument('--spectators', type=int, default=0, help='Number of spectators of every game')
+    loadtest.add_argument('--move-rate', type=float, default=1.0, help='Moves a second in every game')
+    loadtest.add_argument('--duration', type=float, default=30.0, help='Seconds to play the moves for')
+    loadtest.add_argument('--moves', type=str, choices=[kind.value for kind in MoveKind], default=MoveKind.RANDOM.value,
+                          help='Place random letters next to the board letters ("random") or pass every move ("pass")')
+    loadtest.add_argument('--seed', type=int, default=None, help='Seed of the random moves')
+    loadtest.add_argument('--durability', type=str, choices=[durability.value for durability in Durability],
+                          default=Durability.EVENT.value, help='Durability of the server events')
+    loadtest.add_argument('--storage-path', type=str, default=None,
+                          help='Directory to keep the server events files of every run in (a new subdirectory '
+                               'of it per run, temporary directory by default)')
+    loadtest.add_argument('--port', type=int, default=None, help='Server port (a free port by default)')
+    loadtest.add_argument('--jobs', type=int, default=None,
+                          help='Number of processes playing the games (number of CPUs but one by default)')
+    loadtest.set_defaults(mode='loadtest')
+
     return parser
 
 
@@ -35,10 +119,33 @@ if __name__ == '__main__':
     args = parser.parse_args()
 
     if args.mode == 'host':
-        server_engine = ServerEngine()
-        server_engine.run_with_cmd(host=args.host, port=args.port)
+        store_factory: Callable[[], EventStore]
+        if args.storage == 'sqlite':
+            store_factory = partial(SQLiteEventStore, args.storage_path or DEFAULT_DATABASE_PATH)
+        else:
+            store_factory = partial(FileEventStore, args.storage_path or DEFAULT_EVENTS_DIRECTORY)
+
+        engine_kwargs = dict(durability=Durability(args.durability),
+                             commit_interval=args.commit_interval_ms / 1000,
+                             idle_timeout=args.idle_timeout_min * 60,
+                             archive_compression=ArchiveCompression(args.archive_compression),
+                             max_resident_games=args.max_games,
+                             max_resident_events=args.max_resident_events,
+                             send_queue_size=args.send_queue_size,
+                             slow_consumer_policy=SlowConsumerPolicy(args.slow_consumer_policy),
+                             ping_interval=args.ping_interval,
+                             ping_timeout=args.ping_timeout,
+                             max_msg_size=args.max_msg_size,
+                             msg_rate=args.msg_rate,
+                             msg_burst=args.msg_burst)
+        if args.workers > 1:
+            sharded_engine = ShardedServerEngine(store_factory, args.workers, engine_kwargs)
+            sharded_engine.run_with_cmd(host=args.host, port=int(args.port))
+        else:
+            server_engine = ServerEngine(store_factory(), **engine_kwargs)
+            server_engine.run_with_cmd(host=args.host, port=args.port)
     elif args.mode == 'player':
-        client_engine = ClientEngine(args.username, args.game_id)
+        client_engine = ClientEngine(args.username, args.game_id, spectator=args.spectate)
 
         t = Thread(target=client_engine.run, args=(args.host, args.port))
         t.start()
@@ -51,3 +158,17 @@ if __name__ == '__main__':
         t = Thread(target=replay_engine.run)
         t.start()
         t.join()
+
+    elif args.mode == 'analyze':
+        run_analysis(args.directory, fmt=args.format, output_path=args.output,
+                     summary_path=args.summary, jobs=args.jobs)
+
+    elif args.mode == 'verify':
+        failed = run_verification(args.directory, quarantine_directory=args.quarantine, jobs=args.jobs)
+        sys.exit(1 if failed else 0)
+
+    elif args.mode == 'loadtest':
+        run_load_test(games=args.games, players=args.players, spectators=args.spectators, move_rate=args.move_rate,
+                      duration=args.duration, moves=MoveKind(args.moves), seed=args.seed,
+                      durability=Durability(args.durability), storage_path=args.storage_path, port=args.port,
+                      jobs=args.jobs)
@@ -0,0 +1,245 @@
+import csv
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field, fields
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, TextIO, TypeVar
+
+from scrabble.game import GameState
+from scrabble.game.api import GameInitEvent, PlayerAddLettersEvent, PlayerMoveEvent
+from scrabble.storage import read_events
+from scrabble.storage.file import EVENTS_FILE_SUFFIXES
+
+__all__ = [
+    'GameStats',
+    'AnalysisSummary',
+    'find_events_files',
+    'map_files',
+    'analyze_events_file',
+    'analyze_directory',
+    'summarize',
+    'write_stats_csv',
+    'write_stats_json',
+    'write_summary',
+    'run_analysis',
+]
+
+# framed logs, archives, JSON arrays and JSON lines logs are supported
+EVENTS_FILE_PATTERNS = tuple(f'*{suffix}' for suffix in EVENTS_FILE_SUFFIXES)
+
+T = TypeVar('T')
+
+
+@dataclass
+class GameStats:
+    file_path: str
+    game_id: Optional[int] = field(default=None)
+    events: int = field(default=0)
+    moves: int = field(default=0)
+    # moves without placed letters, including exchanges
+    passes: int = field(default=0)
+    exchanges: int = field(default=0)
+    words: int = field(default=0)
+    words_letters: int = field(default=0)
+    bonuses: int = field(default=0)
+    bonuses_used: int = field(default=0)
+    letters_drawn: int = field(default=0)
+    scores: Dict[str, int] = field(default_factory=dict)
+    winner: Optional[str] = field(default=None)
+    error: Optional[str] = field(default=None)
+
+    @property
+    def average_word_length(self) -> float:
+        return self.words_letters / self.words if self.words else 0.0
+
+
+@dataclass
+class AnalysisSummary:
+    games: int = field(default=0)
+    failed_games: int = field(default=0)
+    events: int = field(default=0)
+    moves: int = field(default=0)
+    passes: int = field(default=0)
+    exchanges: int = field(default=0)
+    words: int = field(default=0)
+    average_word_length: float = field(default=0.0)
+    average_moves_per_game: float = field(default=0.0)
+    average_score: float = field(default=0.0)
+    max_score: int = field(default=0)
+    bonuses: int = field(default=0)
+    bonuses_used: int = field(default=0)
+    letters_drawn: int = field(default=0)
+
+
+def find_events_files(directory: str) -> List[str]:
+    return sorted({
+        str(file_path)
+        for pattern in EVENTS_FILE_PATTERNS
+        for file_path in Path(directory).rglob(pattern)
+        if file_path.is_file()
+    })
+
+
+def analyze_events_file(file_path: str) -> GameStats:
+    """Replay the game headlessly and collect its statistics. Errors are reported in the stats instead of raising."""
+    stats = GameStats(file_path=file_path)
+    game_state: Optional[GameState] = None
+
+    try:
+        for event in read_events(file_path):
+            if game_state is None:
+                stats.game_id = event.game_id
+                game_state = GameState(event.game_id)
+
+            if isinstance(event, PlayerMoveEvent):
+                words_count = len(game_state.board.words)
+                game_state.apply_event(event)
+                new_words = game_state.board.words[words_count:]
+
+                stats.moves += 1
+                stats.words += len(new_words)
+                stats.words_letters += sum(len(word.word) for word in new_words)
+                if not new_words:
+                    stats.passes += 1
+                if event.params.exchange_letters:
+                    stats.exchanges += 1
+            else:
+                game_state.apply_event(event)
+
+                if isinstance(event, GameInitEvent):
+                    stats.bonuses = len(event.params.board_settings.bonuses)
+                elif isinstance(event, PlayerAddLettersEvent):
+                    stats.letters_drawn += len(event.params.letters)
+
+            stats.events += 1
+    except Exception as e:
+        stats.error = f'{type(e).__name__}: {e}'
+
+    if game_state is not None and game_state.language is not None:
+        stats.bonuses_used = stats.bonuses - len(game_state.board.snapshot().bonuses)
+        stats.scores = {player.username: player.score for player in game_state.players}
+        if stats.scores:
+            stats.winner = max(stats.scores, key=lambda username: stats.scores[username])
+
+    return stats
+
+
+def map_files(func: Callable[[str], T], file_paths: Sequence[str], jobs: Optional[int] = None) -> Iterator[T]:
+    """Call `func` for every file in `jobs` processes (number of CPUs by default), yielding in the files order."""
+    if not file_paths:
+        return
+
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1:
+        yield from map(func, file_paths)
+        return
+
+    chunksize = max(1, min(64, len(file_paths) // (jobs * 4)))
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        yield from executor.map(func, file_paths, chunksize=chunksize)
+
+
+def analyze_directory(directory: str, jobs: Optional[int] = None) -> Iterator[GameStats]:
+    """Analyze all the events files of the directory (recursively) in parallel."""
+    return map_files(analyze_events_file, find_events_files(directory), jobs=jobs)
+
+
+def summarize(games_stats: Iterable[GameStats]) -> AnalysisSummary:
+    summary = AnalysisSummary()
+    words_letters = 0
+    scores_count = 0
+    scores_sum = 0
+
+    for stats in games_stats:
+        summary.games += 1
+        if stats.error is not None:
+            summary.failed_games += 1
+
+        summary.events += stats.events
+        summary.moves += stats.moves
+        summary.passes += stats.passes
+        summary.exchanges += stats.exchanges
+        summary.words += stats.words
+        summary.bonuses += stats.bonuses
+        summary.bonuses_used += stats.bonuses_used
+        summary.letters_drawn += stats.letters_drawn
+        words_letters += stats.words_letters
+
+        for score in stats.scores.values():
+            scores_count += 1
+            scores_sum += score
+            summary.max_score = max(summary.max_score, score)
+
+    if summary.words:
+        summary.average_word_length = words_letters / summary.words
+    if summary.games:
+        summary.average_moves_per_game = summary.moves / summary.games
+    if scores_count:
+        summary.average_score = scores_sum / scores_count
+
+    return summary
+
+
+def _stats_row(stats: GameStats) -> Dict[str, Any]:
+    row = asdict(stats)
+    row['average_word_length'] = round(stats.average_word_length, 3)
+    return row
+
+
+def write_stats_csv(fout: TextIO, games_stats: Iterable[GameStats]) -> None:
+    fieldnames = [f.name for f in fields(GameStats)] + ['average_word_length']
+    writer = csv.DictWriter(fout, fieldnames=fieldnames)
+    writer.writeheader()
+
+    for stats in games_stats:
+        row = _stats_row(stats)
+        row['scores'] = ';'.join(f'{username}:{score}' for username, score in stats.scores.items())
+        writer.writerow(row)
+
+
+def write_stats_json(fout: TextIO, games_stats: Iterable[GameStats]) -> None:
+    json.dump([_stats_row(stats) for stats in games_stats], fout, indent=2)
+
+
+def write_summary(fout: TextIO, summary: AnalysisSummary, fmt: str = 'csv') -> None:
+    row = asdict(summary)
+    row['average_word_length'] = round(summary.average_word_length, 3)
+    row['average_moves_per_game'] = round(summary.average_moves_per_game, 3)
+    row['average_score'] = round(summary.average_score, 3)
+
+    if fmt == 'json':
+        json.dump(row, fout, indent=2)
+    elif fmt == 'csv':
+        writer = csv.DictWriter(fout, fieldnames=list(row))
+        writer.writeheader()
+        writer.writerow(row)
+    else:
+        raise ValueError(f'Unknown format "{fmt}"')
+
+
+def run_analysis(directory: str, fmt: str = 'csv', output_path: Optional[str] = None,
+                 summary_path: Optional[str] = None, jobs: Optional[int] = None) -> AnalysisSummary:
+    """Write per-game statistics to `output_path` (stdout by default) and aggregate ones to `summary_path`
+    (stderr by default)."""
+    if fmt not in ('csv', 'json'):
+        raise ValueError(f'Unknown format "{fmt}"')
+
+    games_stats = list(analyze_directory(directory, jobs=jobs))
+    summary = summarize(games_stats)
+
+    write_stats = write_stats_json if fmt == 'json' else write_stats_csv
+    if output_path is None:
+        write_stats(sys.stdout, games_stats)
+    else:
+        with open(output_path, 'w', newline='') as fout:
+            write_stats(fout, games_stats)
+
+    if summary_path is None:
+        write_summary(sys.stderr, summary, fmt)
+    else:
+        with open(summary_path, 'w', newline='') as fout:
+            write_summary(fout, summary, fmt)
+
+    return summary
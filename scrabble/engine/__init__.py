@@ -1,3 +1,4 @@
 from .client import *  # noqa
 from .replay import *  # noqa
 from .server import *  # noqa
+from .sharded import *  # noqa
@@ -2,16 +2,18 @@ import asyncio
 import curses
 import logging
 import logging.config
+from copy import deepcopy
 from threading import Thread
-from typing import Iterable, List, Tuple, cast
+from typing import Iterable, List, Optional, Tuple, cast
+from uuid import uuid4
 
-from scrabble.game import BoardWord, BoardWords, GameState, WordDirection
+from scrabble.game import BoardWord, BoardWords, GameState, GameStateSnapshot, WordDirection
 from scrabble.game.api import (Event, GameInitEvent, GameStartEvent, PlayerAddLettersEvent, PlayerMoveEvent,
                                PlayerMoveParams)
 from scrabble.gui.window import CallbackConfig, Window
 from scrabble.settings import CLIENT_LOGGING_CONFIG
 from scrabble.transport import (Client, EndConnectionMessage, EventMessage, EventMessagePayload, EventStatus,
-                                NewConnectionMessage, WebsocketMessage)
+                                NewConnectionMessage, PresenceMessage, SnapshotMessage, WebsocketMessage)
 
 __all__ = [
     'ClientEngine',
@@ -20,29 +22,56 @@ __all__ = [
 
 class ClientEngine:
 
-    def __init__(self, player: str, game_id: int) -> None:
+    def __init__(self, player: str, game_id: int, spectator: bool = False) -> None:
         logging.config.dictConfig(CLIENT_LOGGING_CONFIG)
         self._logger = logging.getLogger()
 
-        self._events: List[Event] = []
+        # state of the approved events (spectators start from the snapshot of the game), the move of the player
+        # is tried on a copy of it and is pending until the server approves or rejects it
+        self._state = GameState(game_id)
+        self._pending_move: Optional[PlayerMoveEvent] = None
+        # the pending move is sent again with the same request id on reconnecting, the server answers a retry of
+        # a processed request with its original outcome instead of processing it again
+        self._pending_request_id: Optional[str] = None
+        # sequence of the latest event sent by the server on reconnecting: the events up to it may answer the pending
+        # move, so it is sent again only once they are applied and it is still pending
+        self._catch_up_sequence: Optional[int] = None
         self._player = player
-        self._players: List[str] = []
         self._game_id = game_id
-        self._window = Window(player, CallbackConfig(on_player_move=self._on_player_move))
+        # spectators only watch the game, the window does not let them compose moves
+        self._window = Window(player, CallbackConfig(on_player_move=None if spectator else self._on_player_move))
 
         self._client = Client(player, game_id, on_new_msg=self._on_client_msg,
-                              on_connected=self._on_server_connected, on_disconnected=self._on_server_disconnected)
+                              on_connected=self._on_server_connected, on_disconnected=self._on_server_disconnected,
+                              on_authorized=self._on_server_authorized, get_last_sequence=self._get_last_sequence,
+                              spectator=spectator)
 
     @property
     def game_state(self) -> GameState:
-        return GameState(self._game_id, events=self._events)
+        return self._state
+
+    def _get_last_sequence(self) -> int:
+        return self._state.latest_event_sequence
 
     def _on_server_connected(self) -> None:
         self._window.player_connected(self._player)
 
     def _on_server_disconnected(self) -> None:
-        for player in self._players:
-            self._window.player_disconnected(player)
+        self._catch_up_sequence = None
+        self._window.set_presence([], 0)
+
+    def _on_server_authorized(self, latest_sequence: Optional[int]) -> None:
+        self._catch_up_sequence = latest_sequence or 0
+        self._resend_pending_move()
+
+    def _resend_pending_move(self) -> None:
+        if self._catch_up_sequence is None or self._state.latest_event_sequence < self._catch_up_sequence:
+            return
+
+        self._catch_up_sequence = None
+        pending_move = self._pending_move
+        if pending_move is not None:
+            self.send_event(pending_move, self._pending_request_id)
 
     def _on_player_move(self, words: Iterable[Tuple[int, int, str, str]], exchange_letters: List[str]) -> None:
         event_words = BoardWords()
@@ -52,26 +81,31 @@ class ClientEngine:
                                            direction=WordDirection.RIGHT
                                            if player_word[3] == 'right' else WordDirection.DOWN))
 
+        game_state = deepcopy(self._state)
+        # the server derives the formed words from the placed tiles
         event = PlayerMoveEvent(params=PlayerMoveParams(player=self._player,
-                                                        words=event_words,
+                                                        tiles=game_state.board.get_tiles_to_insert_words(event_words),
                                                         exchange_letters=exchange_letters),
-                                sequence=self.game_state.latest_event_sequence + 1,
-                                game_id=self.game_state.game_id)
+                                sequence=game_state.latest_event_sequence + 1,
+                                game_id=game_state.game_id)
 
         try:
             self._logger.debug(f'Applying event: {event}')
-            self.game_state.apply_event(event)
+            game_state.apply_event(event)
         except Exception:
             self._window.cancel_move()
             self._logger.exception(f'Error on applying event {event}')
         else:
-            self.send_event(event)
+            self._pending_move = event
+            self._pending_request_id = uuid4().hex
+            self.send_event(event, self._pending_request_id)
 
-    def send_event(self, event: Event) -> None:
-        self._client_loop.create_task(self._send(event))
+    def send_event(self, event: Event, request_id: Optional[str] = None) -> None:
+        self._client_loop.create_task(self._send(event, request_id))
 
-    async def _send(self, event: Event) -> None:
-        msg = EventMessage(payload=EventMessagePayload(event=event), status=EventStatus.REQUESTED)
+    async def _send(self, event: Event, request_id: Optional[str] = None) -> None:
+        msg = EventMessage(payload=EventMessagePayload(event=event, request_id=request_id),
+                           status=EventStatus.REQUESTED)
         await self._client.send(msg)
 
     def _run_gui(self) -> None:
@@ -94,26 +128,60 @@ class ClientEngine:
             self._window.player_connected(msg.payload.username)
         elif isinstance(msg, EndConnectionMessage):
             self._window.player_disconnected(msg.payload.username)
+        elif isinstance(msg, SnapshotMessage):
+            self._apply_snapshot(msg.payload.snapshot)
+        elif isinstance(msg, PresenceMessage):
+            self._window.set_presence(msg.payload.connected, msg.payload.spectators)
+
+    def _apply_snapshot(self, snapshot: GameStateSnapshot) -> None:
+        if snapshot.game_id != self._game_id or snapshot.sequence <= self.game_state.latest_event_sequence:
+            return
+
+        self._state = GameState.from_snapshot(snapshot)
+        self._gui_apply_state(self.game_state)
+        self._resend_pending_move()
 
     def _apply_event(self, event: Event) -> None:
         try:
-            self.game_state.apply_event(event)
+            self._state.apply_event(event)
         except Exception:
             self._logger.exception(f'Error applying event {event}')
         else:
-            self._events.append(event)
+            if self._is_pending_move(event):
+                self._pending_move = None
+                self._pending_request_id = None
             self._gui_apply_event(event)
+            self._resend_pending_move()
 
     def handle_game_event(self, event_msg: EventMessage) -> None:
-        if event_msg.status == EventStatus.APPROVED:
-            event = event_msg.payload.event
+        event = event_msg.payload.event
 
+        if event_msg.status == EventStatus.APPROVED:
             if event.game_id != self.game_state.game_id:
                 raise RuntimeError('Game ID is different')
             if event.sequence <= self.game_state.latest_event_sequence:
                 return
 
             self._apply_event(event)
+        elif event_msg.status == EventStatus.REJECTED:
+            self._logger.warning(f'Event {event} rejected: {event_msg.payload.reason} '
+                                 f'(latest sequence {event_msg.payload.latest_sequence})')
+            if self._is_pending_move(event):
+                self._rollback_move()
+
+    def _is_pending_move(self, event: Event) -> bool:
+        # the server fills in the words of the move, so the move is matched by its sequence and player
+        pending = self._pending_move
+        return pending is not None and isinstance(event, PlayerMoveEvent) and \
+            event.sequence == pending.sequence and event.params.player == pending.params.player
+
+    def _rollback_move(self) -> None:
+        """Drop the rejected move: the approved state is untouched by it, only the window is reset."""
+        self._pending_move = None
+        self._pending_request_id = None
+
+        self._window.cancel_move()
+        self._window.update_player_letters(self._state.get_player_state(self._player).letters)
 
     def _gui_apply_event(self, event: Event) -> None:
         if isinstance(event, GameInitEvent):
@@ -127,12 +195,33 @@ class ClientEngine:
         else:
             raise ValueError(f'Unknown event {event}')
 
+    def _gui_apply_state(self, game_state: GameState) -> None:
+        if game_state.language is None:
+            # the game is not initialized yet
+            return
+
+        self._window.set_language(game_state.language)
+
+        for player in game_state.players:
+            self._window.add_player(player.username)
+            self._window.update_player_score(player.username, player.score)
+
+        board = game_state.board
+        for bonus in board.settings.bonuses:
+            self._window.add_bonus(bonus.location_x, bonus.location_y, bonus.multiplier)
+        self._window.set_grid_words([
+            (word.start_x, word.start_y, word.word, word.direction.value)
+            for word in board.words
+        ])
+
+        if game_state.player_to_move is not None:
+            self._window.set_player_turn(game_state.player_to_move)
+
     def _gui_apply__game_init(self, event: GameInitEvent) -> None:
         self._window.set_language(event.params.lang)
 
         for player in event.params.players:
             self._window.add_player(player)
-            self._players.append(player)
 
         init_word = event.params.board_settings.init_word
         if init_word is not None:
@@ -156,9 +245,10 @@ class ClientEngine:
             self._window.update_player_letters(self.game_state.get_player_state(self._player).letters)
 
     def _gui_apply__player_move(self, event: PlayerMoveEvent) -> None:
+        # the words of tile-based moves are derived by the game state, cross words included
         added_words = [
             (word.start_x, word.start_y, word.word, word.direction.value)
-            for word in event.params.words
+            for word in self.game_state.last_move_words
         ]
         self._window.add_grid_words(added_words)
 
@@ -1,66 +1,13 @@
-LETTERS_DISTRIBUTION = {
-    'ru': {
-        # a bit modified from https://ru.wikipedia.org/wiki/%D0%A7%D0%B0%D1%81%D1%82%D0%BE%D1%82%D0%BD%D0%BE%D1%81%D1%82%D1%8C  # noqa
-        'а': 80,
-        'б': 16,
-        'в': 45,
-        'г': 17,
-        'д': 30,
-        'е': 85,
-        'ж': 10,
-        'з': 17,
-        'и': 74,
-        'й': 12,
-        'к': 35,
-        'л': 44,
-        'м': 32,
-        'н': 67,
-        'о': 110,
-        'п': 28,
-        'р': 47,
-        'с': 55,
-        'т': 63,
-        'у': 26,
-        'ф': 3,
-        'х': 10,
-        'ц': 5,
-        'ч': 15,
-        'ш': 7,
-        'щ': 4,
-        'ъ': 1,
-        'ы': 19,
-        'ь': 17,
-        'э': 3,
-        'ю': 7,
-        'я': 20,
-    },
-    'en': {
-        # a bit modified from https://en.wikipedia.org/wiki/Letter_frequency
-        'a': 85,
-        'b': 15,
-        'c': 22,
-        'd': 43,
-        'e': 112,
-        'f': 22,
-        'g': 20,
-        'h': 61,
-        'i': 75,
-        'j': 20,
-        'k': 13,
-        'l': 40,
-        'm': 24,
-        'n': 67,
-        'o': 75,
-        'p': 19,
-        'q': 10,
-        'r': 76,
-        's': 63,
-        't': 93,
-        'u': 28,
-        'v': 10,
-        'w': 26,
-        'x': 20,
-        'y': 20,
-        'z': 10,
-    },
-}
+from scrabble.game.constants import LETTERS_DISTRIBUTION  # noqa
+
+# game state is snapshotted every this number of events, so loading a game replays at most that many events
+SNAPSHOT_EVENTS_INTERVAL = 50
+
+# loaded games without connected players are archived and dropped from memory once finished
+# or idle for this number of seconds
+GAME_IDLE_TIMEOUT = 60 * 60
+# seconds between checks for games to archive
+COMPACTION_INTERVAL = 5 * 60
+
+# outcomes of this number of the latest requests of every game are kept to answer the retried requests
+REQUEST_DEDUPE_WINDOW = 100
@@ -1,15 +1,15 @@
 import curses
-import json
 import logging
 import logging.config
-from threading import Thread
+import os
+from threading import RLock, Thread
 from typing import List, Optional, cast
 
-from scrabble.game import GameState
+from scrabble.game import GameState, GameStateSnapshot, GameTimeline
 from scrabble.game.api import Event, GameInitEvent, GameStartEvent, PlayerAddLettersEvent, PlayerMoveEvent
 from scrabble.gui.window import CallbackConfig, Window
-from scrabble.serializers.game.api import EventSchema
 from scrabble.settings import REPLAY_LOGGING_CONFIG
+from scrabble.storage import find_snapshot, get_snapshots_file_path, load_snapshots, read_events
 
 __all__ = [
     'ReplayEngine',
@@ -27,34 +27,107 @@ class ReplayEngine:
         self._player = player
         self._sequence = sequence
 
-        self._window = Window(self._player, CallbackConfig(on_player_move=self._on_player_move))
+        callback_config = CallbackConfig(on_player_move=self._on_player_move,
+                                         on_replay_step=self._on_replay_step,
+                                         on_replay_seek=self._on_replay_seek)
+        self._window = Window(self._player, callback_config)
         self._file_events: List[Event] = []
-        self._events: List[Event] = []
+        self._timeline = GameTimeline(self._game_id, [])
+        # events are read in the background, while the window keys may seek at the same time
+        self._lock = RLock()
+        # the replay moves to the newly read events until the player seeks on their own
+        self._follow_loading = True
+        # the state at the requested sequence is drawn before the timeline reaches it
+        self._previewing = False
 
     @property
     def game_state(self) -> GameState:
-        return GameState(self._game_id, events=self._events)
+        return self._timeline.state
 
     def _on_player_move(self, *args, **kwargs) -> None:
         ...
 
-    def _apply_event(self, event: Event) -> None:
+    def _on_replay_step(self, step: int) -> None:
+        with self._lock:
+            self._follow_loading = False
+            self._previewing = False
+            self._seek(self._timeline.sequence + step)
+
+    def _on_replay_seek(self, sequence: int) -> None:
+        with self._lock:
+            self._follow_loading = False
+            self._previewing = False
+            self._seek(sequence)
+
+    def _seek(self, sequence: int) -> None:
+        previous_sequence = self._timeline.sequence
         try:
-            self.game_state.apply_event(event)
+            self._timeline.seek(sequence)
         except Exception:
-            self._logger.exception(f'Error applying event {event}')
-        else:
-            self._events.append(event)
-            self._gui_apply_event(event)
+            self._logger.exception(f'Error seeking to event {sequence}')
+
+        if self._timeline.sequence == previous_sequence + 1:
+            # a single step forward is drawn incrementally to highlight the recent changes
+            self._gui_apply_event(self._file_events[previous_sequence])
+        elif self._timeline.sequence != previous_sequence:
+            self._window.reset()
+            self._gui_apply_state()
+
+        self._window.set_replay_position(self._timeline.sequence, self._timeline.last_sequence)
+
+    def _load_snapshots(self) -> List[GameStateSnapshot]:
+        try:
+            return load_snapshots(get_snapshots_file_path(self._events_filepath))
+        except Exception:
+            self._logger.exception('Error loading snapshots')
+            return []
+
+    def _preview(self, sequence: int, snapshots: List[GameStateSnapshot]) -> None:
+        """Draw the state at the sequence from the latest snapshot before it and the events after the snapshot,
+        which are read by the log index without decoding the events before."""
+        snapshot = find_snapshot(snapshots, sequence)
+        if snapshot is None or snapshot.game_id != self._game_id:
+            return
+
+        try:
+            game_state = GameState.from_snapshot(snapshot)
+            for event in read_events(self._events_filepath, after_sequence=snapshot.sequence, until_sequence=sequence):
+                game_state.apply_event(event)
+        except Exception:
+            self._logger.exception(f'Error previewing event {sequence}')
+            return
+
+        with self._lock:
+            self._gui_apply_state(game_state)
+            self._window.set_replay_position(game_state.latest_event_sequence, game_state.latest_event_sequence)
+            # the timeline takes over once it reaches the sequence
+            self._follow_loading = False
+            self._previewing = True
 
     def _load_events(self, events_filepath: str) -> None:
         try:
-            with open(events_filepath, 'r') as fin:
-                serialized_events = json.load(fin)
-                self._file_events = [EventSchema().load(event) for event in serialized_events]
+            for event in read_events(events_filepath):
+                with self._lock:
+                    self._file_events.append(event)
+                    self._timeline.add_event(event)
+
+                    if self._previewing and event.sequence == self._sequence:
+                        self._previewing = False
+                        self._seek(event.sequence)
+                    elif self._follow_loading and (self._sequence is None or event.sequence <= self._sequence):
+                        self._seek(self._timeline.last_sequence)
+                        # stop at the broken event
+                        self._follow_loading = self._timeline.sequence == self._timeline.last_sequence
+                    elif not self._previewing:
+                        self._window.set_replay_position(self._timeline.sequence, self._timeline.last_sequence)
+        except Exception:
+            self._logger.exception('Error loading events')
 
-        except FileNotFoundError:
-            raise RuntimeError('Cannot find the game')
+        with self._lock:
+            if self._previewing:
+                # the requested sequence is past the read events
+                self._previewing = False
+                self._seek(self._timeline.last_sequence)
 
     def _run_gui(self) -> None:
         curses.wrapper(self._window.run)
@@ -71,6 +144,31 @@ class ReplayEngine:
         else:
             raise ValueError(f'Unknown event {event}')
 
+    def _gui_apply_state(self, game_state: Optional[GameState] = None) -> None:
+        game_state = game_state or self.game_state
+        if game_state.language is None:
+            # the game is not initialized yet
+            return
+
+        self._window.set_language(game_state.language)
+
+        for player in game_state.players:
+            self._window.add_player(player.username)
+            self._window.update_player_score(player.username, player.score)
+
+        board = game_state.board
+        for bonus in board.settings.bonuses:
+            self._window.add_bonus(bonus.location_x, bonus.location_y, bonus.multiplier)
+        self._window.set_grid_words([
+            (word.start_x, word.start_y, word.word, word.direction.value)
+            for word in board.words
+        ])
+
+        if self._player in {player.username for player in game_state.players}:
+            self._window.update_player_letters(game_state.get_player_state(self._player).letters)
+        if game_state.player_to_move is not None:
+            self._window.set_player_turn(game_state.player_to_move)
+
     def _gui_apply__game_init(self, event: GameInitEvent) -> None:
         self._window.set_language(event.params.lang)
 
@@ -94,9 +192,10 @@ class ReplayEngine:
             self._window.update_player_letters(self.game_state.get_player_state(self._player).letters)
 
     def _gui_apply__player_move(self, event: PlayerMoveEvent) -> None:
+        # the words of tile-based moves are derived by the game state, cross words included
         added_words = [
             (word.start_x, word.start_y, word.word, word.direction.value)
-            for word in event.params.words
+            for word in self.game_state.last_move_words
         ]
         self._window.add_grid_words(added_words)
 
@@ -105,13 +204,19 @@ class ReplayEngine:
         self._window.set_player_turn(cast(str, self.game_state.player_to_move))
 
     def run(self) -> None:
-        gui_thread = Thread(target=self._run_gui)
+        if not os.path.exists(self._events_filepath):
+            raise RuntimeError('Cannot find the game')
 
+        snapshots = self._load_snapshots()
+        self._timeline = GameTimeline(self._game_id, [], snapshots=snapshots)
+
+        gui_thread = Thread(target=self._run_gui)
         gui_thread.start()
 
+        if self._sequence is not None:
+            self._preview(self._sequence, snapshots)
+
+        # the events are drawn as soon as they are read
         self._load_events(self._events_filepath)
-        for event in self._file_events:
-            if self._sequence is None or event.sequence <= self._sequence:
-                self._apply_event(event)
 
         gui_thread.join()
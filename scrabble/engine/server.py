@@ -1,67 +1,149 @@
 import asyncio
-import json
 import logging
 import logging.config
-import random
+from concurrent.futures import Future
 from itertools import chain
-from pathlib import Path
 from threading import Thread
-from time import sleep
-from typing import List, MutableMapping, MutableSet, Optional
+from time import monotonic, sleep
+from typing import Any, Callable, List, MutableMapping, MutableSet, Optional, Tuple, Union
 
-from scrabble.game import BoardSettings, BoardWord, Bonus, GameState, LetterBag, WordDirection
+from scrabble.game import (BoardSettings, BoardWord, Bonus, GameState, GameStateSnapshot, LetterBag, WordDirection,
+                           get_alphabet)
 from scrabble.game.api import (Event, GameInitEvent, GameInitParams, GameStartEvent, GameStartParams,
                                PlayerAddLettersEvent, PlayerAddLettersParams, PlayerMoveEvent)
 from scrabble.game.constants import PLAYER_MAX_LETTERS
-from scrabble.serializers.game.api import EventSchema
 from scrabble.settings import SERVER_LOGGING_CONFIG
+from scrabble.storage import (ArchiveCompression, Durability, EventStore, FileEventStore, GroupCommitWriter,
+                              WriterMetrics, find_snapshot)
+from scrabble.storage.base import KEPT_SNAPSHOTS
 from scrabble.transport import (EventMessage, EventMessagePayload, EventStatus, PlayerConnectionID, Server,
-                                WebsocketMessage)
+                                SlowConsumerPolicy, SnapshotMessage, SnapshotPayload, WebsocketMessage)
 
-from .constants import LETTERS_DISTRIBUTION
+from .constants import (COMPACTION_INTERVAL, GAME_IDLE_TIMEOUT, LETTERS_DISTRIBUTION, REQUEST_DEDUPE_WINDOW,
+                        SNAPSHOT_EVENTS_INTERVAL)
 
 __all__ = [
     'ServerEngine',
 ]
 
+CMD_HELP = (
+    'new [game_id] - Initialize new game\n'
+    'start <game_id> <initial_word> [lang=en] - Start specified game '
+    'with initial word (without spaces) and use language <lang> (available "ru" and "en")\n'
+    'load <game_id> - Load and start specified game\n'
+    'disconnect <game_id> <player> - Disconnect specified player\n'
+    'stats - Show persistence, send queue, keepalive and inbound messages metrics\n'
+    'compact - Archive finished and idle games without players\n'
+)
+
 
 class ServerEngine:
 
-    def __init__(self) -> None:
+    def __init__(self, store: Optional[EventStore] = None, durability: Durability = Durability.EVENT,
+                 commit_interval: float = 0.05, idle_timeout: float = GAME_IDLE_TIMEOUT,
+                 archive_compression: ArchiveCompression = ArchiveCompression.LZMA,
+                 max_resident_games: Optional[int] = None, max_resident_events: Optional[int] = None,
+                 send_queue_size: int = 1000,
+                 slow_consumer_policy: SlowConsumerPolicy = SlowConsumerPolicy.DROP_PRESENCE,
+                 ping_interval: float = 5.0, ping_timeout: float = 5.0,
+                 max_msg_size: int = 64 * 1024, msg_rate: float = 10.0, msg_burst: int = 20) -> None:
         logging.config.dictConfig(SERVER_LOGGING_CONFIG)
         self._logger = logging.getLogger()
 
         self._players: MutableSet[PlayerConnectionID] = set()
+        # spectators receive the events of the game without playing it
+        self._spectators: MutableSet[PlayerConnectionID] = set()
         self._server = Server(on_new_conn=self._on_new_conn,
                               on_new_msg=self._on_new_msg,
-                              on_end_conn=self._on_end_conn)
-
+                              on_end_conn=self._on_end_conn,
+                              max_queue_size=send_queue_size,
+                              slow_consumer_policy=slow_consumer_policy,
+                              ping_interval=ping_interval,
+                              ping_timeout=ping_timeout,
+                              max_msg_size=max_msg_size,
+                              msg_rate=msg_rate,
+                              msg_burst=msg_burst)
+
+        self._store = store or FileEventStore()
         self._events: MutableMapping[int, List[Event]] = {}
+        self._states: MutableMapping[int, GameState] = {}
+        # events up to this number are written durably and can be published
+        self._durable_events: MutableMapping[int, int] = {}
+        # monotonic time of the latest event or connection of the game
+        self._last_activity: MutableMapping[int, float] = {}
+        # last activity of the evicted games which were never started, so not saved: they are initialized again on
+        # demand until they are idle for too long
+        self._evicted_new_games: MutableMapping[int, float] = {}
+        self._idle_timeout = idle_timeout
+        self._archive_compression = archive_compression
+        # budget of the games kept in memory, the least recently active ones are evicted to the store
+        self._max_resident_games = max_resident_games
+        self._max_resident_events = max_resident_events
+        # serialized snapshot message for the joining spectators of every game along with its sequence
+        self._spectator_snapshots: MutableMapping[int, Tuple[int, str]] = {}
+        # latest snapshots taken of every game, the spectators of the game replay the durable events from them
+        self._snapshots: MutableMapping[int, List[GameStateSnapshot]] = {}
+        # outcomes of the latest requests of every game by the player and the request id: the sequence of the approved
+        # event or the rejection answer
+        self._request_outcomes: MutableMapping[int, MutableMapping[Tuple[str, str], Union[int, EventMessage]]] = {}
+        self._loading_games: MutableMapping[int, 'asyncio.Future[Optional[Tuple[List[Event], GameState]]]'] = {}
+
+        # writes are committed by a background thread, so the event loop is not blocked on the disk
+        self._writer = GroupCommitWriter(self._store, durability=durability, interval=commit_interval)
+        self._writer.start()
+        self._server_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def writer_metrics(self) -> WriterMetrics:
+        return self._writer.metrics
 
     def get_game_state(self, game_id: int) -> GameState:
-        return GameState(game_id, events=self._events[game_id])
+        return self._states[game_id]
 
     def load_game(self, game_id: int) -> None:
-        self._events[game_id] = []
-
-        self._load_events(game_id)
+        loaded = self._read_game(game_id)
+        if loaded is None:
+            return
 
+        events, game_state = loaded
+        self._install_game(game_id, events, game_state)
         self._logger.info(f'Loaded game #{game_id}')
 
-    def init_new_game(self) -> int:
-        game_id = random.randint(1, 1000)
-        self._events[game_id] = []
+    def init_new_game(self, game_id: Optional[int] = None) -> int:
+        """Initialize the game with the id, a newly allocated one by default."""
+        if game_id is None:
+            game_id = self._store.allocate_game_id()
+            # games created with explicit ids are not saved until started, the store doesn't know them
+            while self._is_game_pending(game_id):
+                game_id = self._store.allocate_game_id()
+        elif self._is_game_pending(game_id) or self._store.game_exists(game_id):
+            raise RuntimeError('Game already exists')
+
+        self._install_game(game_id, [], GameState(game_id))
 
         return game_id
 
+    def _is_game_pending(self, game_id: int) -> bool:
+        """The game is resident, evicted while new or being loaded."""
+        return game_id in self._events or game_id in self._evicted_new_games or game_id in self._loading_games
+
     def start_game(self, game_id: int, initial_word: str, lang: str = 'en') -> None:
-        if game_id not in self._events:
+        if game_id not in self._events and not self._restore_new_game(game_id):
             raise RuntimeError('Game was not initialized')
 
         started = len(self._events[game_id]) > 0
         if started:
             raise RuntimeError('Game already started')
 
+        if lang not in LETTERS_DISTRIBUTION:
+            raise ValueError(f'Unknown language "{lang}"')
+        # the alphabets are lowercase, the board rejects any other letters
+        initial_word = initial_word.lower()
+        unknown_letters = sorted(set(initial_word) - set(get_alphabet(lang)))
+        if unknown_letters:
+            raise ValueError(f'Initial word "{initial_word}" has letters out of the "{lang}" alphabet: '
+                             f'{", ".join(unknown_letters)}')
+
         players = [
             username
             for username, player_game_id in self._players
@@ -130,147 +212,499 @@ class ServerEngine:
 
         if isinstance(msg, EventMessage):
             if msg.status == EventStatus.REQUESTED:
-                self._apply_event(game_id, msg.payload.event)
-
-                event = msg.payload.event
-                if isinstance(event, PlayerMoveEvent):
-                    player_username = event.params.player
-
-                    game_state = self.get_game_state(game_id)
-                    player_state = game_state.get_player_state(player_username)
-
-                    need_letters_count = PLAYER_MAX_LETTERS - len(player_state.letters)
-                    new_letters = game_state.letters[:need_letters_count]
-                    if new_letters:
-                        add_letters_event = PlayerAddLettersEvent(
-                            params=PlayerAddLettersParams(player=player_username, letters=new_letters),
-                            sequence=game_state.latest_event_sequence + 1,
-                            game_id=game_id,
-                        )
-                        self._apply_event(game_id, add_letters_event)
+                self._on_event_request(player_id, msg.payload.event, msg.payload.request_id)
 
-    def _on_new_conn(self, player_id: PlayerConnectionID) -> None:
+    def _on_event_request(self, player_id: PlayerConnectionID, event: Event, request_id: Optional[str] = None) -> None:
+        """Every requested event is either approved (published to all the players once durable) or rejected
+        to the requesting player right away. Retried requests are answered with the original outcome."""
         username, game_id = player_id
+        game_state = self.get_game_state(game_id)
+
+        if request_id is not None:
+            outcome = self._request_outcomes.get(game_id, {}).get((username, request_id))
+            if outcome is not None:
+                self._answer_retried_request(player_id, outcome, request_id)
+                return
+
+        # stale requests are rejected by the sequence alone, before applying anything
+        expected_sequence = game_state.latest_event_sequence + 1
+        if event.sequence != expected_sequence:
+            self._reject_event(player_id, event, f'Expected event sequence {expected_sequence}, got {event.sequence}',
+                               request_id)
+            return
+        if not isinstance(event, PlayerMoveEvent):
+            self._reject_event(player_id, event, 'Players can request only moves', request_id)
+            return
+        if event.params.player != username:
+            self._reject_event(player_id, event, 'Move of another player', request_id)
+            return
+        if len(event.params.words):
+            # the words (and so the score) of the requested moves are derived from the placed tiles, the words are
+            # accepted only from the saved events of the older games
+            self._reject_event(player_id, event, 'Moves must place tiles instead of words', request_id)
+            return
 
-        if game_id not in self._events:
-            raise RuntimeError('Game was not initialized')
+        try:
+            self._commit_event(game_id, event)
+        except Exception as e:
+            self._reject_event(player_id, event, str(e) or type(e).__name__, request_id)
+            return
+        self._remember_outcome(game_id, username, request_id, event.sequence)
+
+        player_state = game_state.get_player_state(username)
+        need_letters_count = PLAYER_MAX_LETTERS - len(player_state.letters)
+        new_letters = game_state.letters[:need_letters_count]
+        if new_letters:
+            add_letters_event = PlayerAddLettersEvent(
+                params=PlayerAddLettersParams(player=username, letters=new_letters),
+                sequence=game_state.latest_event_sequence + 1,
+                game_id=game_id,
+            )
+            self._apply_event(game_id, add_letters_event)
 
-        self._logger.info(f'New player {player_id}')
-        self._players.add(player_id)
+    def _reject_event(self, player_id: PlayerConnectionID, event: Event, reason: str,
+                      request_id: Optional[str] = None) -> None:
+        self._logger.warning(f'Rejected event {event} of {player_id}: {reason}')
 
-        for event in self._events[game_id]:
+        username, game_id = player_id
+        latest_sequence = self.get_game_state(game_id).latest_event_sequence
+        answer = EventMessage(payload=EventMessagePayload(event=event, request_id=request_id, reason=reason,
+                                                          latest_sequence=latest_sequence),
+                              status=EventStatus.REJECTED)
+        self._remember_outcome(game_id, username, request_id, answer)
+        self._send(player_id, answer)
+
+    def _remember_outcome(self, game_id: int, username: str, request_id: Optional[str],
+                          outcome: Union[int, EventMessage]) -> None:
+        if request_id is None:
+            return
+
+        outcomes = self._request_outcomes.setdefault(game_id, {})
+        outcomes[(username, request_id)] = outcome
+        if len(outcomes) > REQUEST_DEDUPE_WINDOW:
+            # outcomes are kept in the order of the requests, so the oldest one goes first
+            del outcomes[next(iter(outcomes))]
+
+    def _answer_retried_request(self, player_id: PlayerConnectionID, outcome: Union[int, EventMessage],
+                                request_id: str) -> None:
+        self._logger.info(f'Answering retried request {request_id} of {player_id} with its original outcome')
+
+        if isinstance(outcome, EventMessage):
+            self._send(player_id, outcome)
+            return
+
+        # approved events not durable yet are published to the player anyway
+        game_id = player_id[1]
+        if outcome <= self._durable_events[game_id]:
+            event = self._events[game_id][outcome - 1]
+            self._send(player_id, EventMessage(payload=EventMessagePayload(event=event, request_id=request_id),
+                                               status=EventStatus.APPROVED))
+
+    async def _on_new_conn(self, player_id: PlayerConnectionID, last_sequence: int = 0,
+                           spectator: bool = False) -> int:
+        """Send the durable events (or the snapshot of them) the player does not have yet, returning the sequence
+        of the latest one."""
+        username, game_id = player_id
+
+        if game_id not in self._events and not self._restore_new_game(game_id):
+            # evicted and archived games are loaded on demand
+            await self._load_game_async(game_id)
+
+        self._touch(game_id)
+        durable_events = self._durable_events[game_id]
+
+        if spectator:
+            self._logger.info(f'New spectator {player_id}')
+            self._spectators.add(player_id)
+
+            if last_sequence == 0 and durable_events > 0:
+                # spectators start from the state snapshot instead of all the events of the game
+                self._send_serialized(player_id, self._get_spectator_snapshot(game_id))
+                return durable_events
+        else:
+            self._logger.info(f'New player {player_id}')
+            self._players.add(player_id)
+
+        # reconnected players catch up from their latest event, the rest of events are published once they are durable
+        for event in self._events[game_id][last_sequence:durable_events]:
             self._send(player_id, self._wrap_event(event))
+        return durable_events
 
     def _on_end_conn(self, player_id: PlayerConnectionID) -> None:
         self._logger.info(f'Disconnected player {player_id}')
-        self._players.remove(player_id)
+        self._players.discard(player_id)
+        self._spectators.discard(player_id)
+
+        _, game_id = player_id
+        if game_id in self._states:
+            self._touch(game_id)
 
     def _publish(self, game_id: int, msg: WebsocketMessage) -> None:
+        assert self._server_loop is not None
         self._server_loop.create_task(self._server.publish_to_game(msg, game_id))
 
     def _send(self, player_id: PlayerConnectionID, msg: WebsocketMessage) -> None:
+        assert self._server_loop is not None
         self._server_loop.create_task(self._server.send_player(player_id, msg))
 
+    def _send_serialized(self, player_id: PlayerConnectionID, raw_msg: str) -> None:
+        assert self._server_loop is not None
+        self._server_loop.create_task(self._server.send_player_serialized(player_id, raw_msg))
+
+    def _get_spectator_snapshot(self, game_id: int) -> str:
+        """Serialized snapshot message of the durable state of the game, shared by the spectators joining meanwhile."""
+        durable_events = self._durable_events[game_id]
+        cached = self._spectator_snapshots.get(game_id)
+        if cached is not None and cached[0] == durable_events:
+            return cached[1]
+
+        if durable_events == len(self._events[game_id]):
+            snapshot = self.get_game_state(game_id).snapshot()
+        else:
+            # the events being written are published to the spectators once durable, so the state is replayed from
+            # the latest snapshot at or below the durable events
+            latest_snapshot = find_snapshot(self._snapshots.get(game_id, []), durable_events)
+            if latest_snapshot is None:
+                game_state = GameState(game_id)
+            else:
+                game_state = GameState.from_snapshot(latest_snapshot)
+            for event in self._events[game_id][game_state.latest_event_sequence:durable_events]:
+                game_state.apply_event(event)
+            snapshot = game_state.snapshot()
+
+        raw_msg = self._server.to_ws_msg(SnapshotMessage(payload=SnapshotPayload(snapshot=snapshot)))
+        self._spectator_snapshots[game_id] = (durable_events, raw_msg)
+        return raw_msg
+
+    def _connected_game_ids(self) -> MutableSet[int]:
+        return {game_id for _, game_id in chain(self._players, self._spectators)}
+
+    def _call_in_loop(self, callback: Callable[..., Any], *args: Any) -> None:
+        loop = self._server_loop
+        if loop is not None and loop.is_running():
+            loop.call_soon_threadsafe(callback, *args)
+        else:
+            callback(*args)
+
     def _wrap_event(self, event: Event) -> EventMessage:
         return EventMessage(payload=EventMessagePayload(event=event), status=EventStatus.APPROVED)
 
-    def _get_file_path(self, game_id: int) -> str:
-        directory = '/tmp/scrabble/'
-        filename = f'{game_id}_events.json'
-        Path(directory).mkdir(parents=True, exist_ok=True)
+    def _save_event(self, game_id: int, event: Event) -> None:
+        future = self._writer.write_event(game_id, event)
+        future.add_done_callback(
+            lambda future: self._call_in_loop(self._on_event_durable, game_id, event, future))
+
+    def _on_event_durable(self, game_id: int, event: Event, future: 'Future[None]') -> None:
+        error = future.exception()
+        if error is not None:
+            self._logger.error(f'Event #{event.sequence} of game #{game_id} was not saved: {error}')
+            return
+
+        if game_id not in self._durable_events:
+            return
+        self._durable_events[game_id] = max(self._durable_events[game_id], event.sequence)
+
+        event_msg = self._wrap_event(event)
+        self._publish(game_id, event_msg)
+
+    def _save_snapshot(self, game_id: int) -> None:
+        snapshot = self.get_game_state(game_id).snapshot()
+        self._writer.write_snapshot(snapshot)
+        self._snapshots[game_id] = (self._snapshots.get(game_id, []) + [snapshot])[-KEPT_SNAPSHOTS:]
+
+    def _forget_game(self, game_id: int) -> None:
+        del self._events[game_id]
+        del self._states[game_id]
+        del self._durable_events[game_id]
+        self._last_activity.pop(game_id, None)
+        self._spectator_snapshots.pop(game_id, None)
+        self._snapshots.pop(game_id, None)
+        self._request_outcomes.pop(game_id, None)
+
+    def _touch(self, game_id: int) -> None:
+        # the activity is kept in the order of time, so the least recently active games come first
+        self._last_activity.pop(game_id, None)
+        self._last_activity[game_id] = monotonic()
+
+    def compact(self) -> List[int]:
+        """Archive the finished and idle games without connected players, dropping them from memory once archived.
+        Idle games which were never started have nothing to archive and are dropped right away.
+
+        Returns ids of the games being archived.
+        """
+        connected_game_ids = self._connected_game_ids()
+        now = monotonic()
+
+        archived_game_ids = []
+        for game_id, game_state in list(self._states.items()):
+            if game_id in connected_game_ids:
+                continue
+
+            idle = now - self._last_activity[game_id] >= self._idle_timeout
+            if not self._events[game_id]:
+                if idle:
+                    self._forget_game(game_id)
+                    self._logger.info(f'Dropped idle game #{game_id}, which was never started')
+            elif game_state.is_finished or idle:
+                self.archive_game(game_id)
+                archived_game_ids.append(game_id)
+
+        for game_id, last_activity in list(self._evicted_new_games.items()):
+            if now - last_activity >= self._idle_timeout:
+                del self._evicted_new_games[game_id]
+                self._logger.info(f'Dropped idle game #{game_id}, which was never started')
+
+        return archived_game_ids
+
+    def archive_game(self, game_id: int) -> None:
+        game_state = self.get_game_state(game_id)
+        future = self._writer.write_archive(game_id, game_state.snapshot(), self._archive_compression)
+        sequence = game_state.latest_event_sequence
+        future.add_done_callback(
+            lambda future: self._call_in_loop(self._on_game_archived, game_id, sequence, future))
+
+    def _on_game_archived(self, game_id: int, sequence: int, future: 'Future[None]') -> None:
+        error = future.exception()
+        if error is not None:
+            self._logger.error(f'Game #{game_id} was not archived: {error}')
+            return
+
+        self._logger.info(f'Archived game #{game_id}')
+
+        # the game is kept in memory if it was played meanwhile, it is unarchived on the next event then
+        if (game_id in self._states and game_id not in self._connected_game_ids()
+                and self._states[game_id].latest_event_sequence == sequence):
+            self._forget_game(game_id)
+
+    def _compact_periodically(self) -> None:
+        try:
+            self.compact()
+            # games left by their players are evicted as well
+            self._evict_games()
+        except Exception:
+            self._logger.exception('Error compacting games')
 
-        return f'{directory}{filename}'
+        assert self._server_loop is not None
+        self._server_loop.call_later(COMPACTION_INTERVAL, self._compact_periodically)
 
-    def _save_event(self, game_id: int, event: Event) -> None:
-        with open(self._get_file_path(game_id), 'w') as fout:
-            serialized_events = [EventSchema().dump(event) for event in self._events[game_id]]
-            json.dump(serialized_events, fout)
+    async def _load_game_async(self, game_id: int) -> None:
+        """Load the game in a thread, so the event loop keeps serving other games. Concurrent loads of the game
+        share the same reading."""
+        assert self._server_loop is not None
 
-    def _load_events(self, game_id: int) -> None:
+        loading = self._loading_games.get(game_id)
+        if loading is None:
+            loading = self._loading_games[game_id] = self._server_loop.run_in_executor(None, self._read_game, game_id)
         try:
-            with open(self._get_file_path(game_id), 'r') as fin:
-                serialized_events = json.load(fin)
-                events = [EventSchema().load(event) for event in serialized_events]
-                for event in events:
-                    try:
-                        self.get_game_state(game_id).apply_event(event)
-                    except Exception:
-                        self._logger.exception('Error loading events')
-                        del self._events[game_id]
-                        return
-
-                    self._events[game_id].append(event)
-
-        except FileNotFoundError:
+            loaded = await loading
+        finally:
+            self._loading_games.pop(game_id, None)
+
+        if loaded is None:
+            raise RuntimeError('Cannot load the game')
+        if game_id not in self._events:
+            events, game_state = loaded
+            self._install_game(game_id, events, game_state)
+            self._logger.info(f'Loaded game #{game_id} on connection')
+
+    def _restore_new_game(self, game_id: int) -> bool:
+        """Initialize the evicted game which was never started again, False if there is no such game."""
+        if self._evicted_new_games.pop(game_id, None) is None:
+            return False
+
+        self._install_game(game_id, [], GameState(game_id))
+        return True
+
+    def _install_game(self, game_id: int, events: List[Event], game_state: GameState) -> None:
+        self._events[game_id] = events
+        self._states[game_id] = game_state
+        self._durable_events[game_id] = len(events)
+        # all the events of the installed game are durable, so its state is the base of the events to come
+        self._snapshots[game_id] = [game_state.snapshot()]
+        self._touch(game_id)
+
+        self._evict_games(keep_game_id=game_id)
+
+    def _evict_games(self, keep_game_id: Optional[int] = None) -> None:
+        """Drop the least recently active games from memory while the residency budget is exceeded. Games with
+        connected players are kept."""
+        resident_events = sum(len(events) for events in self._events.values())
+        connected_game_ids = self._connected_game_ids()
+
+        for game_id in list(self._last_activity):
+            over_games_budget = self._max_resident_games is not None and len(self._states) > self._max_resident_games
+            over_events_budget = self._max_resident_events is not None and resident_events > self._max_resident_events
+            if not over_games_budget and not over_events_budget:
+                return
+
+            if game_id == keep_game_id or game_id in connected_game_ids:
+                continue
+
+            resident_events -= len(self._events[game_id])
+            if not self._events[game_id]:
+                # not saved, so only its id is kept
+                self._evicted_new_games[game_id] = self._last_activity[game_id]
+            # pending writes of the game are flushed before it is read again
+            self._forget_game(game_id)
+            self._logger.info(f'Evicted game #{game_id}')
+
+    def _read_game(self, game_id: int) -> Optional[Tuple[List[Event], GameState]]:
+        """Events and state of the saved game, `None` if they cannot be read."""
+        if not self._store.game_exists(game_id):
             raise RuntimeError('Cannot find the game')
 
+        # the game might still have pending writes if it was loaded before
+        self._writer.flush()
+
+        try:
+            snapshots = self._store.load_snapshots(game_id)
+        except Exception:
+            self._logger.exception('Error loading snapshots')
+            snapshots = []
+
+        # events before the latest snapshot are only read, but not applied
+        latest_snapshot = find_snapshot(snapshots)
+        if latest_snapshot is not None and latest_snapshot.game_id != game_id:
+            latest_snapshot = None
+
+        events: List[Event] = []
+        game_state = GameState(game_id)
+        try:
+            for event in self._store.read_events(game_id):
+                events.append(event)
+
+                if latest_snapshot is None:
+                    game_state.apply_event(event)
+                elif len(events) == latest_snapshot.sequence:
+                    if event.sequence == latest_snapshot.sequence:
+                        game_state = GameState.from_snapshot(latest_snapshot)
+                        self._logger.info(f'Restored game #{game_id} from snapshot at sequence {event.sequence}')
+                    else:
+                        game_state = GameState(game_id, events=events)
+                    latest_snapshot = None
+
+            if latest_snapshot is not None:
+                # the snapshot is ahead of the saved events
+                game_state = GameState(game_id, events=events)
+        except Exception:
+            self._logger.exception(f'Error loading events of game #{game_id} after sequence '
+                                   f'{game_state.latest_event_sequence} (check it with `run_cmd.py verify`)')
+            return None
+
+        return events, game_state
+
     def _apply_event(self, game_id: int, event: Event) -> None:
         try:
-            self.get_game_state(game_id).apply_event(event)
+            self._commit_event(game_id, event)
         except Exception:
             self._logger.exception('Error applying event')
-        else:
-            self._events[game_id].append(event)
-            self._save_event(game_id, event)
-            event_msg = self._wrap_event(event)
-            self._publish(game_id, event_msg)
+
+    def _commit_event(self, game_id: int, event: Event) -> None:
+        """Apply the event to the game and save it. Errors of the event are raised with the game state untouched."""
+        self.get_game_state(game_id).apply_event(event)
+
+        self._events[game_id].append(event)
+        self._touch(game_id)
+        # the event is published once it is durable
+        self._save_event(game_id, event)
+        if event.sequence % SNAPSHOT_EVENTS_INTERVAL == 0:
+            self._save_snapshot(game_id)
 
     def _run_server(self, host: Optional[str], port: int) -> None:
         self._server_loop = loop = asyncio.new_event_loop()
         asyncio.set_event_loop(loop)
 
         loop.run_until_complete(self._server.start(host, port))
+        loop.call_later(COMPACTION_INTERVAL, self._compact_periodically)
         loop.run_forever()
 
-    def _cmd(self):
-        help_msg = (
-            'new - Initialize new game\n'
-            'start <game_id> <initial_word> [lang=en] - Start specified game '
-            'with initial word (without spaces) and use language <lang> (available "ru" and "en")\n'
-            'load <game_id> - Load and start specified game\n'
-            'disconnect <game_id> <player> - Disconnect specified player\n'
-        )
-        print(help_msg)
+    def _cmd(self, read_cmd: Optional[Callable[[], str]] = None) -> None:
+        if read_cmd is None:
+            print(CMD_HELP)
+            read_cmd = input
 
         while True:
-            cmd = input()
+            cmd = read_cmd()
             if cmd == 'q':
                 break
 
-            elif cmd in ('h', 'help'):
-                print(help_msg)
+            try:
+                self._run_cmd(cmd)
+            except Exception:
+                # a failed command (e.g. loading a missing game) ends neither the console nor the worker reading it
+                self._logger.exception(f'Command "{cmd}" failed')
+
+    def _run_cmd(self, cmd: str) -> None:
+        if cmd in ('h', 'help'):
+            print(CMD_HELP)
 
-            elif cmd == 'new':
-                game_id = self.init_new_game()
-                self._logger.info(f'Initialized new game #{game_id}')
+        elif cmd.startswith('new'):
+            assert len(cmd.split()) in (1, 2)
 
-            elif cmd.startswith('start'):
-                assert len(cmd.split()) in (3, 4)
+            game_id = self.init_new_game(int(cmd.split()[1]) if len(cmd.split()) == 2 else None)
+            self._logger.info(f'Initialized new game #{game_id}')
 
-                game_id = int(cmd.split()[1])
-                initial_word = cmd.split()[2]
-                lang = 'en'
-                if len(cmd.split()) == 4:
-                    lang = cmd.split()[3]
+        elif cmd.startswith('start'):
+            assert len(cmd.split()) in (3, 4)
 
+            game_id = int(cmd.split()[1])
+            initial_word = cmd.split()[2]
+            lang = 'en'
+            if len(cmd.split()) == 4:
+                lang = cmd.split()[3]
+
+            try:
                 self.start_game(game_id, initial_word, lang)
+            except ValueError as e:
+                self._logger.error(f'Game #{game_id} was not started: {e}')
+
+        elif cmd.startswith('load'):
+            assert len(cmd.split()) == 2
+
+            game_id = int(cmd.split()[1])
+
+            self.load_game(game_id)
 
-            elif cmd.startswith('load'):
-                assert len(cmd.split()) == 2
+        elif cmd.startswith('disconnect'):
+            assert len(cmd.split()) == 3
 
-                game_id = int(cmd.split()[1])
+            game_id = int(cmd.split()[1])
+            player = cmd.split()[2]
+            self._server.disconnect((player, game_id))
 
-                self.load_game(game_id)
+        elif cmd == 'compact':
+            self._call_in_loop(self.compact)
 
-            elif cmd.startswith('disconnect'):
-                assert len(cmd.split()) == 3
+        elif cmd == 'stats':
+            metrics = self.writer_metrics
+            print(f'Queue depth: {metrics.queue_depth} (max {metrics.max_queue_depth})\n'
+                  f'Commits: {metrics.commits}, events: {metrics.events}, snapshots: {metrics.snapshots}, '
+                  f'archives: {metrics.archives}, failed writes: {metrics.failed_writes}\n'
+                  f'Commit latency: last {metrics.last_commit_latency * 1000:.1f}ms, '
+                  f'average {metrics.average_commit_latency * 1000:.1f}ms, '
+                  f'max {metrics.max_commit_latency * 1000:.1f}ms')
 
-                game_id = int(cmd.split()[1])
-                player = cmd.split()[2]
-                self._server.disconnect((player, game_id))
+            send_metrics = self._server.send_metrics
+            print(f'Send queue depth: {send_metrics.queue_depth} (max {send_metrics.max_queue_depth})\n'
+                  f'Sent messages: {send_metrics.sent_messages}, dropped: {send_metrics.dropped_messages}, '
+                  f'coalesced: {send_metrics.coalesced_messages}, '
+                  f'slow clients disconnected: {send_metrics.disconnects}')
+
+            liveness_metrics = self._server.liveness_metrics
+            print(f'Connections: {liveness_metrics.connections}, pings sent: {liveness_metrics.pings_sent}, '
+                  f'skipped: {liveness_metrics.pings_skipped}, timeouts: {liveness_metrics.timeouts}')
+
+            recv_metrics = self._server.recv_metrics
+            print(f'Received messages: {recv_metrics.received_messages}, rejected oversized: '
+                  f'{recv_metrics.rejected_oversized}, rate limited: {recv_metrics.rejected_rate_limited}, '
+                  f'impersonating: {recv_metrics.rejected_impersonating}, '
+                  f'malformed: {recv_metrics.rejected_malformed}')
 
     def _terminate(self) -> None:
+        self._writer.close()
+
         loop = self._server_loop
+        assert loop is not None
 
         loop.call_soon_threadsafe(loop.stop)
         while loop.is_running():
@@ -286,9 +720,11 @@ class ServerEngine:
         finally:
             self._terminate()
 
-    def run_with_cmd(self, host: Optional[str] = None, port: int = 5678) -> None:
+    def run_with_cmd(self, host: Optional[str] = None, port: int = 5678,
+                     read_cmd: Optional[Callable[[], str]] = None) -> None:
+        """Run the server along with the commands read from the console (or by `read_cmd`)."""
         server_thread = Thread(target=self._run_server, args=(host, port))
-        cmd_thread = Thread(target=self._cmd)
+        cmd_thread = Thread(target=self._cmd, args=(read_cmd,))
 
         server_thread.start()
         cmd_thread.start()
@@ -0,0 +1,184 @@
+import asyncio
+import logging
+import logging.config
+from multiprocessing import get_context
+from multiprocessing.connection import Connection, wait
+from multiprocessing.process import BaseProcess
+from threading import Event, Thread
+from typing import Any, Callable, List, Mapping, Optional, Tuple
+
+from scrabble.settings import SERVER_LOGGING_CONFIG
+from scrabble.storage import EventStore
+from scrabble.transport import Router
+
+from .server import CMD_HELP, ServerEngine
+
+__all__ = [
+    'ShardedServerEngine',
+]
+
+# workers listen on the local interface only, players connect to the router
+WORKER_HOST = '127.0.0.1'
+# seconds between the checks of the stopping engine while watching the workers, and before restarting a dead worker
+WORKER_WATCH_INTERVAL = 1.0
+
+
+def _run_worker(store_factory: Callable[[], EventStore], engine_kwargs: Mapping[str, Any], port: int,
+                commands: Connection) -> None:
+    server_engine = ServerEngine(store_factory(), **engine_kwargs)
+    server_engine.run_with_cmd(WORKER_HOST, port, read_cmd=commands.recv)
+
+
+class ShardedServerEngine:
+    """Runs the games in several worker processes, each with its own `ServerEngine`, so the server uses all cores.
+
+    Games are split between the workers by consistent hashing of their ids. The router accepts the players and proxies
+    their connections to the workers owning their games, the console commands are sent to the owning workers as well.
+    Workers share the store, the games of a worker are written only by it. A dead worker is restarted at its port, so
+    its games are served again.
+    """
+
+    def __init__(self, store_factory: Callable[[], EventStore], workers: int,
+                 engine_kwargs: Optional[Mapping[str, Any]] = None) -> None:
+        logging.config.dictConfig(SERVER_LOGGING_CONFIG)
+        self._logger = logging.getLogger()
+
+        # the store is created by every process on its own (e.g. SQLite connections cannot be shared)
+        self._store_factory = store_factory
+        self._store: Optional[EventStore] = None
+        self._workers_count = workers
+        self._engine_kwargs = dict(engine_kwargs or {})
+
+        # workers are spawned rather than forked, so they may be restarted once this process runs other threads
+        self._context = get_context('spawn')
+        self._worker_ports: List[int] = []
+        self._workers: List[BaseProcess] = []
+        self._commands: List[Connection] = []
+        self._stopping = Event()
+        self._router: Optional[Router] = None
+        self._router_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def run_with_cmd(self, host: Optional[str] = None, port: int = 5678) -> None:
+        """Run the router at the port and the workers at the next ports along with the console commands."""
+        self._worker_ports = [port + 1 + index for index in range(self._workers_count)]
+        for worker_port in self._worker_ports:
+            worker, commands = self._start_worker(worker_port)
+            self._workers.append(worker)
+            self._commands.append(commands)
+
+        self._store = self._store_factory()
+        self._router = Router([f'ws://{WORKER_HOST}:{worker_port}' for worker_port in self._worker_ports],
+                              ping_interval=self._engine_kwargs.get('ping_interval', 5.0),
+                              ping_timeout=self._engine_kwargs.get('ping_timeout', 5.0),
+                              max_msg_size=self._engine_kwargs.get('max_msg_size', 64 * 1024))
+        self._router_loop = asyncio.new_event_loop()
+
+        router_thread = Thread(target=self._run_router, args=(host, port))
+        router_thread.start()
+        watch_thread = Thread(target=self._watch_workers)
+        watch_thread.start()
+        try:
+            self._cmd()
+        finally:
+            self._stopping.set()
+            watch_thread.join()
+            self._terminate()
+            router_thread.join()
+
+    def _start_worker(self, port: int) -> Tuple[BaseProcess, Connection]:
+        commands_reader, commands_writer = self._context.Pipe(duplex=False)
+        worker = self._context.Process(target=_run_worker, args=(self._store_factory, self._engine_kwargs, port,
+                                                                 commands_reader),
+                                       name=f'scrabble-worker-{port}', daemon=True)
+        worker.start()
+        return worker, commands_writer
+
+    def _watch_workers(self) -> None:
+        while not self._stopping.is_set():
+            wait([worker.sentinel for worker in self._workers], timeout=WORKER_WATCH_INTERVAL)
+            # dead workers are restarted after a delay, so a worker failing on start does not spin
+            if self._get_dead_workers() and not self._stopping.wait(WORKER_WATCH_INTERVAL):
+                self._restart_dead_workers()
+
+    def _get_dead_workers(self) -> List[int]:
+        return [index for index, worker in enumerate(self._workers) if not worker.is_alive()]
+
+    def _restart_dead_workers(self) -> None:
+        """Start the dead workers again at their ports, the router keeps routing their games to these ports."""
+        for index in self._get_dead_workers():
+            worker_port = self._worker_ports[index]
+            self._logger.error(f'Worker at port {worker_port} exited with code {self._workers[index].exitcode}, '
+                               f'restarting it')
+
+            self._commands[index].close()
+            self._workers[index], self._commands[index] = self._start_worker(worker_port)
+
+    def _run_router(self, host: Optional[str], port: int) -> None:
+        assert self._router is not None and self._router_loop is not None
+
+        loop = self._router_loop
+        asyncio.set_event_loop(loop)
+
+        loop.run_until_complete(self._router.start(host, port))
+        loop.run_forever()
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
+
+    def _send_cmd(self, game_id: int, cmd: str) -> None:
+        assert self._router is not None
+
+        worker_index = self._router.get_worker_index(game_id)
+        self._send_worker_cmd(worker_index, cmd)
+
+    def _broadcast_cmd(self, cmd: str) -> None:
+        for worker_index in range(len(self._commands)):
+            self._send_worker_cmd(worker_index, cmd)
+
+    def _send_worker_cmd(self, worker_index: int, cmd: str) -> None:
+        try:
+            self._commands[worker_index].send(cmd)
+        except OSError as e:
+            # the worker is dead, it is restarted without the command
+            self._logger.error(f'Cannot send "{cmd}" to worker #{worker_index}: {e}')
+        else:
+            self._logger.info(f'Sent "{cmd}" to worker #{worker_index}')
+
+    def _cmd(self) -> None:
+        print(CMD_HELP)
+
+        while True:
+            cmd = input()
+            args = cmd.split()
+            if cmd == 'q':
+                break
+
+            elif cmd in ('h', 'help'):
+                print(CMD_HELP)
+
+            elif cmd == 'new':
+                assert self._store is not None
+                # the id is allocated here, so the game is created by the worker owning it
+                game_id = self._store.allocate_game_id()
+                self._send_cmd(game_id, f'new {game_id}')
+
+            elif cmd in ('stats', 'compact'):
+                self._broadcast_cmd(cmd)
+
+            elif args and args[0] in ('new', 'start', 'load', 'disconnect'):
+                if len(args) < 2 or not args[1].isdigit():
+                    print(CMD_HELP)
+                    continue
+
+                self._send_cmd(int(args[1]), cmd)
+
+    def _terminate(self) -> None:
+        self._broadcast_cmd('q')
+        for worker in self._workers:
+            worker.join()
+
+        if self._store is not None:
+            self._store.close()
+
+        loop = self._router_loop
+        if loop is not None:
+            loop.call_soon_threadsafe(loop.stop)
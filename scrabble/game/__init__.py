@@ -1,4 +1,6 @@
+from .alphabet import *  # noqa
 from .board import *  # noqa
 from .letters import *  # noqa
 from .player import *  # noqa
 from .state import *  # noqa
+from .timeline import *  # noqa
@@ -0,0 +1,74 @@
+from itertools import chain
+from typing import Iterable, Iterator, List, MutableMapping, Optional
+
+from .constants import LETTERS_DISTRIBUTION
+
+__all__ = [
+    'EMPTY_CELL',
+    'Alphabet',
+    'get_alphabet',
+]
+
+# code 0 is reserved for an empty board cell
+EMPTY_CELL = 0
+
+
+class Alphabet:
+
+    def __init__(self, letters: Iterable[str]) -> None:
+        self._letters: List[str] = ['']
+        self._codes: MutableMapping[str, int] = {}
+
+        for letter in letters:
+            if len(letter) != 1:
+                raise ValueError('Letters must be 1-length')
+            if letter not in self._codes:
+                self._codes[letter] = len(self._letters)
+                self._letters.append(letter)
+
+        if len(self._letters) > 256:
+            raise ValueError('Alphabet must have at most 255 letters')
+
+    def __len__(self) -> int:
+        return len(self._letters) - 1
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._letters[1:])
+
+    def __contains__(self, letter: object) -> bool:
+        return letter in self._codes
+
+    def code(self, letter: str) -> int:
+        try:
+            return self._codes[letter]
+        except KeyError:
+            raise ValueError(f'Unknown letter "{letter}"')
+
+    def letter(self, code: int) -> str:
+        if not (EMPTY_CELL < code < len(self._letters)):
+            raise ValueError(f'Unknown letter code {code}')
+        return self._letters[code]
+
+    def encode(self, letters: Iterable[str]) -> bytes:
+        return bytes(self.code(letter) for letter in letters)
+
+    def decode(self, codes: Iterable[int]) -> List[str]:
+        return [self.letter(code) for code in codes]
+
+
+_ALPHABETS = {
+    lang: Alphabet(distribution)
+    for lang, distribution in LETTERS_DISTRIBUTION.items()
+}
+# used by boards, which are not bound to any language
+_ALPHABET_ALL_LANGUAGES = Alphabet(chain.from_iterable(LETTERS_DISTRIBUTION.values()))
+
+
+def get_alphabet(lang: Optional[str] = None) -> Alphabet:
+    if lang is None:
+        return _ALPHABET_ALL_LANGUAGES
+
+    try:
+        return _ALPHABETS[lang]
+    except KeyError:
+        raise ValueError(f'Unknown language "{lang}"')
@@ -2,6 +2,8 @@ from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum, unique
 
+from scrabble.utils import slotted
+
 __all__ = [
     'EventName',
     'EventParams',
@@ -17,11 +19,13 @@ class EventName(Enum):
     PLAYER_MOVE = 'player_move'
 
 
+@slotted
 @dataclass
 class EventParams:
     ...
 
 
+@slotted
 @dataclass
 class Event:
     params: EventParams
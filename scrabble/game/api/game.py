@@ -2,6 +2,7 @@ from dataclasses import dataclass, field
 from typing import List, Optional
 
 from scrabble.game.board import BoardSettings
+from scrabble.utils import slotted
 
 from .base import Event, EventParams
 
@@ -13,6 +14,7 @@ __all__ = [
 ]
 
 
+@slotted
 @dataclass
 class GameInitParams(EventParams):
     players: List[str]
@@ -21,16 +23,19 @@ class GameInitParams(EventParams):
     lang: str
 
 
+@slotted
 @dataclass
 class GameInitEvent(Event):
     params: GameInitParams
 
 
+@slotted
 @dataclass
 class GameStartParams(EventParams):
     player_to_start: Optional[str] = field(default=None)
 
 
+@slotted
 @dataclass
 class GameStartEvent(Event):
     params: GameStartParams
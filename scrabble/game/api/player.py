@@ -1,6 +1,8 @@
 from dataclasses import dataclass
 from typing import List
 
+from scrabble.utils import slotted
+
 from .base import Event, EventParams
 
 __all__ = [
@@ -9,12 +11,14 @@ __all__ = [
 ]
 
 
+@slotted
 @dataclass
 class PlayerAddLettersParams(EventParams):
     player: str
     letters: List[str]
 
 
+@slotted
 @dataclass
 class PlayerAddLettersEvent(Event):
     params: PlayerAddLettersParams
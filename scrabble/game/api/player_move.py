@@ -1,7 +1,8 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import List
 
-from scrabble.game.board import BoardWords
+from scrabble.game.board import BoardTile, BoardWords
+from scrabble.utils import slotted
 
 from .base import Event, EventParams
 
@@ -11,13 +12,17 @@ __all__ = [
 ]
 
 
+@slotted
 @dataclass
 class PlayerMoveParams(EventParams):
     player: str
-    words: BoardWords
-    exchange_letters: List[str]
+    words: BoardWords = field(default_factory=BoardWords)
+    exchange_letters: List[str] = field(default_factory=list)
+    # new letters placed by the player, the formed words are derived from them on applying the move
+    tiles: List[BoardTile] = field(default_factory=list)
 
 
+@slotted
 @dataclass
 class PlayerMoveEvent(Event):
     params: PlayerMoveParams
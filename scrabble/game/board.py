@@ -1,8 +1,12 @@
 from dataclasses import dataclass, field
 from enum import Enum, unique
-from typing import List, Optional, Set, Tuple
+from itertools import chain
+from typing import List, Mapping, MutableMapping, Optional, Sequence, Set, Tuple
+
+from scrabble.utils import slotted
 
 from . import constants
+from .alphabet import EMPTY_CELL, Alphabet, get_alphabet
 from .exceptions import WordIntersectionError
 
 __all__ = [
@@ -11,6 +15,8 @@ __all__ = [
     'BoardSettings',
     'BoardWord',
     'BoardWords',
+    'BoardTile',
+    'BoardSnapshot',
     'Board',
 ]
 
@@ -21,7 +27,8 @@ class WordDirection(Enum):
     DOWN = 'down'
 
 
-@dataclass
+@slotted
+@dataclass(frozen=True)
 class Bonus:
     location_x: int
     location_y: int
@@ -34,7 +41,20 @@ class Bonus:
             raise ValueError('Oy position must be positive')
 
 
-@dataclass
+# board positions are shared between cached word paths, which are kept for every word in the game events
+_INTERNED_POSITION_LIMIT = 256
+_interned_positions: MutableMapping[Tuple[int, int], Tuple[int, int]] = {}
+
+
+def _intern_position(position: Tuple[int, int]) -> Tuple[int, int]:
+    x, y = position
+    if 0 <= x < _INTERNED_POSITION_LIMIT and 0 <= y < _INTERNED_POSITION_LIMIT:
+        return _interned_positions.setdefault(position, position)
+    return position
+
+
+@slotted(extra=('_path',))
+@dataclass(frozen=True)
 class BoardWord:
     word: str
     start_x: int
@@ -42,17 +62,29 @@ class BoardWord:
     direction: WordDirection
 
     @property
-    def path(self):
-        if self.direction == WordDirection.RIGHT:
-            return [
-                (self.start_x + offset, self.start_y)
-                for offset in range(len(self.word))
-            ]
-        else:
-            return [
-                (self.start_x, self.start_y + offset)
-                for offset in range(len(self.word))
-            ]
+    def path(self) -> Tuple[Tuple[int, int], ...]:
+        path = getattr(self, '_path', None)
+        if path is None:
+            if self.direction == WordDirection.RIGHT:
+                path = tuple(
+                    _intern_position((self.start_x + offset, self.start_y))
+                    for offset in range(len(self.word))
+                )
+            else:
+                path = tuple(
+                    _intern_position((self.start_x, self.start_y + offset))
+                    for offset in range(len(self.word))
+                )
+            object.__setattr__(self, '_path', path)
+
+        return path
+
+    def cells(self, width: int) -> range:
+        """Indices of the word letters in a row-by-row grid of the given width."""
+        start = self.start_y * width + self.start_x
+        step = 1 if self.direction == WordDirection.RIGHT else width
+
+        return range(start, start + step * len(self.word), step)
 
     def letter_at(self, x: int, y: int) -> Optional[str]:
         if self.direction == WordDirection.RIGHT:
@@ -69,18 +101,18 @@ class BoardWord:
         return None
 
     @property
-    def position_start(self):
+    def position_start(self) -> Tuple[int, int]:
         return (self.start_x, self.start_y)
 
     @property
-    def position_end(self):
+    def position_end(self) -> Tuple[int, int]:
         if self.direction == WordDirection.RIGHT:
             return (self.start_x + len(self.word) - 1, self.start_y)
         else:
             return (self.start_x, self.start_y + len(self.word) - 1)
 
     @property
-    def score(self):
+    def score(self) -> int:
         return len(self.word)
 
     def intersects(self, word: 'BoardWord') -> bool:
@@ -99,14 +131,15 @@ class BoardWord:
                 raise WordIntersectionError('Words intersection does not match')
 
 
+@slotted(extra=('_cells',))
 @dataclass
 class BoardWords:
     words: List[BoardWord] = field(default_factory=list)
 
     def __post_init__(self) -> None:
-        for w1 in self.words:
-            for w2 in self.words:
-                w1.validate_intersection(w2)
+        # position -> (first word covering the position, letter offset in it); the index validating the words is
+        # kept, it is built again on demand only after truncating the words
+        self._cells: Optional[MutableMapping[Tuple[int, int], Tuple[BoardWord, int]]] = self._build_cells()
 
     def __len__(self) -> int:
         return len(self.words)
@@ -114,33 +147,71 @@ class BoardWords:
     def __iter__(self):
         return iter(self.words)
 
+    def _build_cells(self) -> MutableMapping[Tuple[int, int], Tuple[BoardWord, int]]:
+        cells: MutableMapping[Tuple[int, int], Tuple[BoardWord, int]] = {}
+        for word in self.words:
+            self._validate_word(cells, word)
+            self._index_word(cells, word)
+
+        return cells
+
+    def _get_cells(self) -> MutableMapping[Tuple[int, int], Tuple[BoardWord, int]]:
+        if self._cells is None:
+            self._cells = self._build_cells()
+        return self._cells
+
+    @staticmethod
+    def _validate_word(cells: Mapping[Tuple[int, int], Tuple[BoardWord, int]], word: BoardWord) -> None:
+        for offset, position in enumerate(word.path):
+            cell = cells.get(position)
+            if cell is not None and cell[0].word[cell[1]] != word.word[offset]:
+                raise WordIntersectionError('Words intersection does not match')
+
+    @staticmethod
+    def _index_word(cells: MutableMapping[Tuple[int, int], Tuple[BoardWord, int]], word: BoardWord) -> None:
+        for offset, position in enumerate(word.path):
+            cells.setdefault(position, (word, offset))
+
     def add_word(self, word: BoardWord) -> None:
-        for w in self.words:
-            w.validate_intersection(word)
+        cells = self._get_cells()
+        self._validate_word(cells, word)
 
         self.words.append(word)
+        self._index_word(cells, word)
+
+    def truncate(self, length: int) -> None:
+        del self.words[length:]
+        self._cells = None
 
     def letter_at(self, x: int, y: int) -> Optional[str]:
-        for word in self.words:
-            letter = word.letter_at(x, y)
-            if letter is not None:
-                return letter
-        return None
+        cell = self._get_cells().get((x, y))
+        if cell is None:
+            return None
+        return cell[0].word[cell[1]]
 
     def intersects(self, word: BoardWord) -> bool:
         return bool(self.intersection(word))
 
     def intersection(self, word: BoardWord) -> Set[Tuple[int, int]]:
-        for w in self.words:
-            w.validate_intersection(word)
+        cells = self._get_cells()
+        self._validate_word(cells, word)
 
-        intersections = set()
-        for w in self.words:
-            intersections.update(w.intersection(word))
+        return {position for position in word.path if position in cells}
 
-        return intersections
 
+@slotted
+@dataclass(frozen=True)
+class BoardTile:
+    x: int
+    y: int
+    letter: str
+
+    @property
+    def position(self) -> Tuple[int, int]:
+        return (self.x, self.y)
 
+
+@slotted
 @dataclass
 class BoardSettings:
     width: int
@@ -166,10 +237,26 @@ class BoardSettings:
                     raise ValueError('Initial word does not fit the board')
 
 
+@slotted
+@dataclass
+class BoardSnapshot:
+    settings: BoardSettings
+    # letters of the cells row by row
+    grid: str
+    # bonuses, which were not used yet
+    bonuses: List[Bonus] = field(default_factory=list)
+    words: List[BoardWord] = field(default_factory=list)
+
+
 class Board:
+    # marks an empty cell in the snapshots' grid
+    SNAPSHOT_EMPTY_CELL = ' '
 
-    def __init__(self, settings: BoardSettings):
+    def __init__(self, settings: BoardSettings, alphabet: Optional[Alphabet] = None):
         self._settings = settings
+        self._alphabet = alphabet or get_alphabet()
+        # letter codes of the board cells, row by row
+        self._grid = bytearray(self._settings.width * self._settings.height)
         self._multiplier_map = [
             [1 for j in range(self._settings.width)]
             for i in range(self._settings.height)
@@ -181,51 +268,125 @@ class Board:
         if self._settings.init_word is not None:
             self.insert_words(BoardWords(words=[self._settings.init_word]))
 
+    @property
+    def alphabet(self) -> Alphabet:
+        return self._alphabet
+
+    @property
+    def settings(self) -> BoardSettings:
+        return self._settings
+
+    @property
+    def words(self) -> List[BoardWord]:
+        return list(self._words)
+
+    def snapshot(self) -> BoardSnapshot:
+        bonuses: MutableMapping[Tuple[int, int], Bonus] = {}
+        for bonus in self._settings.bonuses:
+            multiplier = self._multiplier_map[bonus.location_x][bonus.location_y]
+            if multiplier != 1:
+                bonuses[(bonus.location_x, bonus.location_y)] = Bonus(location_x=bonus.location_x,
+                                                                      location_y=bonus.location_y,
+                                                                      multiplier=multiplier)
+
+        return BoardSnapshot(
+            settings=self._settings,
+            grid=''.join(
+                self.SNAPSHOT_EMPTY_CELL if code == EMPTY_CELL else self._alphabet.letter(code)
+                for code in self._grid
+            ),
+            bonuses=list(bonuses.values()),
+            words=self.words,
+        )
+
+    @classmethod
+    def from_snapshot(cls, snapshot: BoardSnapshot, alphabet: Optional[Alphabet] = None) -> 'Board':
+        board = cls(snapshot.settings, alphabet)
+
+        if len(snapshot.grid) != len(board._grid):
+            raise ValueError('Snapshot grid does not fit the board')
+        board._grid = bytearray(
+            EMPTY_CELL if letter == cls.SNAPSHOT_EMPTY_CELL else board._alphabet.code(letter)
+            for letter in snapshot.grid
+        )
+
+        for row in board._multiplier_map:
+            row[:] = [1] * len(row)
+        for bonus in snapshot.bonuses:
+            board._multiplier_map[bonus.location_x][bonus.location_y] = bonus.multiplier
+
+        board._words = BoardWords(words=list(snapshot.words))
+
+        return board
+
+    def _contains(self, x: int, y: int) -> bool:
+        return 0 <= x < self._settings.width and 0 <= y < self._settings.height
+
+    def _cell(self, x: int, y: int) -> int:
+        if not self._contains(x, y):
+            return EMPTY_CELL
+        return self._grid[y * self._settings.width + x]
+
+    def letter_at(self, x: int, y: int) -> Optional[str]:
+        code = self._cell(x, y)
+        if code == EMPTY_CELL:
+            return None
+        return self._alphabet.letter(code)
+
     def _validate_insertion(self, word: BoardWord) -> None:
         has_letter_outside_existing_words = False
 
-        for offset, letter in enumerate(word.word):
-            if word.direction == WordDirection.RIGHT:
-                x, y = word.start_x + offset, word.start_y
-            else:
-                x, y = word.start_x, word.start_y + offset
-
+        for offset, (letter, (x, y)) in enumerate(zip(word.word, word.path)):
             if not (0 <= x < self._settings.width):
                 raise ValueError('Word Ox position is out of the board')
             if not (0 <= y < self._settings.height):
                 raise ValueError('Word Oy position is out of the board')
 
-            existing_letter = self._words.letter_at(x, y)
-            if existing_letter is not None and existing_letter != letter:
-                raise WordIntersectionError(f'Word is not fit: {word.word}[{offset}] != {existing_letter}')
-            elif existing_letter is None:
+            existing_code = self._cell(x, y)
+            if existing_code == EMPTY_CELL:
                 has_letter_outside_existing_words = True
+            elif existing_code != self._alphabet.code(letter):
+                existing_letter = self._alphabet.letter(existing_code)
+                raise WordIntersectionError(f'Word is not fit: {word.word}[{offset}] != {existing_letter}')
 
         if not has_letter_outside_existing_words:
             raise WordIntersectionError('Word consists of existing letters purely')
 
-    def get_letters_to_insert_words(self, words: BoardWords) -> List[str]:
-        current_words_positions = set()
-        for w in self._words:
-            current_words_positions.update(set(w.path))
+    def get_tiles_to_insert_words(self, words: BoardWords) -> List[BoardTile]:
+        new_letters_positions: Set[Tuple[int, int]] = set()
+        new_tiles: List[BoardTile] = []
 
-        new_words_positions = set()
         for w in words:
-            new_words_positions.update(set(w.path))
+            for letter, position in zip(w.word, w.path):
+                if position not in new_letters_positions and self._cell(position[0], position[1]) == EMPTY_CELL:
+                    new_letters_positions.add(position)
+                    new_tiles.append(BoardTile(x=position[0], y=position[1], letter=letter))
 
-        new_letters: List[str] = []
-        new_letters_positions = new_words_positions.difference(current_words_positions)
-        for position in new_letters_positions:
-            new_letters.append(words.letter_at(position[0], position[1]))  # type: ignore
+        return new_tiles
 
-        return new_letters
+    def get_letters_to_insert_words(self, words: BoardWords) -> List[str]:
+        return [tile.letter for tile in self.get_tiles_to_insert_words(words)]
 
     def insert_words(self, words: BoardWords) -> int:
+        grid = bytes(self._grid)
+        multiplier_map = [list(row) for row in self._multiplier_map]
+        words_count = len(self._words)
+
+        try:
+            return self._insert_words(words)
+        except Exception:
+            # words are inserted one by one, so restore the board in case any of them does not fit
+            self._grid[:] = grid
+            self._multiplier_map = multiplier_map
+            self._words.truncate(words_count)
+            raise
+
+    def _insert_words(self, words: BoardWords) -> int:
         add_score = 0
 
         for word in words:
             if len(self._words) > 0:
-                has_intersection = any(w.intersects(word) for w in self._words)
+                has_intersection = any(self._cell(x, y) != EMPTY_CELL for x, y in word.path)
                 if not has_intersection:
                     raise WordIntersectionError('New word must intersect with at least one existing word')
 
@@ -233,11 +394,97 @@ class Board:
 
             add_score += self.word_score(word)
             self._words.add_word(word)
+            self._place_word(word)
 
             self._cleanup_used_bonuses(word)
 
         return add_score
 
+    def _derive_word(self, tiles: Mapping[Tuple[int, int], int], x: int, y: int,
+                     direction: WordDirection) -> BoardWord:
+        dx, dy = (1, 0) if direction == WordDirection.RIGHT else (0, 1)
+
+        def code_at(x: int, y: int) -> int:
+            return tiles.get((x, y), EMPTY_CELL) or self._cell(x, y)
+
+        while code_at(x - dx, y - dy) != EMPTY_CELL:
+            x, y = x - dx, y - dy
+
+        start_x, start_y = x, y
+        codes = bytearray()
+        while code_at(x, y) != EMPTY_CELL:
+            codes.append(code_at(x, y))
+            x, y = x + dx, y + dy
+
+        return BoardWord(word=''.join(self._alphabet.decode(codes)), start_x=start_x, start_y=start_y,
+                         direction=direction)
+
+    def insert_tiles(self, tiles: Sequence[BoardTile]) -> Tuple[BoardWords, int]:
+        """Place new tiles onto the board.
+
+        The main word along the tiles line and all perpendicular words through the tiles are derived from the grid,
+        so every word formed by the move gets validated and scored.
+        Returns the formed words and the move score.
+        """
+        placed: MutableMapping[Tuple[int, int], int] = {}
+
+        for tile in tiles:
+            if not (0 <= tile.x < self._settings.width):
+                raise ValueError('Tile Ox position is out of the board')
+            if not (0 <= tile.y < self._settings.height):
+                raise ValueError('Tile Oy position is out of the board')
+            if self._cell(tile.x, tile.y) != EMPTY_CELL:
+                raise WordIntersectionError(f'Cell {tile.position} is already filled')
+            if tile.position in placed:
+                raise WordIntersectionError(f'Cell {tile.position} is filled twice')
+
+            placed[tile.position] = self._alphabet.code(tile.letter)
+
+        if not placed:
+            return BoardWords(), 0
+
+        if len({y for _, y in placed}) == 1:
+            direction, cross_direction = WordDirection.RIGHT, WordDirection.DOWN
+        elif len({x for x, _ in placed}) == 1:
+            direction, cross_direction = WordDirection.DOWN, WordDirection.RIGHT
+        else:
+            raise WordIntersectionError('Tiles must be placed in a single row or column')
+
+        first_x, first_y = min(placed)
+        main_word = self._derive_word(placed, first_x, first_y, direction)
+        if not all(position in main_word.path for position in placed):
+            raise WordIntersectionError('Tiles must form a single word')
+
+        words = [
+            word
+            for word in chain(
+                (main_word,),
+                (self._derive_word(placed, x, y, cross_direction) for x, y in placed),
+            )
+            if len(word.word) > 1
+        ] or [main_word]
+
+        if len(self._words) > 0:
+            if not any(position not in placed for word in words for position in word.path):
+                raise WordIntersectionError('New word must intersect with at least one existing word')
+
+        score = 0
+        for word in words:
+            score += self.word_score(word)
+            self._cleanup_used_bonuses(word)
+
+            self._words.add_word(word)
+
+        width = self._settings.width
+        for (x, y), code in placed.items():
+            self._grid[y * width + x] = code
+
+        return BoardWords(words=words), score
+
+    def _place_word(self, word: BoardWord) -> None:
+        for code, idx in zip(self._alphabet.encode(word.word), word.cells(self._settings.width)):
+            self._grid[idx] = code
+
     def _cleanup_used_bonuses(self, word: BoardWord) -> None:
         for x, y in word.path:
             self._multiplier_map[x][y] = 1
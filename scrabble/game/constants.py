@@ -4,3 +4,73 @@ MIN_BOARD_HEIGHT = 10
 PLAYER_MAX_LETTERS = 7
 
 BONUS_FOR_ALL_LETTERS_USED = 5
+
+LETTERS_DISTRIBUTION = {
+    'ru': {
+        # a bit modified from https://ru.wikipedia.org/wiki/%D0%A7%D0%B0%D1%81%D1%82%D0%BE%D1%82%D0%BD%D0%BE%D1%81%D1%82%D1%8C  # noqa
+        'а': 80,
+        'б': 16,
+        'в': 45,
+        'г': 17,
+        'д': 30,
+        'е': 85,
+        'ж': 10,
+        'з': 17,
+        'и': 74,
+        'й': 12,
+        'к': 35,
+        'л': 44,
+        'м': 32,
+        'н': 67,
+        'о': 110,
+        'п': 28,
+        'р': 47,
+        'с': 55,
+        'т': 63,
+        'у': 26,
+        'ф': 3,
+        'х': 10,
+        'ц': 5,
+        'ч': 15,
+        'ш': 7,
+        'щ': 4,
+        'ъ': 1,
+        'ы': 19,
+        'ь': 17,
+        'э': 3,
+        'ю': 7,
+        'я': 20,
+    },
+    'en': {
+        # a bit modified from https://en.wikipedia.org/wiki/Letter_frequency
+        'a': 85,
+        'b': 15,
+        'c': 22,
+        'd': 43,
+        'e': 112,
+        'f': 22,
+        'g': 20,
+        'h': 61,
+        'i': 75,
+        'j': 20,
+        'k': 13,
+        'l': 40,
+        'm': 24,
+        'n': 67,
+        'o': 75,
+        'p': 19,
+        'q': 10,
+        'r': 76,
+        's': 63,
+        't': 93,
+        'u': 28,
+        'v': 10,
+        'w': 26,
+        'x': 20,
+        'y': 20,
+        'z': 10,
+    },
+}
+
+# game timeline keeps a state snapshot every this number of events
+TIMELINE_KEYFRAME_INTERVAL = 25
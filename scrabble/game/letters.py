@@ -1,6 +1,8 @@
 from itertools import chain
 from random import shuffle
-from typing import Mapping
+from typing import Iterator, Mapping
+
+from .alphabet import Alphabet
 
 __all__ = [
     'LetterBag',
@@ -16,30 +18,33 @@ class LetterBag:
 
         self._distribution = distribution
         self._letters_count = letters_count
+        self._alphabet = Alphabet(distribution)
 
         self._init_letters()
 
     def _init_letters(self) -> None:
         # each letter should occur at least once
-        self._letters = [letter for letter in self._distribution]
-        letters_count = self._letters_count - len(self._letters)
+        letters = [self._alphabet.code(letter) for letter in self._distribution]
+        letters_count = self._letters_count - len(letters)
 
         total_weight = sum(self._distribution.values())
-        self._letters.extend(chain.from_iterable(
-            letter * round(letters_count * weight / total_weight)
+        letters.extend(chain.from_iterable(
+            [self._alphabet.code(letter)] * round(letters_count * weight / total_weight)
             for letter, weight in self._distribution.items()
         ))
 
-        missing_letters_count = self._letters_count - len(self._letters)
+        missing_letters_count = self._letters_count - len(letters)
         ordered_distribution = sorted(self._distribution.items(), key=lambda it: it[1], reverse=True)
-        self._letters.extend(letter for letter, _ in ordered_distribution[:missing_letters_count])
-        shuffle(self._letters)
+        letters.extend(self._alphabet.code(letter) for letter, _ in ordered_distribution[:missing_letters_count])
+        shuffle(letters)
+
+        self._letters = bytearray(letters)
 
-    def __iter__(self):
-        return iter(self._letters)
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._alphabet.decode(self._letters))
 
     def __len__(self) -> int:
         return len(self._letters)
 
     def remove(self, key: str) -> None:
-        self._letters.remove(key)
+        self._letters.remove(self._alphabet.code(key))
@@ -2,6 +2,8 @@ from copy import deepcopy
 from dataclasses import dataclass, field
 from typing import Iterable, List
 
+from scrabble.utils import slotted
+
 from .constants import PLAYER_MAX_LETTERS
 
 __all__ = [
@@ -9,6 +11,7 @@ __all__ = [
 ]
 
 
+@slotted
 @dataclass
 class Player:
     username: str
@@ -1,17 +1,36 @@
+from copy import deepcopy
+from dataclasses import dataclass, field
 from operator import methodcaller
 from typing import Iterable, List, MutableMapping, MutableSet, Optional
 
+from scrabble.utils import slotted
+
+from .alphabet import Alphabet, get_alphabet
 from .api import (Event, GameInitEvent, GameInitParams, GameStartEvent, GameStartParams, PlayerAddLettersEvent,
                   PlayerAddLettersParams, PlayerMoveEvent, PlayerMoveParams)
-from .board import Board
+from .board import Board, BoardSnapshot, BoardWords
 from .constants import BONUS_FOR_ALL_LETTERS_USED, PLAYER_MAX_LETTERS
 from .player import Player
 
 __all__ = [
+    'GameStateSnapshot',
     'GameState',
 ]
 
 
+@slotted
+@dataclass
+class GameStateSnapshot:
+    game_id: int
+    sequence: int
+    players: List[Player] = field(default_factory=list)
+    # letters of the bag
+    letters: str = field(default='')
+    language: Optional[str] = field(default=None)
+    player_to_move: Optional[str] = field(default=None)
+    board: Optional[BoardSnapshot] = field(default=None)
+
+
 class GameState:
     EVENT_MAP = {
         PlayerAddLettersEvent: 'player_add_letters',
@@ -25,8 +44,13 @@ class GameState:
         self._players_by_username: MutableMapping[str, Player] = {}
         self._players_connected: MutableSet[str] = set()
         self._player_idx_turn: Optional[int] = None
-        self._letters: List[str] = []
+        # letter codes of the bag
+        self._letters = bytearray()
+        self._alphabet: Alphabet = get_alphabet()
         self._language: Optional[str] = None
+        self._board: Optional[Board] = None
+        # words formed by the latest move, including the cross words derived from its tiles
+        self._last_move_words = BoardWords()
         self._sequence = 0
         self._game_id = game_id
 
@@ -40,7 +64,7 @@ class GameState:
 
     @property
     def letters(self) -> List[str]:
-        return list(self._letters)
+        return self._alphabet.decode(self._letters)
 
     @property
     def game_id(self) -> int:
@@ -50,6 +74,52 @@ class GameState:
     def language(self) -> Optional[str]:
         return self._language
 
+    @property
+    def board(self) -> Board:
+        if self._board is None:
+            raise ValueError('Game is not initialized yet')
+        return self._board
+
+    @property
+    def players(self) -> List[Player]:
+        return list(self._players_order)
+
+    @property
+    def last_move_words(self) -> BoardWords:
+        return self._last_move_words
+
+    def snapshot(self) -> GameStateSnapshot:
+        return GameStateSnapshot(
+            game_id=self._game_id,
+            sequence=self._sequence,
+            players=deepcopy(self._players_order),
+            letters=''.join(self.letters),
+            language=self._language,
+            player_to_move=self.player_to_move,
+            board=self._board.snapshot() if self._board is not None else None,
+        )
+
+    @classmethod
+    def from_snapshot(cls, snapshot: GameStateSnapshot) -> 'GameState':
+        state = cls(snapshot.game_id)
+
+        state._sequence = snapshot.sequence
+        state._language = snapshot.language
+        if snapshot.language is not None:
+            state._alphabet = get_alphabet(snapshot.language)
+        state._letters = bytearray(state._alphabet.encode(snapshot.letters))
+
+        for player in deepcopy(snapshot.players):
+            if player.username == snapshot.player_to_move:
+                state._player_idx_turn = len(state._players_order)
+            state._players_order.append(player)
+            state._players_by_username[player.username] = player
+
+        if snapshot.board is not None:
+            state._board = Board.from_snapshot(snapshot.board, state._alphabet)
+
+        return state
+
     def apply_event(self, event: Event) -> None:
         if self.game_id != event.game_id:
             raise ValueError(f'Event belongs to the different game id ({self.game_id} != {event.game_id})')
@@ -63,10 +133,11 @@ class GameState:
         except KeyError:
             raise ValueError(f'Unknown event {event}')
 
-        self._sequence = event.sequence
-
+        # event handlers must leave the state untouched in case of errors
         methodcaller(f'event__{event_type}', event.params)(self)
 
+        self._sequence = event.sequence
+
     @property
     def player_to_move(self) -> Optional[str]:
         if self._player_idx_turn is None:
@@ -74,19 +145,35 @@ class GameState:
 
         return self._players_order[self._player_idx_turn].username
 
+    @property
+    def is_finished(self) -> bool:
+        """The game is started, the bag is empty and some player has used all their letters."""
+        if self._player_idx_turn is None or self._letters:
+            return False
+
+        return any(not player.letters for player in self._players_order)
+
     def get_player_state(self, player: str) -> Player:
         return self._players_by_username[player]
 
     def event__player_add_letters(self, params: PlayerAddLettersParams) -> None:
         player = self._players_by_username[params.player]
 
+        letters = bytearray(self._letters)
         for letter in params.letters:
-            self._letters.remove(letter)
+            letters.remove(self._alphabet.code(letter))
         player.fulfil_letters(params.letters)
 
+        self._letters = letters
+
     def event__game_init(self, params: GameInitParams) -> None:
-        self._board = Board(params.board_settings)
-        self._letters = list(params.letters)
+        alphabet = get_alphabet(params.lang)
+        board = Board(params.board_settings, alphabet)
+        letters = bytearray(alphabet.encode(params.letters))
+
+        self._alphabet = alphabet
+        self._board = board
+        self._letters = letters
         self._language = params.lang
 
         for username in params.players:
@@ -113,15 +200,30 @@ class GameState:
         if self._players_order[self._player_idx_turn] != player:
             raise ValueError('Player cannot do any moves now')
 
-        played_letters = self._board.get_letters_to_insert_words(params.words)
+        if params.tiles:
+            if len(params.words) > 0:
+                raise ValueError('Move must consist either of words or of tiles')
+            played_letters = [tile.letter for tile in params.tiles]
+        else:
+            played_letters = self.board.get_letters_to_insert_words(params.words)
 
-        score = self._board.insert_words(params.words)
+        player_letters = player.letters
+        player.play_letters(played_letters + params.exchange_letters)
+        try:
+            if params.tiles:
+                words, score = self.board.insert_tiles(params.tiles)
+            else:
+                words = params.words
+                score = self.board.insert_words(params.words)
+        except Exception:
+            player.letters = player_letters
+            raise
+
+        self._last_move_words = words
         player.add_score(score)
         if len(played_letters) == PLAYER_MAX_LETTERS:
             player.add_score(BONUS_FOR_ALL_LETTERS_USED)
 
-        player.play_letters(played_letters + params.exchange_letters)
-
         self._player_idx_turn += 1
         self._player_idx_turn %= len(self._players_order)
 
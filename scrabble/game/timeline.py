@@ -0,0 +1,96 @@
+from typing import Iterable, List, MutableMapping, Optional, Sequence
+
+from .api import Event
+from .constants import TIMELINE_KEYFRAME_INTERVAL
+from .state import GameState, GameStateSnapshot
+
+__all__ = [
+    'GameTimeline',
+]
+
+
+class GameTimeline:
+    """Game states along a list of events, which can be sought in both directions.
+
+    A snapshot (keyframe) of the state is kept every `keyframe_interval` events, so moving to any sequence replays
+    at most `keyframe_interval` events.
+    """
+
+    def __init__(self, game_id: int, events: Sequence[Event], *,
+                 keyframe_interval: int = TIMELINE_KEYFRAME_INTERVAL,
+                 snapshots: Iterable[GameStateSnapshot] = ()) -> None:
+        if keyframe_interval < 1:
+            raise ValueError('Keyframe interval must be positive')
+
+        self._game_id = game_id
+        self._events: List[Event] = []
+        self._keyframe_interval = keyframe_interval
+        self._keyframes: MutableMapping[int, GameStateSnapshot] = {}
+        # snapshots become keyframes once their events are added
+        self._pending_snapshots: MutableMapping[int, GameStateSnapshot] = {
+            snapshot.sequence: snapshot
+            for snapshot in snapshots
+            if snapshot.game_id == game_id and snapshot.sequence > 0
+        }
+        self._state = GameState(game_id)
+
+        for event in events:
+            self.add_event(event)
+
+    @property
+    def state(self) -> GameState:
+        return self._state
+
+    @property
+    def events(self) -> List[Event]:
+        return list(self._events)
+
+    @property
+    def sequence(self) -> int:
+        return self._state.latest_event_sequence
+
+    @property
+    def last_sequence(self) -> int:
+        return len(self._events)
+
+    def add_event(self, event: Event) -> None:
+        """Append the event to the end of the timeline (e.g. while the events are still being read)."""
+        self._events.append(event)
+
+        snapshot = self._pending_snapshots.pop(len(self._events), None)
+        if snapshot is not None and event.sequence == snapshot.sequence:
+            self._keyframes[snapshot.sequence] = snapshot
+
+    def _keyframe_before(self, sequence: int) -> Optional[GameStateSnapshot]:
+        keyframe_sequences = [
+            keyframe_sequence
+            for keyframe_sequence in self._keyframes
+            if keyframe_sequence <= sequence
+        ]
+        if not keyframe_sequences:
+            return None
+
+        return self._keyframes[max(keyframe_sequences)]
+
+    def seek(self, sequence: int) -> GameState:
+        if not 0 <= sequence <= self.last_sequence:
+            raise ValueError(f'Sequence must be between 0 and {self.last_sequence}, got {sequence}')
+
+        keyframe = self._keyframe_before(sequence)
+        keyframe_sequence = keyframe.sequence if keyframe is not None else 0
+        if sequence < self.sequence or keyframe_sequence > self.sequence:
+            self._state = GameState.from_snapshot(keyframe) if keyframe is not None else GameState(self._game_id)
+
+        for event in self._events[self.sequence:sequence]:
+            self._state.apply_event(event)
+
+            if self.sequence % self._keyframe_interval == 0 and self.sequence not in self._keyframes:
+                self._keyframes[self.sequence] = self._state.snapshot()
+
+        return self._state
+
+    def step_forward(self) -> GameState:
+        return self.seek(self.sequence + 1)
+
+    def step_back(self) -> GameState:
+        return self.seek(self.sequence - 1)
@@ -38,6 +38,7 @@ class EditorMode(Enum):
     CONFIRMATION = 3
     DELETE_PLAYER_LETTERS = 4
     ADD_PLAYER_LETTERS = 5
+    SEEK = 6
 
 
 @unique
@@ -83,7 +84,8 @@ SLEEP_BETWEEN_INPUT = 0.01  # sec
 
 ActionChars = namedtuple('ActionChars', ['close', 'delete', 'add_player_letters', 'save',
                                          'cancel', 'move_up', 'move_down', 'move_left',
-                                         'move_right', 'insert', 'confirm', 'reject'])
+                                         'move_right', 'insert', 'confirm', 'reject',
+                                         'step_forward', 'step_back', 'seek'])
 
 CONTROLS = {
     'en': ActionChars(
@@ -99,6 +101,9 @@ CONTROLS = {
         insert={'i', chr(curses.KEY_ENTER), chr(KeyCode.ENTER.value)},
         confirm={'y'},
         reject={'n'},
+        step_forward={'.', '>'},
+        step_back={',', '<'},
+        seek={'g'},
     ),
     'ru': ActionChars(
         close={'я'},
@@ -113,5 +118,8 @@ CONTROLS = {
         insert={'в', chr(curses.KEY_ENTER), chr(KeyCode.ENTER.value)},
         confirm={'д'},
         reject={'н'},
+        step_forward={'.', 'ю'},
+        step_back={',', 'б'},
+        seek={'п'},
     ),
 }
@@ -26,6 +26,10 @@ __all__ = [
 class CallbackConfig:
     # Callable(words[start_x, start_y, word, direction], letters)
     on_player_move: Optional[Callable[[Iterable[Tuple[int, int, str, str]], List[str]], None]] = field(default=None)
+    # replay only: Callable(number of events to step, negative to step back)
+    on_replay_step: Optional[Callable[[int], None]] = field(default=None)
+    # replay only: Callable(event sequence to jump to)
+    on_replay_seek: Optional[Callable[[int], None]] = field(default=None)
 
 
 @dataclass
@@ -153,6 +157,11 @@ class Window:
         self._show_confirmation_dialog = False
         self._confirmation_callback: Optional[Callable[[], None]] = None
 
+        # replay only: (current event sequence, last event sequence)
+        self._replay_position: Optional[Tuple[int, int]] = None
+        self._spectators_count = 0
+        self._seek_input = ''
+
     @property
     def running(self) -> bool:
         return self._running
@@ -162,7 +171,8 @@ class Window:
 
     def set_player_turn(self, player: str) -> None:
         self._player_turn = player
-        self._can_change_editor_mode = self._player_turn == self._player
+        # nothing takes the moves of the player without the callback
+        self._can_change_editor_mode = self._player_turn == self._player and self._callbacks.on_player_move is not None
 
         self.draw()
 
@@ -172,6 +182,40 @@ class Window:
 
     def register_callback(self, cb: CallbackConfig) -> None:
         self._callbacks.on_player_move = cb.on_player_move
+        self._callbacks.on_replay_step = cb.on_replay_step
+        self._callbacks.on_replay_seek = cb.on_replay_seek
+
+    @property
+    def _replay_enabled(self) -> bool:
+        return self._callbacks.on_replay_step is not None or self._callbacks.on_replay_seek is not None
+
+    def set_replay_position(self, sequence: int, last_sequence: int) -> None:
+        self._replay_position = (sequence, last_sequence)
+
+        self.draw()
+
+    def set_presence(self, players_connected: Iterable[str], spectators_count: int) -> None:
+        """Replace the connected players and the spectators count at once, drawing the window only once."""
+        self._players_connected = set(players_connected)
+        self._spectators_count = spectators_count
+
+        self.draw()
+
+    def reset(self) -> None:
+        """Forget all the game values, e.g. before drawing another game state from scratch."""
+        self._clear_player_values()
+        self._clear_recent_changes()
+
+        self._grid_words.clear()
+        self._bonuses.bonuses.clear()
+        self._player_turn = None
+        self._can_change_editor_mode = False
+        self._players.clear()
+        self._players_scores.clear()
+        self._players_connected.clear()
+        self._player_letters.clear()
+
+        self.draw()
 
     def player_connected(self, player) -> None:
         self._logger.info(f'Connected player "{player}"')
@@ -227,12 +271,24 @@ class Window:
         self._temp_words.clear()
         self._clear_recent_changes()
 
+        for word in words:
+            window_word = self._add_grid_word(*word)
+            self._recently_added_words.words.append(window_word)
+
+        self.draw()
+
+    def set_grid_words(self, words: Iterable[Tuple[int, int, str, str]]) -> None:
+        """Replace all grid words at once (e.g. restoring a snapshot) without marking them as recently added."""
+        self._temp_words.clear()
+        self._grid_words.clear()
+        self._clear_recent_changes()
+
         for word in words:
             self._add_grid_word(*word)
 
         self.draw()
 
-    def _add_grid_word(self, start_x: int, start_y: int, word: str, direction: str) -> None:
+    def _add_grid_word(self, start_x: int, start_y: int, word: str, direction: str) -> WindowWord:
         window_word = WindowWord()
 
         for offset, letter in enumerate(word):
@@ -249,7 +305,8 @@ class Window:
             window_word.letters.append(letter)
 
         self._grid_words.words.append(window_word)
-        self._recently_added_words.words.append(window_word)
+
+        return window_word
 
     def add_bonus(self, x: int, y: int, multiplier: int) -> None:
         self._bonuses.bonuses.append(WindowBonus(x=x, y=y, multiplier=multiplier))
@@ -341,6 +398,12 @@ class Window:
     def draw_editor_mode(self):
         height, width = self._window.getmaxyx()
         mode_str = f'Mode: {self._editor_mode.name}'
+        if self._editor_mode == EditorMode.SEEK:
+            mode_str += f' {self._seek_input}_'
+        if self._replay_position is not None:
+            mode_str += ' | Event: {}/{}'.format(*self._replay_position)
+        if self._spectators_count:
+            mode_str += f' | Spectators: {self._spectators_count}'
         self._window.addstr(height - 1, 0, mode_str, curses.color_pair(WindowColor.EDITOR_MODE.value))
 
     def draw_confirmation_dialog(self):
@@ -394,6 +457,10 @@ class Window:
             '<д>: Подтвердить выбор (_д_а).',
             '<н>: Отменить выбор (_н_ет).',
         ]
+        ru_replay_text = [
+            '<.>/<,>: Следующее/предыдущее событие.',
+            '<п>: _П_ерейти к событию. Введите номер события и нажмите <Enter>.',
+        ]
         en_text = [
             '<d>: Start _d_eleting player letters for exchange.',
             '<i>: Start _i_nserting words to the grid. You can use ONLY '
@@ -406,11 +473,15 @@ class Window:
             '<y>: Confirm your move.',
             '<n>: Unconfirm your move.',
         ]
+        en_replay_text = [
+            '<.>/<,>: Step to the next/previous event.',
+            '<g>: _G_o to the event. Type the event sequence and press <Enter>.',
+        ]
 
         if self._language == 'ru':
-            text = ru_text
+            text = ru_text + ru_replay_text if self._replay_enabled else ru_text
         else:
-            text = en_text
+            text = en_text + en_replay_text if self._replay_enabled else en_text
 
         for line in text:
             self._tutorial_box.add_line(line)
@@ -418,6 +489,9 @@ class Window:
         self._tutorial_box.draw(self._window)
 
     def draw(self) -> None:
+        if not self._running:
+            return
+
         self._window.clear()
 
         self.draw_grid()
@@ -478,7 +552,6 @@ class Window:
             cb(player_move_words, self._player_letters_to_remove)
 
     def run(self, window) -> None:
-        self._running = True
         self._window = window
         self._window.nodelay(True)
         self._height, self._width = self._window.getmaxyx()
@@ -499,6 +572,7 @@ class Window:
         self.init_colors()
 
         # start
+        self._running = True
         self.draw()
 
         while True:
@@ -549,6 +623,22 @@ class Window:
                     self._editor_mode = EditorMode.CONFIRMATION
                     self._show_confirmation_dialog = True
 
+                elif chr(ch) in CONTROLS[self._language].step_forward.union(CONTROLS[self._language].step_back):
+                    if self._callbacks.on_replay_step is None:
+                        curses.beep()
+                        continue
+
+                    step = 1 if chr(ch) in CONTROLS[self._language].step_forward else -1
+                    self._callbacks.on_replay_step(step)
+
+                elif chr(ch) in CONTROLS[self._language].seek:
+                    if self._callbacks.on_replay_seek is None:
+                        curses.beep()
+                        continue
+
+                    self._seek_input = ''
+                    self._editor_mode = EditorMode.SEEK
+
                 elif chr(ch) in CONTROLS[self._language].move_down:
                     self._cursor_y += 1
                 elif chr(ch) in CONTROLS[self._language].move_up:
@@ -680,6 +770,23 @@ class Window:
                             else:
                                 curses.beep()
 
+            elif self._editor_mode == EditorMode.SEEK:
+                if ch == KeyCode.ESCAPE.value:
+                    self._editor_mode = EditorMode.VIEW
+                elif ch in (KeyCode.ENTER.value, curses.KEY_ENTER):
+                    self._editor_mode = EditorMode.VIEW
+                    if self._seek_input:
+                        assert self._callbacks.on_replay_seek is not None
+                        self._callbacks.on_replay_seek(int(self._seek_input))
+                    else:
+                        curses.beep()
+                elif ch in (KeyCode.BACKSPACE.value, KeyCode.DELETE.value, curses.KEY_BACKSPACE):
+                    self._seek_input = self._seek_input[:-1]
+                elif '0' <= chr(ch) <= '9':
+                    self._seek_input += chr(ch)
+                else:
+                    curses.beep()
+
             elif self._editor_mode == EditorMode.DELETE_PLAYER_LETTERS:
                 if ch in (KeyCode.ESCAPE.value, KeyCode.ENTER.value):
                     self._editor_mode = EditorMode.VIEW
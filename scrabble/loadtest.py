@@ -0,0 +1,441 @@
+import asyncio
+import logging.config
+import os
+import random
+import shutil
+import socket
+import tempfile
+from copy import deepcopy
+from dataclasses import dataclass, field
+from enum import Enum
+from functools import partial
+from multiprocessing import Barrier, Pipe, Process, Queue
+from multiprocessing.connection import Connection
+from multiprocessing.synchronize import Barrier as BarrierType
+from threading import BrokenBarrierError
+from time import monotonic, perf_counter, process_time, sleep
+from typing import Iterable, List, MutableMapping, Optional, Sequence, Tuple
+from uuid import uuid4
+
+from scrabble.engine import ServerEngine
+from scrabble.game import BoardTile, GameState
+from scrabble.game.api import GameStartEvent, PlayerMoveEvent, PlayerMoveParams
+from scrabble.game.constants import PLAYER_MAX_LETTERS
+from scrabble.settings import LOADTEST_LOGGING_CONFIG
+from scrabble.storage import Durability, FileEventStore
+from scrabble.transport import Client, EventMessage, EventMessagePayload, EventStatus, WebsocketMessage
+
+__all__ = [
+    'MoveKind',
+    'LoadTestReport',
+    'LoadGenerator',
+    'percentile',
+    'make_move',
+    'merge_reports',
+    'run_load_test',
+]
+
+LOAD_TEST_HOST = '127.0.0.1'
+INITIAL_WORD = 'scrabble'
+# seconds to wait for the server, the connections and the start of the games
+SETUP_TIMEOUT = 30.0
+# seconds to wait for the outcome of a move
+MOVE_TIMEOUT = 10.0
+# random placements tried before passing the turn
+MOVE_ATTEMPTS = 20
+
+
+class MoveKind(Enum):
+    # a random letter of the player placed next to the letters on the board
+    RANDOM = 'random'
+    PASS = 'pass'
+
+
+def percentile(sorted_values: Sequence[float], q: float) -> float:
+    """Nearest-rank percentile of the sorted values."""
+    if not sorted_values:
+        return 0.0
+    rank = int(q / 100 * len(sorted_values) + 0.5)
+    return sorted_values[min(len(sorted_values), max(1, rank)) - 1]
+
+
+def make_move(state: GameState, player: str, kind: MoveKind = MoveKind.RANDOM,
+              rng: Optional[random.Random] = None) -> PlayerMoveEvent:
+    """Next move of the player, passing the turn if none of the tried placements is legal."""
+    rng = rng or random.Random()
+    sequence = state.latest_event_sequence + 1
+
+    letters = state.get_player_state(player).letters
+    words = state.board.words
+    if kind == MoveKind.RANDOM and letters and words:
+        for _ in range(MOVE_ATTEMPTS):
+            x, y = rng.choice(rng.choice(words).path)
+            dx, dy = rng.choice(((1, 0), (-1, 0), (0, 1), (0, -1)))
+            tile = BoardTile(x=x + dx, y=y + dy, letter=rng.choice(letters))
+            move = PlayerMoveEvent(params=PlayerMoveParams(player=player, tiles=[tile]), sequence=sequence,
+                                   game_id=state.game_id)
+            try:
+                deepcopy(state).apply_event(move)
+            except Exception:
+                continue
+            return move
+
+    return PlayerMoveEvent(params=PlayerMoveParams(player=player), sequence=sequence, game_id=state.game_id)
+
+
+@dataclass
+class LoadTestReport:
+    games: int = field(default=0)
+    connections: int = field(default=0)
+    duration: float = field(default=0.0)
+    moves: int = field(default=0)
+    rejected_moves: int = field(default=0)
+    timed_out_moves: int = field(default=0)
+    # approved moves received by all the connections of their games
+    deliveries: int = field(default=0)
+    # seconds from submitting a move till every connection of the game receives it approved
+    latencies: List[float] = field(default_factory=list, repr=False)
+    # CPU seconds of the server during the load and its peak resident memory
+    server_cpu: Optional[float] = field(default=None)
+    server_max_rss_kb: Optional[int] = field(default=None)
+    # CPU seconds of the load processes, the latencies are theirs as much as the server ones once it nears the duration
+    generator_cpu: float = field(default=0.0)
+
+    def format(self) -> str:
+        latencies = sorted(self.latencies)
+        duration = self.duration or 1.0
+        latency_stats = [f'p{q} {percentile(latencies, q) * 1000:.1f}ms' for q in (50, 95, 99)]
+        if latencies:
+            latency_stats.append(f'max {latencies[-1] * 1000:.1f}ms')
+
+        lines = [
+            f'Games: {self.games}, connections: {self.connections}, duration: {self.duration:.1f}s',
+            f'Moves: {self.moves} approved ({self.moves / duration:.1f}/s), {self.rejected_moves} rejected, '
+            f'{self.timed_out_moves} timed out',
+            f'Deliveries: {self.deliveries} ({self.deliveries / duration:.1f}/s)',
+            f'Submit-to-broadcast latency: {", ".join(latency_stats)}',
+        ]
+        if self.server_cpu is not None:
+            lines.append(f'Server CPU: {self.server_cpu:.2f}s ({self.server_cpu / duration * 100:.0f}% of a core)')
+        if self.server_max_rss_kb is not None:
+            lines.append(f'Server peak RSS: {self.server_max_rss_kb / 1024:.1f}MiB')
+        lines.append(f'Load generator CPU: {self.generator_cpu:.2f}s')
+        return '\n'.join(lines)
+
+
+def merge_reports(reports: Iterable[LoadTestReport]) -> LoadTestReport:
+    """Report of all the games from the reports of their parts."""
+    merged = LoadTestReport()
+    for report in reports:
+        merged.games += report.games
+        merged.connections += report.connections
+        merged.duration = max(merged.duration, report.duration)
+        merged.moves += report.moves
+        merged.rejected_moves += report.rejected_moves
+        merged.timed_out_moves += report.timed_out_moves
+        merged.deliveries += report.deliveries
+        merged.latencies.extend(report.latencies)
+        merged.generator_cpu += report.generator_cpu
+    return merged
+
+
+def _run_server(storage_path: str, port: int, game_ids: Sequence[int], durability: Durability,
+                commands: Connection) -> None:
+    server_engine = ServerEngine(FileEventStore(storage_path), durability=durability)
+    logging.config.dictConfig(LOADTEST_LOGGING_CONFIG)
+    # the games exist before their players connect
+    for game_id in game_ids:
+        server_engine.init_new_game(game_id)
+    server_engine.run_with_cmd(LOAD_TEST_HOST, port, read_cmd=commands.recv)
+
+
+def _read_proc_stats(pid: int) -> Optional[Tuple[float, int]]:
+    """CPU seconds and peak RSS (KiB) of the process, None without procfs."""
+    try:
+        with open(f'/proc/{pid}/stat') as fin:
+            # the fields after the command name, which may contain spaces
+            stat_fields = fin.read().rsplit(')', 1)[1].split()
+        with open(f'/proc/{pid}/status') as fin:
+            peak_rss = next(int(line.split()[1]) for line in fin if line.startswith('VmHWM:'))
+    except (OSError, StopIteration):
+        return None
+
+    # utime and stime, in clock ticks
+    return (int(stat_fields[11]) + int(stat_fields[12])) / os.sysconf('SC_CLK_TCK'), peak_rss
+
+
+def _find_free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind((LOAD_TEST_HOST, 0))
+        return sock.getsockname()[1]
+
+
+def _make_storage_path(storage_path: Optional[str]) -> str:
+    """New directory of the run, under the storage path if any, so the games of earlier runs do not clash."""
+    if storage_path is not None:
+        os.makedirs(storage_path, exist_ok=True)
+    return tempfile.mkdtemp(prefix='scrabble_loadtest_', dir=storage_path)
+
+
+def _wait_listening(port: int) -> None:
+    deadline = monotonic() + SETUP_TIMEOUT
+    while True:
+        try:
+            socket.create_connection((LOAD_TEST_HOST, port)).close()
+            return
+        except OSError:
+            if monotonic() > deadline:
+                raise RuntimeError('Server did not start')
+            sleep(0.1)
+
+
+class _Game:
+
+    def __init__(self, game_id: int, players: Sequence[str]) -> None:
+        self.game_id = game_id
+        self.players = list(players)
+        # approved events as received by the first player
+        self.state = GameState(game_id)
+        self.clients: MutableMapping[str, Client] = {}
+        self.started = asyncio.Event()
+        # the submitted move is settled once rejected or approved along with the letters drawn after it
+        self.pending_move: Optional[PlayerMoveEvent] = None
+        self.settled = asyncio.Event()
+        self.rejected = False
+
+    def is_settled(self) -> bool:
+        move = self.pending_move
+        if move is None or self.state.latest_event_sequence < move.sequence:
+            return False
+        letters = self.state.get_player_state(move.params.player).letters
+        return len(letters) == PLAYER_MAX_LETTERS or not self.state.letters
+
+
+class _GamesDriver:
+    """Players and spectators of a part of the games, playing their moves in a load process."""
+
+    def __init__(self, port: int, game_ids: Sequence[int], players: int, spectators: int, move_rate: float,
+                 duration: float, moves: MoveKind, seed: Optional[int]) -> None:
+        self._port = port
+        self._game_ids = list(game_ids)
+        self._players = players
+        self._spectators = spectators
+        self._move_rate = move_rate
+        self._duration = duration
+        self._moves = moves
+        self._rng = random.Random(seed)
+
+        self._games: List[_Game] = []
+        self._submit_times: MutableMapping[Tuple[int, int], float] = {}
+        self._authorized = 0
+        self._report = LoadTestReport(games=len(game_ids), connections=len(game_ids) * (players + spectators))
+
+    def run(self, barrier: BarrierType, results: Queue) -> None:
+        logging.config.dictConfig(LOADTEST_LOGGING_CONFIG)
+        try:
+            asyncio.run(self._run(barrier))
+        except BaseException:
+            barrier.abort()
+            raise
+        results.put(self._report)
+
+    async def _run(self, barrier: BarrierType) -> None:
+        loop = asyncio.get_event_loop()
+        addr = (LOAD_TEST_HOST, self._port)
+
+        clients = []
+        for game_id in self._game_ids:
+            game = _Game(game_id, [f'player{index}' for index in range(self._players)])
+            self._games.append(game)
+
+            for index, username in enumerate(game.players):
+                client = Client(username, game_id, on_new_msg=partial(self._on_msg, game, index == 0),
+                                on_authorized=self._on_authorized)
+                game.clients[username] = client
+                clients.append(client)
+            for index in range(self._spectators):
+                clients.append(Client(f'spectator{index}', game_id, on_new_msg=partial(self._on_msg, game, False),
+                                      spectator=True))
+        client_tasks = [asyncio.ensure_future(client.start(addr)) for client in clients]
+
+        try:
+            deadline = monotonic() + SETUP_TIMEOUT
+            while self._authorized < len(self._game_ids) * self._players:
+                if monotonic() > deadline:
+                    raise RuntimeError('Timed out waiting for the players to connect')
+                await asyncio.sleep(0.05)
+
+            # the server console starts the games once the players of all the load processes are connected
+            await loop.run_in_executor(None, barrier.wait, SETUP_TIMEOUT)
+            await asyncio.wait_for(asyncio.gather(*(game.started.wait() for game in self._games)), SETUP_TIMEOUT)
+
+            await loop.run_in_executor(None, barrier.wait, SETUP_TIMEOUT)
+            start_cpu, start_time = process_time(), monotonic()
+            deadline = start_time + self._duration
+            await asyncio.gather(*(self._play(game, deadline) for game in self._games))
+            self._report.duration = monotonic() - start_time
+            self._report.generator_cpu = process_time() - start_cpu
+            await loop.run_in_executor(None, barrier.wait, MOVE_TIMEOUT + SETUP_TIMEOUT)
+        finally:
+            # the connections are closed before the server is stopped
+            for client in clients:
+                client.stop()
+            _, pending = await asyncio.wait(client_tasks, timeout=SETUP_TIMEOUT)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*client_tasks, return_exceptions=True)
+
+    def _on_authorized(self, latest_sequence: Optional[int]) -> None:
+        self._authorized += 1
+
+    def _on_msg(self, game: _Game, observer: bool, msg: WebsocketMessage) -> None:
+        if not isinstance(msg, EventMessage):
+            return
+
+        event = msg.payload.event
+        if msg.status == EventStatus.REJECTED:
+            pending = game.pending_move
+            if pending is not None and event.sequence == pending.sequence:
+                game.rejected = True
+                game.settled.set()
+            return
+
+        if isinstance(event, PlayerMoveEvent):
+            submitted = self._submit_times.get((game.game_id, event.sequence))
+            if submitted is not None:
+                self._report.latencies.append(perf_counter() - submitted)
+                self._report.deliveries += 1
+
+        if observer and event.sequence == game.state.latest_event_sequence + 1:
+            game.state.apply_event(event)
+            if isinstance(event, GameStartEvent):
+                game.started.set()
+            if game.is_settled():
+                game.settled.set()
+
+    async def _play(self, game: _Game, deadline: float) -> None:
+        interval = 1 / self._move_rate
+        # the games are spread over the interval instead of moving at once
+        next_time = monotonic() + self._rng.random() * interval
+
+        while next_time < deadline:
+            await asyncio.sleep(max(0.0, next_time - monotonic()))
+
+            player = game.state.player_to_move
+            assert player is not None
+            move = make_move(game.state, player, self._moves, self._rng)
+
+            game.pending_move = move
+            game.rejected = False
+            game.settled.clear()
+            self._submit_times[(game.game_id, move.sequence)] = perf_counter()
+            await game.clients[player].send(EventMessage(payload=EventMessagePayload(event=move,
+                                                                                     request_id=uuid4().hex),
+                                                         status=EventStatus.REQUESTED))
+            try:
+                await asyncio.wait_for(game.settled.wait(), MOVE_TIMEOUT)
+            except asyncio.TimeoutError:
+                self._report.timed_out_moves += 1
+            else:
+                if game.rejected:
+                    self._report.rejected_moves += 1
+                else:
+                    self._report.moves += 1
+            finally:
+                game.pending_move = None
+
+            # a game falling behind the rate does not catch up with a burst of moves
+            next_time = max(next_time + interval, monotonic())
+
+
+class LoadGenerator:
+    """Synthetic load of a local server: starts a `ServerEngine` process with M new games, connects N players (and
+    spectators) to every game from `jobs` load processes and plays moves in every game at the given rate."""
+
+    def __init__(self, games: int = 10, players: int = 2, spectators: int = 0, move_rate: float = 1.0,
+                 duration: float = 30.0, moves: MoveKind = MoveKind.RANDOM, seed: Optional[int] = None,
+                 durability: Durability = Durability.EVENT, storage_path: Optional[str] = None,
+                 port: Optional[int] = None, jobs: Optional[int] = None) -> None:
+        if games < 1 or players < 1 or move_rate <= 0 or duration <= 0:
+            raise ValueError('Load test needs at least one game and player, positive move rate and duration')
+
+        self._games = games
+        self._players = players
+        self._spectators = spectators
+        self._move_rate = move_rate
+        self._duration = duration
+        self._moves = moves
+        self._seed = seed
+        self._durability = durability
+        self._storage_path = storage_path
+        self._port = port
+        # one CPU is left for the server
+        self._jobs = min(games, jobs or max(1, (os.cpu_count() or 1) - 1))
+
+    def run(self) -> LoadTestReport:
+        storage_path = _make_storage_path(self._storage_path)
+        port = self._port or _find_free_port()
+        game_ids = list(range(1, self._games + 1))
+
+        commands_reader, commands_writer = Pipe(duplex=False)
+        server = Process(target=_run_server, args=(storage_path, port, game_ids, self._durability, commands_reader),
+                         daemon=True)
+        server.start()
+        server_pid = server.pid
+        assert server_pid is not None
+
+        barrier = Barrier(self._jobs + 1)
+        results: Queue = Queue()
+        load_processes = []
+        try:
+            _wait_listening(port)
+            for job in range(self._jobs):
+                seed = None if self._seed is None else self._seed + job
+                driver = _GamesDriver(port, game_ids[job::self._jobs], self._players, self._spectators,
+                                      self._move_rate, self._duration, self._moves, seed)
+                load_process = Process(target=driver.run, args=(barrier, results), daemon=True)
+                load_process.start()
+                load_processes.append(load_process)
+
+            try:
+                barrier.wait(SETUP_TIMEOUT)
+                for game_id in game_ids:
+                    commands_writer.send(f'start {game_id} {INITIAL_WORD}')
+                barrier.wait(SETUP_TIMEOUT)
+                start_stats = _read_proc_stats(server_pid)
+                barrier.wait(self._duration + MOVE_TIMEOUT + SETUP_TIMEOUT)
+                end_stats = _read_proc_stats(server_pid)
+            except BrokenBarrierError:
+                raise RuntimeError('Load test failed, see the errors of the load processes')
+
+            report = merge_reports(results.get(timeout=SETUP_TIMEOUT) for _ in load_processes)
+            for load_process in load_processes:
+                load_process.join()
+        finally:
+            for load_process in load_processes:
+                if load_process.is_alive():
+                    load_process.terminate()
+            commands_writer.send('q')
+            server.join(SETUP_TIMEOUT)
+            if server.is_alive():
+                server.terminate()
+            if self._storage_path is None:
+                shutil.rmtree(storage_path, ignore_errors=True)
+
+        # the server stats are known only where there is procfs
+        if start_stats is not None and end_stats is not None:
+            report.server_cpu = end_stats[0] - start_stats[0]
+            report.server_max_rss_kb = end_stats[1]
+        return report
+
+
+def run_load_test(games: int = 10, players: int = 2, spectators: int = 0, move_rate: float = 1.0,
+                  duration: float = 30.0, moves: MoveKind = MoveKind.RANDOM, seed: Optional[int] = None,
+                  durability: Durability = Durability.EVENT, storage_path: Optional[str] = None,
+                  port: Optional[int] = None, jobs: Optional[int] = None) -> LoadTestReport:
+    generator = LoadGenerator(games=games, players=players, spectators=spectators, move_rate=move_rate,
+                              duration=duration, moves=moves, seed=seed, durability=durability,
+                              storage_path=storage_path, port=port, jobs=jobs)
+    report = generator.run()
+    print(report.format())
+    return report
@@ -1 +1,2 @@
 from .board import *  # noqa
+from .state import *  # noqa
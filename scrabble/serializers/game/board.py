@@ -1,12 +1,14 @@
 from marshmallow_dataclass import class_schema
 
-from scrabble.game import BoardSettings, BoardWord, BoardWords, Bonus
+from scrabble.game import BoardSettings, BoardSnapshot, BoardTile, BoardWord, BoardWords, Bonus
 
 __all__ = [
     'BoardSettingsSchema',
     'BonusSchema',
     'BoardWordSchema',
     'BoardWordsSchema',
+    'BoardTileSchema',
+    'BoardSnapshotSchema',
 ]
 
 
@@ -14,3 +16,5 @@ BoardSettingsSchema = class_schema(BoardSettings)
 BonusSchema = class_schema(Bonus)
 BoardWordSchema = class_schema(BoardWord)
 BoardWordsSchema = class_schema(BoardWords)
+BoardTileSchema = class_schema(BoardTile)
+BoardSnapshotSchema = class_schema(BoardSnapshot)
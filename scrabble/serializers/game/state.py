@@ -0,0 +1,10 @@
+from marshmallow_dataclass import class_schema
+
+from scrabble.game import GameStateSnapshot
+
+__all__ = [
+    'GameStateSnapshotSchema',
+]
+
+
+GameStateSnapshotSchema = class_schema(GameStateSnapshot)
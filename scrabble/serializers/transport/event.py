@@ -12,6 +12,9 @@ __all__ = [
 
 class EventMessagePayloadSchema(Schema):
     event = fields.Nested(EventSchema)
+    request_id = fields.String(allow_none=True)
+    reason = fields.String(allow_none=True)
+    latest_sequence = fields.Integer(allow_none=True)
 
     @post_load
     def make(self, data, **kwargs) -> EventMessagePayload:
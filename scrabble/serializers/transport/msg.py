@@ -10,8 +10,8 @@ from scrabble.transport import MessageType
 from scrabble.transport.event import EventMessage
 from scrabble.transport.msg import (AuthMessageRequest, AuthMessageRequestPayload, AuthMessageResponse,
                                     AuthMessageResponsePayload, EndConnectionMessage, EndConnectionPayload,
-                                    NewConnectionMessage, NewConnectionPayload, WebsocketMessage,
-                                    WebsocketMessagePayload)
+                                    NewConnectionMessage, NewConnectionPayload, PresenceMessage, PresencePayload,
+                                    SnapshotMessage, SnapshotPayload, WebsocketMessage, WebsocketMessagePayload)
 
 from .event import EventMessageSchema
 
@@ -24,6 +24,10 @@ __all__ = [
     'NewConnectionMessageSchema',
     'EndConnectionPayloadSchema',
     'EndConnectionMessageSchema',
+    'PresencePayloadSchema',
+    'PresenceMessageSchema',
+    'SnapshotPayloadSchema',
+    'SnapshotMessageSchema',
     'WebsocketMessagePayloadSchema',
     'WebsocketMessageSchema',
 ]
@@ -37,6 +41,10 @@ NewConnectionPayloadSchema = marshmallow_dataclass.class_schema(NewConnectionPay
 NewConnectionMessageSchema = marshmallow_dataclass.class_schema(NewConnectionMessage)
 EndConnectionPayloadSchema = marshmallow_dataclass.class_schema(EndConnectionPayload)
 EndConnectionMessageSchema = marshmallow_dataclass.class_schema(EndConnectionMessage)
+PresencePayloadSchema = marshmallow_dataclass.class_schema(PresencePayload)
+PresenceMessageSchema = marshmallow_dataclass.class_schema(PresenceMessage)
+SnapshotPayloadSchema = marshmallow_dataclass.class_schema(SnapshotPayload)
+SnapshotMessageSchema = marshmallow_dataclass.class_schema(SnapshotMessage)
 WebsocketMessagePayloadSchema = marshmallow_dataclass.class_schema(WebsocketMessagePayload)
 
 
@@ -49,6 +57,8 @@ class WebsocketMessageSchema(Schema):
         MessageType.NEW_CONNECTION: NewConnectionMessageSchema,
         MessageType.END_CONNECTION: EndConnectionMessageSchema,
         MessageType.EVENT: EventMessageSchema,
+        MessageType.PRESENCE: PresenceMessageSchema,
+        MessageType.SNAPSHOT: SnapshotMessageSchema,
     }
     MESSAGE_TYPE_MAP = {
         AuthMessageRequest: MessageType.AUTH_REQUEST,
@@ -56,6 +66,8 @@ class WebsocketMessageSchema(Schema):
         NewConnectionMessage: MessageType.NEW_CONNECTION,
         EndConnectionMessage: MessageType.END_CONNECTION,
         EventMessage: MessageType.EVENT,
+        PresenceMessage: MessageType.PRESENCE,
+        SnapshotMessage: MessageType.SNAPSHOT,
     }
 
     def load(self, data, **kwargs) -> WebsocketMessage:
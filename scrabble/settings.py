@@ -105,3 +105,36 @@ REPLAY_LOGGING_CONFIG = {
     },
     'loggers': {'': {'handlers': ('log_file',), 'level': 'DEBUG'}},
 }
+
+# the server and the players of the load test log their progress to the file, only the problems to the console
+LOADTEST_LOGGING_CONFIG = {
+    'version': 1,
+    'formatters': {
+        'generic': {
+            'format': '%(levelname)-5.5s [%(name)s] %(message)s',
+            'datefmt': '%H:%M:%S',
+        },
+        'simple': {
+            'format': '%(message)s',
+        },
+    },
+    'handlers': {
+        'log_file': {
+            'level': 'NOTSET',
+            'class': 'logging.FileHandler',
+            'formatter': 'generic',
+            'filename': LOG_FILE_PATH,
+        },
+        'console': {
+            'level': 'WARNING',
+            'class': 'logging.StreamHandler',
+            'formatter': 'simple',
+        },
+    },
+    'loggers': {
+        '': {
+            'handlers': ('log_file', 'console'),
+            'level': 'DEBUG',
+        },
+    },
+}
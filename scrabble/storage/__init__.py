@@ -0,0 +1,6 @@
+from .archive import *  # noqa
+from .base import *  # noqa
+from .file import *  # noqa
+from .log import *  # noqa
+from .sqlite import *  # noqa
+from .writer import *  # noqa
@@ -0,0 +1,93 @@
+import json
+import lzma
+import os
+import struct
+import zlib
+from enum import Enum, unique
+from typing import Any, List, Mapping, Sequence, Tuple
+
+from .log import RECORD_HEADER, encode_record
+
+__all__ = [
+    'ArchiveCompression',
+    'encode_archive',
+    'decode_archive',
+    'write_archive_file',
+    'read_archive_file',
+]
+
+ARCHIVE_FILE_SUFFIX = '_events.archive'
+
+# magic and compression of the archive, followed by a single length and CRC framed record
+ARCHIVE_HEADER = struct.Struct('>4sB')
+ARCHIVE_MAGIC = b'SCRA'
+
+
+@unique
+class ArchiveCompression(Enum):
+    ZLIB = 'zlib'
+    LZMA = 'lzma'
+
+
+_COMPRESSION_CODES = {
+    ArchiveCompression.ZLIB: 1,
+    ArchiveCompression.LZMA: 2,
+}
+
+
+def encode_archive(serialized_snapshot: Mapping[str, Any], serialized_events: Sequence[Mapping[str, Any]],
+                   compression: ArchiveCompression = ArchiveCompression.LZMA) -> bytes:
+    """Compress the final state snapshot of the game with all its events into a single record."""
+    payload = json.dumps({'snapshot': serialized_snapshot, 'events': serialized_events}).encode()
+    if compression == ArchiveCompression.ZLIB:
+        compressed = zlib.compress(payload, 9)
+    else:
+        compressed = lzma.compress(payload)
+
+    return ARCHIVE_HEADER.pack(ARCHIVE_MAGIC, _COMPRESSION_CODES[compression]) + encode_record(compressed)
+
+
+def decode_archive(data: bytes) -> Tuple[Any, List[Any]]:
+    """Serialized snapshot and events of the archive. Raises `ValueError` on a damaged archive."""
+    if len(data) < ARCHIVE_HEADER.size + RECORD_HEADER.size:
+        raise ValueError('Archive is too short')
+
+    magic, code = ARCHIVE_HEADER.unpack_from(data)
+    if magic != ARCHIVE_MAGIC:
+        raise ValueError('Not an archive')
+
+    length, crc = RECORD_HEADER.unpack_from(data, ARCHIVE_HEADER.size)
+    compressed = data[ARCHIVE_HEADER.size + RECORD_HEADER.size:]
+    if len(compressed) != length or zlib.crc32(compressed) != crc:
+        raise ValueError('Archive checksum mismatch')
+
+    if code == _COMPRESSION_CODES[ArchiveCompression.ZLIB]:
+        payload = zlib.decompress(compressed)
+    elif code == _COMPRESSION_CODES[ArchiveCompression.LZMA]:
+        payload = lzma.decompress(compressed)
+    else:
+        raise ValueError(f'Unknown archive compression {code}')
+
+    archive = json.loads(payload)
+    return archive['snapshot'], archive['events']
+
+
+def write_archive_file(file_path: str, data: bytes) -> None:
+    """Durably write the archive, replacing the previous one atomically."""
+    tmp_file_path = file_path + '.tmp'
+    with open(tmp_file_path, 'wb') as fout:
+        fout.write(data)
+        fout.flush()
+        os.fsync(fout.fileno())
+    os.replace(tmp_file_path, file_path)
+
+    fd = os.open(os.path.dirname(file_path) or '.', os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def read_archive_file(file_path: str) -> Tuple[Any, List[Any]]:
+    with open(file_path, 'rb') as fin:
+        return decode_archive(fin.read())
@@ -0,0 +1,113 @@
+from abc import ABC, abstractmethod
+from typing import Iterator, List, Optional, Sequence
+
+from scrabble.game import GameStateSnapshot
+from scrabble.game.api import Event
+
+from .archive import ArchiveCompression
+
+__all__ = [
+    'EventStore',
+    'find_snapshot',
+]
+
+# games were given random ids up to it before the ids were allocated by the store
+FIRST_ALLOCATED_GAME_ID = 1001
+# latest snapshots kept for every game: the latest one may be ahead of the durable events, so the one before it is kept
+KEPT_SNAPSHOTS = 2
+# number of events read at once while holding the lock of the store
+READ_BATCH_SIZE = 500
+
+
+class EventStore(ABC):
+    """Storage of game events and state snapshots.
+
+    Events of a game are appended in batches with contiguous sequences starting from 1 and read back by sequence ranges.
+    """
+
+    @abstractmethod
+    def append_events(self, game_id: int, events: Sequence[Event]) -> None:
+        """Append the events to the end of the game log. Raises `ValueError` if the sequences do not continue it."""
+
+    def append_event(self, game_id: int, event: Event) -> None:
+        self.append_events(game_id, [event])
+
+    @abstractmethod
+    def read_events(self, game_id: int, after_sequence: int = 0,
+                    until_sequence: Optional[int] = None) -> Iterator[Event]:
+        """Lazily read the events with `after_sequence < sequence <= until_sequence` in the order of sequences."""
+
+    @abstractmethod
+    def last_sequence(self, game_id: int) -> int:
+        """Sequence of the latest event of the game, 0 if there are no events."""
+
+    @abstractmethod
+    def game_exists(self, game_id: int) -> bool:
+        ...
+
+    def allocate_game_id(self) -> int:
+        """New game id, which is never allocated again, even by other processes sharing the store or after restarts."""
+        game_id = self._next_game_id()
+        # games saved with explicit ids are skipped
+        while self.game_exists(game_id):
+            game_id = self._next_game_id()
+        return game_id
+
+    @abstractmethod
+    def _next_game_id(self) -> int:
+        """Durably increment the persistent game id counter, which starts from `FIRST_ALLOCATED_GAME_ID`."""
+
+    @abstractmethod
+    def list_games(self, player: Optional[str] = None, updated_since: Optional[int] = None) -> List[int]:
+        """Ids of the games, optionally only of the player and with events since the timestamp."""
+
+    @abstractmethod
+    def save_snapshot(self, snapshot: GameStateSnapshot) -> None:
+        ...
+
+    @abstractmethod
+    def load_snapshots(self, game_id: int) -> List[GameStateSnapshot]:
+        """Snapshots of the game in the order of sequences."""
+
+    @abstractmethod
+    def archive_game(self, game_id: int, snapshot: GameStateSnapshot,
+                     compression: ArchiveCompression = ArchiveCompression.LZMA) -> None:
+        """Durably replace the log and snapshots of the game with a single compressed record of the snapshot
+        of its final state and all its events.
+
+        Archived games are still read as usual and unarchived on demand, once new events or snapshots are saved.
+        """
+
+    @abstractmethod
+    def is_archived(self, game_id: int) -> bool:
+        ...
+
+    def sync(self) -> None:
+        """Make all the appended events and saved snapshots durable (e.g. flush them to the disk)."""
+
+    def checkpoint(self) -> None:
+        """Record how much is written without syncing it, so opening the store again recovers fast."""
+
+    def close(self) -> None:
+        ...
+
+    def _check_sequences(self, game_id: int, events: Sequence[Event], last_sequence: int) -> None:
+        expected_sequence = last_sequence + 1
+        for event in events:
+            if event.game_id != game_id:
+                raise ValueError(f'Event belongs to the different game id ({game_id} != {event.game_id})')
+            if event.sequence != expected_sequence:
+                raise ValueError(f'Next event must have sequence = {expected_sequence}, got {event.sequence}')
+            expected_sequence += 1
+
+
+def find_snapshot(snapshots: Sequence[GameStateSnapshot],
+                  sequence: Optional[int] = None) -> Optional[GameStateSnapshot]:
+    """Latest snapshot at or below the sequence (any, if the sequence is not specified)."""
+    found = None
+    for snapshot in snapshots:
+        if sequence is not None and snapshot.sequence > sequence:
+            break
+        found = snapshot
+
+    return found
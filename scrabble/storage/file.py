@@ -0,0 +1,551 @@
+import fcntl
+import json
+import logging
+import os
+from pathlib import Path
+from threading import RLock
+from typing import Any, Iterator, List, MutableMapping, MutableSet, Optional, Sequence, TextIO
+
+from scrabble.game import GameStateSnapshot
+from scrabble.game.api import Event, GameInitEvent
+from scrabble.serializers.game import GameStateSnapshotSchema
+from scrabble.serializers.game.api import EventSchema
+
+from .archive import ARCHIVE_FILE_SUFFIX, ArchiveCompression, encode_archive, read_archive_file, write_archive_file
+from .base import FIRST_ALLOCATED_GAME_ID, KEPT_SNAPSHOTS, READ_BATCH_SIZE, EventStore
+from .log import (LOG_FILE_SUFFIX, EventLog, EventLogReader, get_checkpoint_file_path, get_index_file_path,
+                  read_log_records)
+
+__all__ = [
+    'read_serialized_events',
+    'read_file_serialized_events',
+    'read_events',
+    'get_events_file_game_id',
+    'get_snapshots_file_path',
+    'load_snapshots',
+    'load_archived_snapshot',
+    'save_snapshots',
+    'FileEventStore',
+]
+
+READ_CHUNK_SIZE = 64 * 1024
+
+EVENTS_FILE_SUFFIX = '_events.json'
+# JSON lines logs are read like the JSON files, but the store never writes them
+JSON_LINES_EVENTS_FILE_SUFFIX = '_events.jsonl'
+SNAPSHOTS_FILE_SUFFIX = '_snapshots.json'
+# events files written by the store, and all the events files which are read
+STORE_EVENTS_FILE_SUFFIXES = (LOG_FILE_SUFFIX, ARCHIVE_FILE_SUFFIX, EVENTS_FILE_SUFFIX)
+EVENTS_FILE_SUFFIXES = STORE_EVENTS_FILE_SUFFIXES + (JSON_LINES_EVENTS_FILE_SUFFIX,)
+
+DEFAULT_EVENTS_DIRECTORY = '/tmp/scrabble/'
+# counter of the allocated game ids and the lock of its updates shared by all processes using the directory
+GAME_ID_FILE_NAME = 'next_game_id'
+GAME_ID_LOCK_FILE_NAME = 'next_game_id.lock'
+
+
+def _iter_json_array(fin: TextIO, buffer: str, chunk_size: int) -> Iterator[Any]:
+    decoder = json.JSONDecoder()
+    eof = False
+    # the opening bracket is already checked
+    pos = 1
+    expect_value = True
+
+    while True:
+        while pos < len(buffer) and buffer[pos].isspace():
+            pos += 1
+
+        if pos >= len(buffer):
+            if eof:
+                raise ValueError('Unexpected end of the events array')
+            buffer = buffer[pos:] + fin.read(chunk_size)
+            pos = 0
+            eof = len(buffer) == 0
+            continue
+
+        if buffer[pos] == ']':
+            return
+
+        if not expect_value:
+            if buffer[pos] != ',':
+                raise ValueError(f'Expected "," between events, got "{buffer[pos]}"')
+            pos += 1
+            expect_value = True
+            continue
+
+        try:
+            value, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            value, end = None, None
+
+        # the value may be truncated at the chunk boundary, so it is decoded again with more data
+        if end is None or (end == len(buffer) and not eof):
+            chunk = fin.read(chunk_size)
+            if not chunk:
+                if end is None:
+                    raise ValueError('Unexpected end of the events array')
+                eof = True
+                continue
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            continue
+
+        yield value
+        pos = end
+        expect_value = False
+
+        if pos >= chunk_size:
+            buffer = buffer[pos:]
+            pos = 0
+
+
+def read_serialized_events(fin: TextIO, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[Any]:
+    """Yield serialized events one by one from a JSON array of events or from JSON lines (an event per line)."""
+    buffer = ''
+    while True:
+        chunk = fin.read(chunk_size)
+        if not chunk:
+            return
+        buffer = (buffer + chunk).lstrip()
+        if buffer:
+            break
+
+    if buffer[0] == '[':
+        yield from _iter_json_array(fin, buffer, chunk_size)
+        return
+
+    lines = buffer.splitlines(keepends=True)
+    if lines and not lines[-1].endswith('\n'):
+        # the last line may continue in the file
+        lines[-1] += fin.readline()
+
+    for line in lines:
+        if line.strip():
+            yield json.loads(line)
+    for line in fin:
+        if line.strip():
+            yield json.loads(line)
+
+
+def read_file_serialized_events(file_path: str) -> Iterator[Any]:
+    """Yield serialized events one by one from a framed log (`*_events.log`), an archive (`*_events.archive`)
+    or a JSON file."""
+    if file_path.endswith(LOG_FILE_SUFFIX):
+        for payload in read_log_records(file_path):
+            yield json.loads(payload)
+        return
+    if file_path.endswith(ARCHIVE_FILE_SUFFIX):
+        _, serialized_events = read_archive_file(file_path)
+        yield from serialized_events
+        return
+
+    with open(file_path, 'r') as fin:
+        yield from read_serialized_events(fin)
+
+
+def read_events(file_path: str, after_sequence: int = 0, until_sequence: Optional[int] = None) -> Iterator[Event]:
+    """Lazily load the events of the file with `after_sequence < sequence <= until_sequence`, so they can be processed
+    before the whole file is read.
+
+    A range of a framed log is read by its index, without decoding the other events (a torn record at the end
+    of the log is skipped then, while reading the whole log raises `ValueError` on it).
+    """
+    schema = EventSchema()
+
+    if file_path.endswith(LOG_FILE_SUFFIX) and (after_sequence > 0 or until_sequence is not None):
+        with EventLogReader(file_path) as reader:
+            # sequences of the log records are their positions
+            for payload in reader.read(after_sequence, until_sequence):
+                yield schema.load(json.loads(payload))
+        return
+
+    for serialized_event in read_file_serialized_events(file_path):
+        event = schema.load(serialized_event)
+        if event.sequence <= after_sequence:
+            continue
+        if until_sequence is not None and event.sequence > until_sequence:
+            return
+        yield event
+
+
+def get_events_file_game_id(file_path: str, suffixes: Sequence[str] = EVENTS_FILE_SUFFIXES) -> Optional[int]:
+    """Game id of the events file named `<game id><suffix>`, `None` for the other files."""
+    file_name = os.path.basename(file_path)
+    for suffix in suffixes:
+        if file_name.endswith(suffix) and file_name[:-len(suffix)].isdigit():
+            return int(file_name[:-len(suffix)])
+    return None
+
+
+def get_snapshots_file_path(events_file_path: str) -> str:
+    for suffix in EVENTS_FILE_SUFFIXES:
+        if events_file_path.endswith(suffix):
+            return events_file_path[:-len(suffix)] + SNAPSHOTS_FILE_SUFFIX
+    return events_file_path + SNAPSHOTS_FILE_SUFFIX
+
+
+def load_snapshots(file_path: str) -> List[GameStateSnapshot]:
+    try:
+        with open(file_path, 'r') as fin:
+            serialized_snapshots = json.load(fin)
+    except FileNotFoundError:
+        return []
+
+    snapshots = [GameStateSnapshotSchema().load(snapshot) for snapshot in serialized_snapshots]
+    return sorted(snapshots, key=lambda snapshot: snapshot.sequence)
+
+
+def load_archived_snapshot(file_path: str) -> GameStateSnapshot:
+    """Snapshot of the final state of the archived game."""
+    serialized_snapshot, _ = read_archive_file(file_path)
+    return GameStateSnapshotSchema().load(serialized_snapshot)
+
+
+def save_snapshots(file_path: str, snapshots: Sequence[GameStateSnapshot]) -> None:
+    # the file is replaced atomically, so a crash leaves either the previous or the new snapshots
+    tmp_file_path = file_path + '.tmp'
+    with open(tmp_file_path, 'w') as fout:
+        json.dump([GameStateSnapshotSchema().dump(snapshot) for snapshot in snapshots], fout)
+        fout.flush()
+        os.fsync(fout.fileno())
+    os.replace(tmp_file_path, file_path)
+
+
+def _append_to_json_array(file_path: str, serialized_values: str) -> None:
+    """Append comma-separated values to the JSON array of the file without rewriting it."""
+    try:
+        fout = open(file_path, 'r+b')
+    except FileNotFoundError:
+        with open(file_path, 'w') as new_fout:
+            new_fout.write(f'[{serialized_values}]')
+        return
+
+    with fout:
+        def last_char_before(pos: int) -> int:
+            while pos > 0:
+                fout.seek(pos - 1)
+                if not fout.read(1).isspace():
+                    return pos - 1
+                pos -= 1
+            raise ValueError(f'File {file_path} is not a JSON array')
+
+        closing_pos = last_char_before(fout.seek(0, os.SEEK_END))
+        fout.seek(closing_pos)
+        if fout.read(1) != b']':
+            raise ValueError(f'File {file_path} is not a JSON array')
+
+        value_end_pos = last_char_before(closing_pos)
+        fout.seek(value_end_pos)
+        separator = '' if fout.read(1) == b'[' else ', '
+
+        fout.seek(closing_pos)
+        fout.write(f'{separator}{serialized_values}]'.encode())
+        fout.truncate()
+
+
+class FileEventStore(EventStore):
+    """Events of every game in a framed log file `{game_id}_events.log` of the directory (or a JSON array file
+    `{game_id}_events.json` of the games saved before), snapshots of the game in the sibling `{game_id}_snapshots.json`
+    file. Archived games are kept in a single `{game_id}_events.archive` file."""
+
+    def __init__(self, directory: str = DEFAULT_EVENTS_DIRECTORY) -> None:
+        self._logger = logging.getLogger()
+
+        self._directory = directory
+        Path(directory).mkdir(parents=True, exist_ok=True)
+
+        self._schema = EventSchema()
+        # the writer thread and the threads loading the games use the store at once, the lock guards the caches
+        # and the files (reentrant, as the methods use each other)
+        self._lock = RLock()
+        # opened (and recovered) logs of the games
+        self._logs: MutableMapping[int, EventLog] = {}
+        # known last sequences and snapshots, so appending does not read the files
+        self._last_sequences: MutableMapping[int, int] = {}
+        self._snapshots: MutableMapping[int, List[GameStateSnapshot]] = {}
+        # files written since the latest sync
+        self._unsynced_file_paths: MutableSet[str] = set()
+        self._unsynced_logs: MutableSet[int] = set()
+        self._unsynced_directory = False
+
+    def get_file_path(self, game_id: int) -> str:
+        # the archive is complete, even if the archived files were not removed because of a crash
+        for suffix in (ARCHIVE_FILE_SUFFIX, EVENTS_FILE_SUFFIX):
+            file_path = os.path.join(self._directory, f'{game_id}{suffix}')
+            if os.path.exists(file_path):
+                return file_path
+        return self._get_log_file_path(game_id)
+
+    def _get_log_file_path(self, game_id: int) -> str:
+        return os.path.join(self._directory, f'{game_id}{LOG_FILE_SUFFIX}')
+
+    def _get_archive_file_path(self, game_id: int) -> str:
+        return os.path.join(self._directory, f'{game_id}{ARCHIVE_FILE_SUFFIX}')
+
+    def _get_log(self, game_id: int) -> Optional[EventLog]:
+        """Log of the game, `None` for JSON files and archives."""
+        if game_id not in self._logs:
+            file_path = self.get_file_path(game_id)
+            if not file_path.endswith(LOG_FILE_SUFFIX):
+                return None
+
+            self._unsynced_directory |= not os.path.exists(file_path)
+            log = self._logs[game_id] = EventLog(file_path)
+            if log.recovery.truncated_bytes:
+                self._logger.warning(f'Recovered {log.recovery.records} events of game #{game_id}, '
+                                     f'truncated {log.recovery.truncated_bytes} bytes of the damaged tail')
+            elif log.recovery.verified_records:
+                self._logger.info(f'Recovered {log.recovery.records} events of game #{game_id} '
+                                  f'({log.recovery.verified_records} after the checkpoint)')
+
+        return self._logs[game_id]
+
+    def append_events(self, game_id: int, events: Sequence[Event]) -> None:
+        if not events:
+            return
+
+        with self._lock:
+            if self.is_archived(game_id):
+                self._unarchive(game_id)
+
+            self._check_sequences(game_id, events, self.last_sequence(game_id))
+            serialized_events = [json.dumps(self._schema.dump(event)) for event in events]
+            log = self._get_log(game_id)
+            if log is not None:
+                log.append([serialized_event.encode() for serialized_event in serialized_events])
+                self._unsynced_logs.add(game_id)
+            else:
+                file_path = self.get_file_path(game_id)
+                _append_to_json_array(file_path, ', '.join(serialized_events))
+                self._unsynced_file_paths.add(file_path)
+
+            self._last_sequences[game_id] = events[-1].sequence
+
+    def read_events(self, game_id: int, after_sequence: int = 0,
+                    until_sequence: Optional[int] = None) -> Iterator[Event]:
+        if not self.game_exists(game_id):
+            return
+
+        last_read_sequence = after_sequence
+        while until_sequence is None or last_read_sequence < until_sequence:
+            end = last_read_sequence + READ_BATCH_SIZE
+            if until_sequence is not None:
+                end = min(end, until_sequence)
+
+            # the lock is not held between batches, so the writer thread is not blocked by slow readers
+            with self._lock:
+                log = self._get_log(game_id)
+                if log is None:
+                    # JSON files of the games saved before and archives are read at once
+                    events = list(read_events(self.get_file_path(game_id), last_read_sequence, until_sequence))
+                else:
+                    # sequences of the log records are their positions
+                    payloads = list(log.read(last_read_sequence, end))
+
+            if log is None:
+                yield from events
+                return
+
+            for payload in payloads:
+                yield self._schema.load(json.loads(payload))
+            if len(payloads) < end - last_read_sequence:
+                return
+            last_read_sequence = end
+
+    def last_sequence(self, game_id: int) -> int:
+        with self._lock:
+            if game_id not in self._last_sequences:
+                last_sequence = 0
+                if self.game_exists(game_id):
+                    log = self._get_log(game_id)
+                    if log is not None:
+                        last_sequence = len(log)
+                    else:
+                        for serialized_event in read_file_serialized_events(self.get_file_path(game_id)):
+                            last_sequence = serialized_event['sequence']
+                self._last_sequences[game_id] = last_sequence
+
+            return self._last_sequences[game_id]
+
+    def game_exists(self, game_id: int) -> bool:
+        return os.path.exists(self.get_file_path(game_id))
+
+    def _next_game_id(self) -> int:
+        file_path = os.path.join(self._directory, GAME_ID_FILE_NAME)
+
+        with open(os.path.join(self._directory, GAME_ID_LOCK_FILE_NAME), 'a') as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                try:
+                    with open(file_path, 'r') as fin:
+                        game_id = int(fin.read())
+                except FileNotFoundError:
+                    game_id = FIRST_ALLOCATED_GAME_ID
+
+                # the counter is replaced atomically and durably before the id is used
+                tmp_file_path = file_path + '.tmp'
+                with open(tmp_file_path, 'w') as fout:
+                    fout.write(str(game_id + 1))
+                    fout.flush()
+                    os.fsync(fout.fileno())
+                os.replace(tmp_file_path, file_path)
+                self._fsync_directory()
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+        return game_id
+
+    def _fsync_directory(self) -> None:
+        fd = os.open(self._directory, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def _game_players(self, game_id: int) -> List[str]:
+        for event in self.read_events(game_id, until_sequence=1):
+            if isinstance(event, GameInitEvent):
+                return event.params.players
+        return []
+
+    def _game_updated_since(self, game_id: int, timestamp: int) -> bool:
+        file_path = self.get_file_path(game_id)
+        # events cannot be newer than the file
+        if os.path.getmtime(file_path) < timestamp:
+            return False
+
+        return any(serialized_event['timestamp'] >= timestamp
+                   for serialized_event in read_file_serialized_events(file_path))
+
+    def list_games(self, player: Optional[str] = None, updated_since: Optional[int] = None) -> List[int]:
+        with self._lock:
+            game_ids = []
+            for file_name in os.listdir(self._directory):
+                game_id = get_events_file_game_id(file_name, STORE_EVENTS_FILE_SUFFIXES)
+                if game_id is not None:
+                    game_ids.append(game_id)
+
+            if player is not None:
+                game_ids = [game_id for game_id in game_ids if player in self._game_players(game_id)]
+            if updated_since is not None:
+                game_ids = [game_id for game_id in game_ids if self._game_updated_since(game_id, updated_since)]
+
+            return sorted(game_ids)
+
+    def save_snapshot(self, snapshot: GameStateSnapshot) -> None:
+        with self._lock:
+            if self.is_archived(snapshot.game_id):
+                self._unarchive(snapshot.game_id)
+
+            # the older snapshots are dropped, so the file does not grow along with the game
+            snapshots = (self.load_snapshots(snapshot.game_id) + [snapshot])[-KEPT_SNAPSHOTS:]
+
+            file_path = get_snapshots_file_path(self.get_file_path(snapshot.game_id))
+            save_snapshots(file_path, snapshots)
+            # the replaced file is durable once the directory entry is
+            self._unsynced_directory = True
+            self._snapshots[snapshot.game_id] = snapshots
+
+    def load_snapshots(self, game_id: int) -> List[GameStateSnapshot]:
+        with self._lock:
+            if game_id not in self._snapshots:
+                if self.is_archived(game_id):
+                    self._snapshots[game_id] = [load_archived_snapshot(self._get_archive_file_path(game_id))]
+                else:
+                    self._snapshots[game_id] = load_snapshots(get_snapshots_file_path(self.get_file_path(game_id)))
+
+            return list(self._snapshots[game_id])
+
+    def is_archived(self, game_id: int) -> bool:
+        return os.path.exists(self._get_archive_file_path(game_id))
+
+    def archive_game(self, game_id: int, snapshot: GameStateSnapshot,
+                     compression: ArchiveCompression = ArchiveCompression.LZMA) -> None:
+        with self._lock:
+            if self.is_archived(game_id):
+                return
+
+            serialized_events = [self._schema.dump(event) for event in self.read_events(game_id)]
+            if snapshot.game_id != game_id or snapshot.sequence != len(serialized_events):
+                raise ValueError(f'Snapshot of game #{snapshot.game_id} at sequence {snapshot.sequence} is not '
+                                 f'the final state of game #{game_id}')
+
+            data = encode_archive(GameStateSnapshotSchema().dump(snapshot), serialized_events, compression)
+            write_archive_file(self._get_archive_file_path(game_id), data)
+            self._remove_game_files(game_id)
+
+    def _remove_game_files(self, game_id: int) -> None:
+        """Remove the log and snapshots of the game, keeping the archive."""
+        log = self._logs.pop(game_id, None)
+        if log is not None:
+            log.close()
+        self._unsynced_logs.discard(game_id)
+        self._snapshots.pop(game_id, None)
+
+        log_file_path = self._get_log_file_path(game_id)
+        file_paths = [
+            log_file_path,
+            get_index_file_path(log_file_path),
+            get_checkpoint_file_path(log_file_path),
+            os.path.join(self._directory, f'{game_id}{EVENTS_FILE_SUFFIX}'),
+            get_snapshots_file_path(log_file_path),
+        ]
+        for file_path in file_paths:
+            self._unsynced_file_paths.discard(file_path)
+            if os.path.exists(file_path):
+                os.remove(file_path)
+
+    def _unarchive(self, game_id: int) -> None:
+        """Restore the log and snapshots of the archived game."""
+        archive_file_path = self._get_archive_file_path(game_id)
+        serialized_snapshot, serialized_events = read_archive_file(archive_file_path)
+        # files left by an interrupted archiving or unarchiving
+        self._remove_game_files(game_id)
+
+        log = EventLog(self._get_log_file_path(game_id))
+        log.append([json.dumps(serialized_event).encode() for serialized_event in serialized_events])
+        log.sync()
+        self._logs[game_id] = log
+
+        snapshots_file_path = get_snapshots_file_path(self._get_log_file_path(game_id))
+        snapshot = GameStateSnapshotSchema().load(serialized_snapshot)
+        save_snapshots(snapshots_file_path, [snapshot])
+        self._snapshots[game_id] = [snapshot]
+        self._unsynced_directory = True
+        self.sync()
+
+        # the archive is removed only once the restored files are durable
+        os.remove(archive_file_path)
+        self._logger.info(f'Unarchived game #{game_id}')
+
+    def sync(self) -> None:
+        with self._lock:
+            for game_id in self._unsynced_logs:
+                self._logs[game_id].sync()
+
+            file_paths = list(self._unsynced_file_paths)
+            if self._unsynced_directory:
+                # new files are durable once the directory entries are
+                file_paths.append(self._directory)
+
+            for file_path in file_paths:
+                fd = os.open(file_path, os.O_RDONLY)
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+
+            self._unsynced_file_paths.clear()
+            self._unsynced_logs.clear()
+            self._unsynced_directory = False
+
+    def checkpoint(self) -> None:
+        with self._lock:
+            for game_id in self._unsynced_logs:
+                self._logs[game_id].checkpoint()
+
+    def close(self) -> None:
+        with self._lock:
+            for log in self._logs.values():
+                log.close()
+            self._logs.clear()
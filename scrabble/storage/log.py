@@ -0,0 +1,354 @@
+import json
+import mmap
+import os
+import struct
+import zlib
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from types import TracebackType
+from typing import BinaryIO, Iterator, List, Optional, Sequence, Tuple, Type
+
+__all__ = [
+    'LogRecovery',
+    'EventLog',
+    'EventLogReader',
+    'encode_record',
+    'read_log_records',
+    'get_checkpoint_file_path',
+    'get_index_file_path',
+]
+
+LOG_FILE_SUFFIX = '_events.log'
+CHECKPOINT_FILE_SUFFIX = '_checkpoint.json'
+INDEX_FILE_SUFFIX = '_index.bin'
+
+# payload length and CRC32 of the payload
+RECORD_HEADER = struct.Struct('>II')
+# larger lengths can only come from a damaged header
+MAX_RECORD_SIZE = 16 * 1024 * 1024
+# offset of a record in the log, the index file is an array of them in the order of records
+INDEX_ENTRY = struct.Struct('>Q')
+
+
+@dataclass
+class LogRecovery:
+    # records kept in the log
+    records: int = field(default=0)
+    # records checked by CRC, i.e. written after the latest checkpoint
+    verified_records: int = field(default=0)
+    # size of the torn (or damaged) tail cut off the log
+    truncated_bytes: int = field(default=0)
+
+
+def encode_record(payload: bytes) -> bytes:
+    return RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def _decode_record(fin: BinaryIO) -> Optional[bytes]:
+    """Next record payload of the file, `None` at the end of the file. Raises `ValueError` on a torn or damaged
+    record."""
+    header = fin.read(RECORD_HEADER.size)
+    if not header:
+        return None
+    if len(header) < RECORD_HEADER.size:
+        raise ValueError('Torn record header')
+
+    length, crc = RECORD_HEADER.unpack(header)
+    if length > MAX_RECORD_SIZE:
+        raise ValueError(f'Record of invalid length {length}')
+
+    payload = fin.read(length)
+    if len(payload) < length:
+        raise ValueError('Torn record')
+    if zlib.crc32(payload) != crc:
+        raise ValueError('Record checksum mismatch')
+
+    return payload
+
+
+def read_log_records(file_path: str) -> Iterator[bytes]:
+    """Lazily read the payloads of the log records. Raises `ValueError` on a torn or damaged record."""
+    with open(file_path, 'rb') as fin:
+        while True:
+            payload = _decode_record(fin)
+            if payload is None:
+                return
+            yield payload
+
+
+def _get_sidecar_file_path(log_file_path: str, suffix: str) -> str:
+    if log_file_path.endswith(LOG_FILE_SUFFIX):
+        return log_file_path[:-len(LOG_FILE_SUFFIX)] + suffix
+    return log_file_path + suffix
+
+
+def get_checkpoint_file_path(log_file_path: str) -> str:
+    return _get_sidecar_file_path(log_file_path, CHECKPOINT_FILE_SUFFIX)
+
+
+def get_index_file_path(log_file_path: str) -> str:
+    return _get_sidecar_file_path(log_file_path, INDEX_FILE_SUFFIX)
+
+
+def _encode_index(offsets: Sequence[int]) -> bytes:
+    return struct.pack(f'>{len(offsets)}Q', *offsets)
+
+
+def _load_index(file_path: str, max_entries: Optional[int] = None) -> List[int]:
+    try:
+        with open(file_path, 'rb') as fin:
+            data = fin.read() if max_entries is None else fin.read(max_entries * INDEX_ENTRY.size)
+    except FileNotFoundError:
+        return []
+
+    # the last entry may be torn
+    entries = len(data) // INDEX_ENTRY.size
+    return list(struct.unpack_from(f'>{entries}Q', data))
+
+
+class EventLog:
+    """Append-only file of length and CRC framed records.
+
+    The sidecar checkpoint file keeps the number and size of the records synced to the disk, the sidecar index file
+    keeps the offsets of the records. Opening the log recovers it: records before the checkpoint are trusted (their
+    offsets are taken from the index), the ones after it are checked by CRC up to the first torn or damaged one,
+    which is truncated along with the rest of the file.
+    """
+
+    def __init__(self, file_path: str) -> None:
+        self._file_path = file_path
+        self._checkpoint_file_path = get_checkpoint_file_path(file_path)
+        self._index_file_path = get_index_file_path(file_path)
+
+        # appends always go to the end of the file, reads use `pread`, so they do not move the position
+        self._file = open(file_path, 'a+b')
+        self._index_file = open(self._index_file_path, 'a+b')
+        # offsets of the records in the file
+        self._offsets: List[int] = []
+        self._size = 0
+        # records of the latest saved checkpoint
+        self._checkpoint_records = 0
+
+        self.recovery = self._recover()
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    @property
+    def file_path(self) -> str:
+        return self._file_path
+
+    def append(self, payloads: Sequence[bytes]) -> None:
+        data = b''.join(encode_record(payload) for payload in payloads)
+        self._file.write(data)
+        self._file.flush()
+
+        offsets = []
+        for payload in payloads:
+            offsets.append(self._size)
+            self._size += RECORD_HEADER.size + len(payload)
+
+        # the index is written after the records, so it is never ahead of the log
+        self._index_file.write(_encode_index(offsets))
+        self._index_file.flush()
+        self._offsets.extend(offsets)
+
+    def read(self, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        """Payloads of the records with `start <= index < end`."""
+        end = len(self._offsets) if end is None else min(end, len(self._offsets))
+        for index in range(start, end):
+            offset = self._offsets[index]
+            record = os.pread(self._file.fileno(), self._record_end(index) - offset, offset)
+            yield record[RECORD_HEADER.size:]
+
+    def sync(self) -> None:
+        os.fsync(self._file.fileno())
+        os.fsync(self._index_file.fileno())
+        self._save_checkpoint()
+
+    def checkpoint(self) -> None:
+        """Checkpoint the written records without syncing them, so reopening the log after the process exits does not
+        verify them. The records are trusted as long as the OS does not crash before flushing them."""
+        if self._checkpoint_records != len(self._offsets):
+            self._save_checkpoint()
+
+    def close(self) -> None:
+        self._file.close()
+        self._index_file.close()
+
+    def _record_end(self, index: int) -> int:
+        if index + 1 < len(self._offsets):
+            return self._offsets[index + 1]
+        return self._size
+
+    def _records_end(self, fd: int) -> int:
+        """End of the last record by its header."""
+        if not self._offsets:
+            return 0
+
+        header = os.pread(fd, RECORD_HEADER.size, self._offsets[-1])
+        if len(header) < RECORD_HEADER.size:
+            return -1
+        length, _ = RECORD_HEADER.unpack(header)
+        return self._offsets[-1] + RECORD_HEADER.size + length
+
+    def _save_checkpoint(self) -> None:
+        tmp_file_path = self._checkpoint_file_path + '.tmp'
+        with open(tmp_file_path, 'w') as fout:
+            json.dump({'records': len(self._offsets), 'size': self._size}, fout)
+        # the checkpoint is replaced atomically, so it is either the previous or the new one after a crash
+        os.replace(tmp_file_path, self._checkpoint_file_path)
+        self._checkpoint_records = len(self._offsets)
+
+    def _load_checkpoint(self, file_size: int) -> Optional[Tuple[int, int]]:
+        """Number and size of the synced records."""
+        try:
+            with open(self._checkpoint_file_path, 'r') as fin:
+                checkpoint = json.load(fin)
+            records, size = int(checkpoint['records']), int(checkpoint['size'])
+        except FileNotFoundError:
+            return None
+        except (ValueError, KeyError, TypeError):
+            # the whole log is verified instead
+            return None
+
+        if size > file_size:
+            return None
+        return records, size
+
+    def _recover(self) -> LogRecovery:
+        fd = self._file.fileno()
+        file_size = os.fstat(fd).st_size
+
+        checkpoint = self._load_checkpoint(file_size)
+        if checkpoint is not None:
+            checkpoint_records, checkpoint_size = checkpoint
+            self._offsets = _load_index(self._index_file_path, checkpoint_records)
+            if len(self._offsets) == checkpoint_records and self._records_end(fd) == checkpoint_size:
+                self._size = checkpoint_size
+            else:
+                # only headers of the synced records are read to collect their offsets
+                self._offsets = []
+                offset = 0
+                while len(self._offsets) < checkpoint_records and offset < checkpoint_size:
+                    header = os.pread(fd, RECORD_HEADER.size, offset)
+                    if len(header) < RECORD_HEADER.size:
+                        break
+                    length, _ = RECORD_HEADER.unpack(header)
+                    self._offsets.append(offset)
+                    offset += RECORD_HEADER.size + length
+
+                if len(self._offsets) != checkpoint_records or offset != checkpoint_size:
+                    # the checkpoint does not match the log
+                    self._offsets = []
+                else:
+                    self._size = offset
+        trusted_records = len(self._offsets)
+
+        verified_records = 0
+        self._file.seek(self._size)
+        while self._size < file_size:
+            try:
+                payload = _decode_record(self._file)
+            except ValueError:
+                break
+            if payload is None:
+                break
+
+            self._offsets.append(self._size)
+            self._size += RECORD_HEADER.size + len(payload)
+            verified_records += 1
+
+        truncated_bytes = file_size - self._size
+        if truncated_bytes:
+            self._file.truncate(self._size)
+
+        self._checkpoint_records = trusted_records
+        # entries of the trusted records are kept, the rest are rewritten
+        self._index_file.truncate(trusted_records * INDEX_ENTRY.size)
+        self._index_file.write(_encode_index(self._offsets[trusted_records:]))
+        self._index_file.flush()
+
+        return LogRecovery(records=len(self._offsets), verified_records=verified_records,
+                           truncated_bytes=truncated_bytes)
+
+
+class EventLogReader:
+    """Read-only view of a log mapped to the memory, so reading a range of records decodes only them.
+
+    Offsets of the records come from the index file. Records appended after the index was written are found by their
+    headers, a torn record at the end (e.g. being written at the moment) is skipped.
+    """
+
+    def __init__(self, file_path: str) -> None:
+        self._file_path = file_path
+
+        with open(file_path, 'rb') as fin:
+            self._size = os.fstat(fin.fileno()).st_size
+            # empty files cannot be mapped
+            self._mmap = mmap.mmap(fin.fileno(), 0, access=mmap.ACCESS_READ) if self._size else None
+
+        self._offsets = self._load_offsets()
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def __enter__(self) -> 'EventLogReader':
+        return self
+
+    def __exit__(self, exc_type: Optional[Type[BaseException]], exc_value: Optional[BaseException],
+                 traceback: Optional[TracebackType]) -> None:
+        self.close()
+
+    def read(self, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        """Payloads of the records with `start <= index < end`. Raises `ValueError` on a damaged record."""
+        end = len(self._offsets) if end is None else min(end, len(self._offsets))
+        for index in range(start, end):
+            yield self._read_record(self._offsets[index])
+
+    def close(self) -> None:
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def _read_header(self, offset: int) -> Optional[Tuple[int, int]]:
+        """Length and CRC of the record at the offset, `None` if it is not complete."""
+        if self._mmap is None or offset + RECORD_HEADER.size > self._size:
+            return None
+
+        length, crc = RECORD_HEADER.unpack_from(self._mmap, offset)
+        if offset + RECORD_HEADER.size + length > self._size:
+            return None
+        return length, crc
+
+    def _read_record(self, offset: int) -> bytes:
+        header = self._read_header(offset)
+        if header is None:
+            raise ValueError(f'Torn record at offset {offset}')
+
+        assert self._mmap is not None
+        length, crc = header
+        payload = self._mmap[offset + RECORD_HEADER.size:offset + RECORD_HEADER.size + length]
+        if zlib.crc32(payload) != crc:
+            raise ValueError(f'Record checksum mismatch at offset {offset}')
+        return payload
+
+    def _load_offsets(self) -> List[int]:
+        offsets = _load_index(get_index_file_path(self._file_path))
+        # the index cannot point past the end of the mapped log
+        offsets = offsets[:bisect_left(offsets, self._size)]
+
+        offset = 0
+        if offsets:
+            header = self._read_header(offsets[-1])
+            if header is None:
+                offsets.pop()
+                return offsets
+            offset = offsets[-1] + RECORD_HEADER.size + header[0]
+
+        while True:
+            header = self._read_header(offset)
+            if header is None:
+                return offsets
+            offsets.append(offset)
+            offset += RECORD_HEADER.size + header[0]
@@ -0,0 +1,265 @@
+import json
+import os
+import sqlite3
+from threading import Lock
+from typing import Any, Iterator, List, Optional, Sequence, Tuple
+
+from scrabble.game import GameStateSnapshot
+from scrabble.game.api import Event, GameInitEvent
+from scrabble.serializers.game import GameStateSnapshotSchema
+from scrabble.serializers.game.api import EventSchema
+
+from .archive import ArchiveCompression, decode_archive, encode_archive
+from .base import FIRST_ALLOCATED_GAME_ID, KEPT_SNAPSHOTS, READ_BATCH_SIZE, EventStore
+
+__all__ = [
+    'SQLiteEventStore',
+]
+
+DEFAULT_DATABASE_PATH = '/tmp/scrabble/events.db'
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS events (
+    game_id INTEGER NOT NULL,
+    sequence INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    timestamp INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (game_id, sequence)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS events_timestamp ON events (timestamp);
+
+CREATE TABLE IF NOT EXISTS game_players (
+    player TEXT NOT NULL,
+    game_id INTEGER NOT NULL,
+    PRIMARY KEY (player, game_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS snapshots (
+    game_id INTEGER NOT NULL,
+    sequence INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (game_id, sequence)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS archives (
+    game_id INTEGER PRIMARY KEY,
+    last_sequence INTEGER NOT NULL,
+    updated_at INTEGER NOT NULL,
+    data BLOB NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+) WITHOUT ROWID;
+'''
+
+
+class SQLiteEventStore(EventStore):
+    """Events in a SQLite database (WAL mode) keyed by (game_id, sequence), with games indexed by players
+    and events by timestamps. Archived games are kept as a single compressed blob."""
+
+    def __init__(self, path: str = DEFAULT_DATABASE_PATH) -> None:
+        self._path = path
+        # the connection is shared by the server threads, the lock serializes its usage
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = Lock()
+
+        with self._lock:
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            # WAL keeps the database consistent on crashes, but with NORMAL the commits are not synced to the disk:
+            # `sync` makes all of them durable at once
+            self._connection.execute('PRAGMA synchronous=NORMAL')
+            self._connection.executescript(_SCHEMA)
+            with self._connection:
+                self._connection.execute("INSERT OR IGNORE INTO counters (name, value) VALUES ('next_game_id', ?)",
+                                         (FIRST_ALLOCATED_GAME_ID,))
+
+        self._event_schema = EventSchema()
+        self._snapshot_schema = GameStateSnapshotSchema()
+
+    def append_events(self, game_id: int, events: Sequence[Event]) -> None:
+        if not events:
+            return
+
+        serialized_events = [self._event_schema.dump(event) for event in events]
+        rows = [
+            (game_id, event.sequence, serialized_event['name'], event.timestamp, json.dumps(serialized_event))
+            for event, serialized_event in zip(events, serialized_events)
+        ]
+        players = [
+            (player, game_id)
+            for event in events
+            if isinstance(event, GameInitEvent)
+            for player in event.params.players
+        ]
+
+        with self._lock, self._connection:
+            self._unarchive(game_id)
+            self._check_sequences(game_id, events, self._last_sequence(game_id))
+            self._connection.executemany(
+                'INSERT INTO events (game_id, sequence, name, timestamp, data) VALUES (?, ?, ?, ?, ?)', rows)
+            self._connection.executemany('INSERT OR IGNORE INTO game_players (player, game_id) VALUES (?, ?)',
+                                         players)
+
+    def read_events(self, game_id: int, after_sequence: int = 0,
+                    until_sequence: Optional[int] = None) -> Iterator[Event]:
+        archive = self._load_archive(game_id)
+        if archive is not None:
+            _, serialized_events = archive
+            for serialized_event in serialized_events[after_sequence:until_sequence]:
+                yield self._event_schema.load(serialized_event)
+            return
+
+        last_read_sequence = after_sequence
+        while True:
+            limit = READ_BATCH_SIZE
+            if until_sequence is not None:
+                limit = min(limit, until_sequence - last_read_sequence)
+            if limit <= 0:
+                return
+
+            # the lock is not held between batches, so other threads are not blocked by slow readers
+            with self._lock:
+                rows = self._connection.execute(
+                    'SELECT sequence, data FROM events WHERE game_id = ? AND sequence > ? ORDER BY sequence LIMIT ?',
+                    (game_id, last_read_sequence, limit),
+                ).fetchall()
+
+            for sequence, data in rows:
+                yield self._event_schema.load(json.loads(data))
+                last_read_sequence = sequence
+
+            if len(rows) < limit:
+                return
+
+    def _next_game_id(self) -> int:
+        # the update takes the database write lock, so processes sharing the database never get the same id
+        # (it is durable along with the first synced events of the game)
+        with self._lock, self._connection:
+            self._connection.execute("UPDATE counters SET value = value + 1 WHERE name = 'next_game_id'")
+            row = self._connection.execute("SELECT value FROM counters WHERE name = 'next_game_id'").fetchone()
+        return row[0] - 1
+
+    def last_sequence(self, game_id: int) -> int:
+        with self._lock:
+            return self._last_sequence(game_id)
+
+    def _last_sequence(self, game_id: int) -> int:
+        row = self._connection.execute(
+            'SELECT COALESCE((SELECT MAX(sequence) FROM events WHERE game_id = ?), '
+            '(SELECT last_sequence FROM archives WHERE game_id = ?))',
+            (game_id, game_id),
+        ).fetchone()
+        return row[0] or 0
+
+    def game_exists(self, game_id: int) -> bool:
+        return self.last_sequence(game_id) > 0
+
+    def list_games(self, player: Optional[str] = None, updated_since: Optional[int] = None) -> List[int]:
+        query = ('SELECT DISTINCT games.game_id FROM ('
+                 'SELECT game_id, timestamp AS updated_at FROM events '
+                 'UNION ALL SELECT game_id, updated_at FROM archives) AS games')
+        params: List[object] = []
+        if player is not None:
+            query += ' JOIN game_players ON game_players.game_id = games.game_id AND game_players.player = ?'
+            params.append(player)
+        if updated_since is not None:
+            query += ' WHERE games.updated_at >= ?'
+            params.append(updated_since)
+        query += ' ORDER BY games.game_id'
+
+        with self._lock:
+            return [game_id for game_id, in self._connection.execute(query, params)]
+
+    def save_snapshot(self, snapshot: GameStateSnapshot) -> None:
+        data = json.dumps(self._snapshot_schema.dump(snapshot))
+
+        with self._lock, self._connection:
+            self._unarchive(snapshot.game_id)
+            self._connection.execute('INSERT OR REPLACE INTO snapshots (game_id, sequence, data) VALUES (?, ?, ?)',
+                                     (snapshot.game_id, snapshot.sequence, data))
+            self._connection.execute('DELETE FROM snapshots WHERE game_id = ? AND sequence NOT IN (SELECT sequence '
+                                     'FROM snapshots WHERE game_id = ? ORDER BY sequence DESC LIMIT ?)',
+                                     (snapshot.game_id, snapshot.game_id, KEPT_SNAPSHOTS))
+
+    def load_snapshots(self, game_id: int) -> List[GameStateSnapshot]:
+        archive = self._load_archive(game_id)
+        if archive is not None:
+            serialized_snapshot, _ = archive
+            return [self._snapshot_schema.load(serialized_snapshot)]
+
+        with self._lock:
+            rows = self._connection.execute('SELECT data FROM snapshots WHERE game_id = ? ORDER BY sequence',
+                                            (game_id,)).fetchall()
+
+        return [self._snapshot_schema.load(json.loads(data)) for data, in rows]
+
+    def is_archived(self, game_id: int) -> bool:
+        with self._lock:
+            row = self._connection.execute('SELECT 1 FROM archives WHERE game_id = ?', (game_id,)).fetchone()
+        return row is not None
+
+    def archive_game(self, game_id: int, snapshot: GameStateSnapshot,
+                     compression: ArchiveCompression = ArchiveCompression.LZMA) -> None:
+        if self.is_archived(game_id):
+            return
+
+        events = list(self.read_events(game_id))
+        if snapshot.game_id != game_id or snapshot.sequence != len(events):
+            raise ValueError(f'Snapshot of game #{snapshot.game_id} at sequence {snapshot.sequence} is not the final '
+                             f'state of game #{game_id}')
+
+        data = encode_archive(self._snapshot_schema.dump(snapshot),
+                              [self._event_schema.dump(event) for event in events], compression)
+        updated_at = max(event.timestamp for event in events) if events else 0
+
+        with self._lock, self._connection:
+            self._connection.execute(
+                'INSERT INTO archives (game_id, last_sequence, updated_at, data) VALUES (?, ?, ?, ?)',
+                (game_id, len(events), updated_at, data))
+            self._connection.execute('DELETE FROM events WHERE game_id = ?', (game_id,))
+            self._connection.execute('DELETE FROM snapshots WHERE game_id = ?', (game_id,))
+
+    def _load_archive(self, game_id: int) -> Optional[Tuple[Any, List[Any]]]:
+        with self._lock:
+            row = self._connection.execute('SELECT data FROM archives WHERE game_id = ?', (game_id,)).fetchone()
+
+        return decode_archive(row[0]) if row is not None else None
+
+    def _unarchive(self, game_id: int) -> None:
+        """Restore the events and snapshot of the archived game, must be called in a transaction."""
+        row = self._connection.execute('SELECT data FROM archives WHERE game_id = ?', (game_id,)).fetchone()
+        if row is None:
+            return
+
+        serialized_snapshot, serialized_events = decode_archive(row[0])
+        self._connection.executemany(
+            'INSERT INTO events (game_id, sequence, name, timestamp, data) VALUES (?, ?, ?, ?, ?)',
+            [
+                (game_id, serialized_event['sequence'], serialized_event['name'], serialized_event['timestamp'],
+                 json.dumps(serialized_event))
+                for serialized_event in serialized_events
+            ])
+        self._connection.execute('INSERT INTO snapshots (game_id, sequence, data) VALUES (?, ?, ?)',
+                                 (game_id, serialized_snapshot['sequence'], json.dumps(serialized_snapshot)))
+        self._connection.execute('DELETE FROM archives WHERE game_id = ?', (game_id,))
+
+    def sync(self) -> None:
+        """Sync the WAL with the committed transactions (and the database file with the checkpointed ones)."""
+        with self._lock:
+            for file_path in (self._path + '-wal', self._path):
+                try:
+                    fd = os.open(file_path, os.O_RDONLY)
+                except FileNotFoundError:
+                    # no WAL once all of it is checkpointed
+                    continue
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
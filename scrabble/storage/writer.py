@@ -0,0 +1,227 @@
+import logging
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass, field, replace
+from enum import Enum, unique
+from queue import Empty, Queue
+from threading import Lock, Thread
+from time import monotonic
+from typing import List, MutableMapping, Optional
+
+from scrabble.game import GameStateSnapshot
+from scrabble.game.api import Event
+
+from .archive import ArchiveCompression
+from .base import EventStore
+
+__all__ = [
+    'Durability',
+    'WriterMetrics',
+    'GroupCommitWriter',
+]
+
+
+@unique
+class Durability(Enum):
+    # every commit is synced before it is acknowledged
+    EVENT = 'event'
+    # commits are grouped for the interval and synced, so up to the interval of events may be lost
+    INTERVAL = 'interval'
+    # commits are acknowledged once written, the OS flushes them to the disk on its own
+    OS = 'os'
+
+
+@dataclass
+class WriterMetrics:
+    queue_depth: int = field(default=0)
+    max_queue_depth: int = field(default=0)
+    commits: int = field(default=0)
+    events: int = field(default=0)
+    snapshots: int = field(default=0)
+    archives: int = field(default=0)
+    failed_writes: int = field(default=0)
+    # seconds from enqueuing the oldest write of a commit till its acknowledgement
+    last_commit_latency: float = field(default=0.0)
+    max_commit_latency: float = field(default=0.0)
+    total_commit_latency: float = field(default=0.0)
+
+    @property
+    def average_commit_latency(self) -> float:
+        return self.total_commit_latency / self.commits if self.commits else 0.0
+
+
+@dataclass
+class _WriteRequest:
+    future: 'Future[None]'
+    enqueued_at: float
+    game_id: Optional[int] = field(default=None)
+    event: Optional[Event] = field(default=None)
+    snapshot: Optional[GameStateSnapshot] = field(default=None)
+    # the game is archived with its final state snapshot
+    archive_compression: Optional[ArchiveCompression] = field(default=None)
+
+
+class GroupCommitWriter:
+    """Writes events and snapshots of all games to the store in a background thread.
+
+    Writes queued while the previous commit is running are grouped into a single commit: a single append per game
+    and a single sync for all of them. Every write returns a future, which is resolved once the write is durable
+    according to the durability mode.
+    """
+
+    def __init__(self, store: EventStore, durability: Durability = Durability.EVENT, interval: float = 0.05,
+                 max_batch_size: int = 1000) -> None:
+        self._logger = logging.getLogger()
+
+        self._store = store
+        self._durability = durability
+        self._interval = interval
+        self._max_batch_size = max_batch_size
+
+        # `None` stops the writer
+        self._queue: 'Queue[Optional[_WriteRequest]]' = Queue()
+        self._thread = Thread(target=self._run, name='group-commit-writer', daemon=True)
+        self._metrics = WriterMetrics()
+        self._metrics_lock = Lock()
+
+    @property
+    def durability(self) -> Durability:
+        return self._durability
+
+    @property
+    def metrics(self) -> WriterMetrics:
+        with self._metrics_lock:
+            return replace(self._metrics, queue_depth=self._queue.qsize())
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def close(self) -> None:
+        """Commit all the queued writes and stop the writer."""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+    def write_event(self, game_id: int, event: Event) -> 'Future[None]':
+        return self._enqueue(_WriteRequest(future=Future(), enqueued_at=monotonic(), game_id=game_id, event=event))
+
+    def write_snapshot(self, snapshot: GameStateSnapshot) -> 'Future[None]':
+        return self._enqueue(_WriteRequest(future=Future(), enqueued_at=monotonic(), snapshot=snapshot))
+
+    def write_archive(self, game_id: int, snapshot: GameStateSnapshot,
+                      compression: ArchiveCompression = ArchiveCompression.LZMA) -> 'Future[None]':
+        """Archive the game once all the events queued before are written."""
+        return self._enqueue(_WriteRequest(future=Future(), enqueued_at=monotonic(), game_id=game_id,
+                                           snapshot=snapshot, archive_compression=compression))
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """Wait until all the writes queued so far are committed."""
+        self._enqueue(_WriteRequest(future=Future(), enqueued_at=monotonic())).result(timeout)
+
+    def _enqueue(self, request: _WriteRequest) -> 'Future[None]':
+        self._queue.put(request)
+
+        with self._metrics_lock:
+            self._metrics.max_queue_depth = max(self._metrics.max_queue_depth, self._queue.qsize())
+
+        return request.future
+
+    def _collect_batch(self, first_request: _WriteRequest) -> List[Optional[_WriteRequest]]:
+        batch: List[Optional[_WriteRequest]] = [first_request]
+
+        if self._durability == Durability.INTERVAL:
+            deadline = first_request.enqueued_at + self._interval
+            while len(batch) < self._max_batch_size and batch[-1] is not None:
+                timeout = deadline - monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except Empty:
+                    break
+
+        while len(batch) < self._max_batch_size and batch[-1] is not None:
+            try:
+                batch.append(self._queue.get_nowait())
+            except Empty:
+                break
+
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            request = self._queue.get()
+            if request is None:
+                return
+
+            batch = self._collect_batch(request)
+            self._commit([request for request in batch if request is not None])
+
+            if batch[-1] is None:
+                return
+
+    def _commit(self, requests: List[_WriteRequest]) -> None:
+        errors: MutableMapping[int, Exception] = {}
+
+        events_requests: MutableMapping[int, List[_WriteRequest]] = OrderedDict()
+        for request in requests:
+            if request.event is not None:
+                assert request.game_id is not None
+                events_requests.setdefault(request.game_id, []).append(request)
+
+        for game_id, game_requests in events_requests.items():
+            try:
+                self._store.append_events(game_id, [request.event for request in game_requests if request.event])
+            except Exception as e:
+                self._logger.exception(f'Error writing events of game #{game_id}')
+                for request in game_requests:
+                    errors[id(request)] = e
+
+        # snapshots and archives are written after the events they are based on
+        for request in requests:
+            if request.snapshot is None:
+                continue
+
+            try:
+                if request.archive_compression is not None:
+                    assert request.game_id is not None
+                    self._store.archive_game(request.game_id, request.snapshot, request.archive_compression)
+                else:
+                    self._store.save_snapshot(request.snapshot)
+            except Exception as e:
+                self._logger.exception(f'Error writing snapshot of game #{request.snapshot.game_id}')
+                errors[id(request)] = e
+
+        if self._durability != Durability.OS:
+            try:
+                self._store.sync()
+            except Exception as e:
+                self._logger.exception('Error syncing the store')
+                for request in requests:
+                    errors.setdefault(id(request), e)
+        else:
+            try:
+                # the OS flushes the writes, but the store still recovers from the latest commit on restart
+                self._store.checkpoint()
+            except Exception:
+                self._logger.exception('Error checkpointing the store')
+
+        finished_at = monotonic()
+        with self._metrics_lock:
+            latency = finished_at - min(request.enqueued_at for request in requests)
+            self._metrics.commits += 1
+            self._metrics.events += sum(1 for request in requests if request.event is not None)
+            self._metrics.snapshots += sum(
+                1 for request in requests if request.snapshot is not None and request.archive_compression is None)
+            self._metrics.archives += sum(1 for request in requests if request.archive_compression is not None)
+            self._metrics.failed_writes += len(errors)
+            self._metrics.last_commit_latency = latency
+            self._metrics.max_commit_latency = max(self._metrics.max_commit_latency, latency)
+            self._metrics.total_commit_latency += latency
+
+        for request in requests:
+            error = errors.get(id(request))
+            if error is None:
+                request.future.set_result(None)
+            else:
+                request.future.set_exception(error)
@@ -1,5 +1,9 @@
 from .base import *  # noqa
 from .client import *  # noqa
 from .event import *  # noqa
+from .limits import *  # noqa
+from .liveness import *  # noqa
 from .msg import *  # noqa
+from .queue import *  # noqa
+from .router import *  # noqa
 from .server import *  # noqa
@@ -12,3 +12,5 @@ class MessageType(Enum):
     NEW_CONNECTION = 'new_connection'
     END_CONNECTION = 'end_connection'
     EVENT = 'event'
+    PRESENCE = 'presence'
+    SNAPSHOT = 'snapshot'
@@ -12,10 +12,13 @@ from .msg import AuthMessageRequest, AuthMessageRequestPayload, AuthMessageRespo
 __all__ = [
     'Client',
     'ConnectionCallback',
+    'AuthorizedCallback',
     'WebsocketMessageCallback',
 ]
 
 ConnectionCallback = Callable[[], None]
+# receives the sequence of the latest event the server sends on connecting, if the server tells it
+AuthorizedCallback = Callable[[Optional[int]], None]
 WebsocketMessageCallback = Callable[[WebsocketMessage], None]
 
 
@@ -24,7 +27,10 @@ class Client:
     def __init__(self, username: str, game_id: int, *,
                  on_new_msg: Optional[WebsocketMessageCallback] = None,
                  on_connected: Optional[ConnectionCallback] = None,
-                 on_disconnected: Optional[ConnectionCallback] = None):
+                 on_disconnected: Optional[ConnectionCallback] = None,
+                 on_authorized: Optional[AuthorizedCallback] = None,
+                 get_last_sequence: Optional[Callable[[], int]] = None,
+                 spectator: bool = False):
         self._logger = logging.getLogger()
 
         self._username = username
@@ -33,6 +39,10 @@ class Client:
         self._on_new_msg = on_new_msg
         self._on_connected = on_connected
         self._on_disconnected = on_disconnected
+        self._on_authorized = on_authorized
+        # on reconnecting, the server sends only the events after the latest received one
+        self._get_last_sequence = get_last_sequence
+        self._spectator = spectator
 
         self._running = True
 
@@ -67,13 +77,18 @@ class Client:
                         self._on_connected()
                     self._server = ws
 
+                    last_sequence = self._get_last_sequence() if self._get_last_sequence is not None else 0
                     await self.send(AuthMessageRequest(AuthMessageRequestPayload(username=self._username,
-                                                                                 game_id=self._game_id)))
+                                                                                 game_id=self._game_id,
+                                                                                 last_sequence=last_sequence,
+                                                                                 spectator=self._spectator)))
                     raw_response = await ws.recv()
                     response_msg = self.from_ws_msg(cast(str, raw_response))
                     if isinstance(response_msg, AuthMessageResponse) and response_msg.payload.ok:
                         self._logger.info('Authorized')
                         self._conn_task = asyncio.Task(self._consume())
+                        if self._on_authorized is not None:
+                            self._on_authorized(response_msg.payload.latest_sequence)
                         await self._conn_task
                     else:
                         self._logger.info("Couldn't authorize")
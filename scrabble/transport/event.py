@@ -1,7 +1,9 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum, unique
+from typing import Optional
 
 from scrabble.game.api import Event
+from scrabble.utils import slotted
 
 from .msg import WebsocketMessage, WebsocketMessagePayload
 
@@ -19,11 +21,18 @@ class EventStatus(Enum):
     REJECTED = 'rejected'
 
 
+@slotted
 @dataclass
 class EventMessagePayload(WebsocketMessagePayload):
     event: Event
+    # id of the request given by the client, retried requests keep it and are answered with the original outcome
+    request_id: Optional[str] = field(default=None)
+    # rejected events only: why the event is rejected and the sequence of the latest event of the game on the server
+    reason: Optional[str] = field(default=None)
+    latest_sequence: Optional[int] = field(default=None)
 
 
+@slotted
 @dataclass
 class EventMessage(WebsocketMessage):
     payload: EventMessagePayload
@@ -0,0 +1,104 @@
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Any, Mapping, Optional, Union, cast
+
+from scrabble.game.api import PlayerMoveEvent, PlayerMoveParams
+
+from .event import EventMessage, EventMessagePayload, EventStatus
+
+__all__ = [
+    'TokenBucket',
+    'RecvMetrics',
+    'get_claimed_player',
+    'get_rejected_request',
+]
+
+# characters at both ends of a frame scanned for the requested move
+REQUEST_SCAN_SIZE = 256
+
+_JSON_STRING = r'"(?:[^"\\]|\\.)*"'
+_JSON_SCALAR = rf'(?:null|true|false|-?\d+(?:\.\d+)?|{_JSON_STRING})'
+# the player of the move at the start of the frame
+_MOVE_HEAD_RE = re.compile(
+    rf'\s*\{{\s*"type":\s*"EVENT",\s*"payload":\s*\{{\s*"event":\s*\{{\s*"name":\s*"PLAYER_MOVE",'
+    rf'\s*"params":\s*\{{\s*"player":\s*({_JSON_STRING})')
+# the sequence, the game and the request id of the move and the status of the message at the end of the frame
+_MOVE_TAIL_RE = re.compile(
+    rf'"sequence":\s*(\d{{1,18}}),\s*"game_id":\s*(\d{{1,18}})(?:,\s*"\w+":\s*{_JSON_SCALAR})*\s*\}},'
+    rf'\s*"request_id":\s*(null|{_JSON_STRING})(?:,\s*"\w+":\s*{_JSON_SCALAR})*\s*\}},'
+    rf'\s*"status":\s*"REQUESTED"\s*\}}\s*$')
+
+
+class TokenBucket:
+    """Rate limit of `rate` messages a second on average, allowing bursts of up to `burst` messages."""
+
+    def __init__(self, rate: float, burst: float, now: float) -> None:
+        if rate <= 0 or burst < 1:
+            raise ValueError('Token bucket needs positive rate and burst of at least one token')
+
+        self._rate = rate
+        self._burst = burst
+        self._tokens = burst
+        self._updated = now
+
+    def take(self, now: float) -> bool:
+        """Take a token, returning False if there are none left."""
+        self._tokens = min(self._burst, self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+
+@dataclass
+class RecvMetrics:
+    received_messages: int = field(default=0)
+    # frames longer than the maximum size, dropped before decoding
+    rejected_oversized: int = field(default=0)
+    # frames over the rate limit of the connection, dropped before decoding
+    rejected_rate_limited: int = field(default=0)
+    # events on behalf of another player than the authorized one
+    rejected_impersonating: int = field(default=0)
+    rejected_malformed: int = field(default=0)
+
+
+def get_claimed_player(data: Any) -> Optional[str]:
+    """Player of the event in the decoded JSON of the message (if any), looked up before loading the message."""
+    try:
+        params = data['payload']['event']['params']
+    except (KeyError, TypeError):
+        return None
+
+    player = params.get('player') if isinstance(params, Mapping) else None
+    return player if isinstance(player, str) else None
+
+
+def get_rejected_request(raw_msg: Union[str, bytes], reason: str) -> Optional[EventMessage]:
+    """Rejection of the move requested by the frame, for answering the requests rejected without decoding them.
+
+    The frame is not decoded: the fields the clients match their pending moves by are looked up in the first and
+    the last `REQUEST_SCAN_SIZE` characters of it, where the moves serialized by the clients have them. `None` is
+    returned if the frame is not a requested move or these fields cannot be found.
+    """
+    head, tail = raw_msg[:REQUEST_SCAN_SIZE], raw_msg[-REQUEST_SCAN_SIZE:]
+    if isinstance(head, bytes) and isinstance(tail, bytes):
+        head, tail = head.decode('utf-8', 'replace'), tail.decode('utf-8', 'replace')
+
+    head_match = _MOVE_HEAD_RE.match(cast(str, head))
+    tail_match = _MOVE_TAIL_RE.search(cast(str, tail))
+    if head_match is None or tail_match is None:
+        return None
+
+    try:
+        player = json.loads(head_match.group(1))
+        request_id = json.loads(tail_match.group(3))
+    except ValueError:
+        return None
+    sequence, game_id = int(tail_match.group(1)), int(tail_match.group(2))
+
+    move = PlayerMoveEvent(params=PlayerMoveParams(player=player), sequence=sequence, game_id=game_id)
+    return EventMessage(payload=EventMessagePayload(event=move, request_id=request_id, reason=reason),
+                        status=EventStatus.REJECTED)
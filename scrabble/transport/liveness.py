@@ -0,0 +1,176 @@
+import asyncio
+import logging
+import math
+from dataclasses import dataclass, field, replace
+from typing import Generic, Hashable, List, MutableMapping, Optional, TypeVar
+
+from websockets.server import WebSocketServerProtocol
+
+__all__ = [
+    'TimerWheel',
+    'LivenessMetrics',
+    'LivenessMonitor',
+]
+
+K = TypeVar('K', bound=Hashable)
+
+# close code of the websocket protocol for the keepalive ping timeout
+PING_TIMEOUT_CLOSE_CODE = 1011
+
+
+class TimerWheel(Generic[K]):
+    """Hashed timer wheel: timers are kept in slots by their deadlines and expire in batches on every tick, so any
+    number of timers costs a single periodic wakeup. Deadlines are rounded up to the tick."""
+
+    def __init__(self, slots: int) -> None:
+        if slots <= 0:
+            raise ValueError('Timer wheel needs at least one slot')
+
+        # keys of every slot along with the number of full turns of the wheel left till their deadlines
+        self._slots: List[MutableMapping[K, int]] = [{} for _ in range(slots)]
+        self._key_slots: MutableMapping[K, int] = {}
+        self._cursor = 0
+
+    def __len__(self) -> int:
+        return len(self._key_slots)
+
+    def __contains__(self, key: K) -> bool:
+        return key in self._key_slots
+
+    def schedule(self, key: K, ticks: int) -> None:
+        """Expire the key in that many ticks (at least one), replacing its previous timer."""
+        self.cancel(key)
+
+        ticks = max(ticks, 1)
+        slot = (self._cursor + ticks) % len(self._slots)
+        self._slots[slot][key] = (ticks - 1) // len(self._slots)
+        self._key_slots[key] = slot
+
+    def cancel(self, key: K) -> None:
+        slot = self._key_slots.pop(key, None)
+        if slot is not None:
+            del self._slots[slot][key]
+
+    def advance(self) -> List[K]:
+        """Move to the next tick, returning the expired keys."""
+        self._cursor = (self._cursor + 1) % len(self._slots)
+        slot_keys = self._slots[self._cursor]
+
+        expired = []
+        for key, turns in list(slot_keys.items()):
+            if turns:
+                slot_keys[key] = turns - 1
+            else:
+                del slot_keys[key]
+                del self._key_slots[key]
+                expired.append(key)
+
+        return expired
+
+
+@dataclass
+class LivenessMetrics:
+    connections: int = field(default=0)
+    pings_sent: int = field(default=0)
+    # checks of the connections that received messages recently enough
+    pings_skipped: int = field(default=0)
+    timeouts: int = field(default=0)
+
+
+class LivenessMonitor:
+    """Keepalive of many connections driven by a single timer wheel instead of the timers of every connection.
+
+    A connection is checked once it has received nothing for the ping interval: it is pinged then and closed unless
+    the pong (or any message) arrives within the ping timeout. Connections receiving messages are never pinged.
+    """
+
+    def __init__(self, ping_interval: float = 5.0, ping_timeout: float = 5.0, tick: float = 1.0) -> None:
+        self._logger = logging.getLogger()
+
+        self._ping_interval = ping_interval
+        self._ping_timeout = ping_timeout
+        self._tick = tick
+
+        self._wheel: TimerWheel[WebSocketServerProtocol] = TimerWheel(
+            math.ceil(max(ping_interval, ping_timeout) / tick) + 1)
+        # loop time of the latest received message of every connection
+        self._last_activity: MutableMapping[WebSocketServerProtocol, float] = {}
+        # loop time of the unanswered ping of the connection
+        self._pings: MutableMapping[WebSocketServerProtocol, float] = {}
+        self._metrics = LivenessMetrics()
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    @property
+    def metrics(self) -> LivenessMetrics:
+        return replace(self._metrics, connections=len(self._last_activity))
+
+    def start(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+        self._timer = loop.call_later(self._tick, self._on_tick)
+
+    def stop(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def add(self, conn: WebSocketServerProtocol) -> None:
+        self._last_activity[conn] = self._now()
+        self._wheel.schedule(conn, self._ticks(self._ping_interval))
+
+    def remove(self, conn: WebSocketServerProtocol) -> None:
+        self._last_activity.pop(conn, None)
+        self._pings.pop(conn, None)
+        self._wheel.cancel(conn)
+
+    def touch(self, conn: WebSocketServerProtocol) -> None:
+        """Record a message received from the connection. Only the time is updated, the timer is moved on its check."""
+        if conn in self._last_activity:
+            self._last_activity[conn] = self._now()
+            self._pings.pop(conn, None)
+
+    def _now(self) -> float:
+        return self._loop.time() if self._loop is not None else 0.0
+
+    def _ticks(self, delay: float) -> int:
+        return math.ceil(delay / self._tick)
+
+    def _on_tick(self) -> None:
+        assert self._loop is not None
+        self._timer = self._loop.call_later(self._tick, self._on_tick)
+
+        now = self._now()
+        for conn in self._wheel.advance():
+            self._check(conn, now)
+
+    def _check(self, conn: WebSocketServerProtocol, now: float) -> None:
+        assert self._loop is not None
+
+        if conn in self._pings:
+            self._metrics.timeouts += 1
+            self._logger.warning(f'Closing connection {conn.remote_address} after ping timeout')
+            self.remove(conn)
+            self._loop.create_task(conn.close(code=PING_TIMEOUT_CLOSE_CODE, reason='keepalive ping timeout'))
+            return
+
+        idle = now - self._last_activity[conn]
+        if idle < self._ping_interval:
+            self._metrics.pings_skipped += 1
+            self._wheel.schedule(conn, self._ticks(self._ping_interval - idle))
+            return
+
+        self._metrics.pings_sent += 1
+        self._pings[conn] = now
+        self._wheel.schedule(conn, self._ticks(self._ping_timeout))
+        self._loop.create_task(self._ping(conn))
+
+    async def _ping(self, conn: WebSocketServerProtocol) -> None:
+        try:
+            pong_waiter = await conn.ping()
+            await pong_waiter
+        except Exception:
+            # the connection is closed, it is removed on unregistering
+            return
+
+        self.touch(conn)
@@ -1,4 +1,8 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from scrabble.game import GameStateSnapshot
+from scrabble.utils import slotted
 
 __all__ = [
     'WebsocketMessagePayload',
@@ -11,55 +15,103 @@ __all__ = [
     'NewConnectionMessage',
     'EndConnectionPayload',
     'EndConnectionMessage',
+    'PresencePayload',
+    'PresenceMessage',
+    'SnapshotPayload',
+    'SnapshotMessage',
 ]
 
 
+@slotted
 @dataclass
 class WebsocketMessagePayload:
     ...
 
 
+@slotted
 @dataclass
 class WebsocketMessage:
     payload: WebsocketMessagePayload
 
 
+@slotted
 @dataclass
 class AuthMessageRequestPayload(WebsocketMessagePayload):
     username: str
     game_id: int
+    # sequence of the latest event the player already has, only the later ones are sent on connecting
+    last_sequence: int = field(default=0)
+    # spectators receive the game without joining it and cannot send events
+    spectator: bool = field(default=False)
 
 
+@slotted
 @dataclass
 class AuthMessageResponsePayload(WebsocketMessagePayload):
     ok: bool
+    # sequence of the latest event sent to the player on connecting, the player has caught up once it gets there
+    latest_sequence: Optional[int] = field(default=None)
 
 
+@slotted
 @dataclass
 class AuthMessageRequest(WebsocketMessage):
     payload: AuthMessageRequestPayload
 
 
+@slotted
 @dataclass
 class AuthMessageResponse(WebsocketMessage):
     payload: AuthMessageResponsePayload
 
 
+@slotted
 @dataclass
 class NewConnectionPayload(WebsocketMessagePayload):
     username: str
 
 
+@slotted
 @dataclass
 class NewConnectionMessage(WebsocketMessage):
     payload: NewConnectionPayload
 
 
+@slotted
 @dataclass
 class EndConnectionPayload(WebsocketMessagePayload):
     username: str
 
 
+@slotted
 @dataclass
 class EndConnectionMessage(WebsocketMessage):
     payload: EndConnectionPayload
+
+
+@slotted
+@dataclass
+class PresencePayload(WebsocketMessagePayload):
+    # usernames of the connected players of the game, the rest of its players are disconnected
+    connected: List[str]
+    spectators: int
+
+
+@slotted
+@dataclass
+class PresenceMessage(WebsocketMessage):
+    """Whole presence state of the game, sent to a joining connection and then once it changes."""
+    payload: PresencePayload
+
+
+@slotted
+@dataclass
+class SnapshotPayload(WebsocketMessagePayload):
+    snapshot: GameStateSnapshot
+
+
+@slotted
+@dataclass
+class SnapshotMessage(WebsocketMessage):
+    """State of the game sent to a joining spectator instead of all the events before it."""
+    payload: SnapshotPayload
@@ -0,0 +1,124 @@
+import asyncio
+import logging
+from collections import deque
+from dataclasses import dataclass, field
+from enum import Enum, unique
+from typing import Callable, Deque, Optional, Tuple
+
+from websockets.server import WebSocketServerProtocol
+
+__all__ = [
+    'SlowConsumerPolicy',
+    'SendQueueMetrics',
+    'SendQueue',
+]
+
+
+@unique
+class SlowConsumerPolicy(Enum):
+    # the oldest queued presence message is dropped, the connection is closed if there are none
+    DROP_PRESENCE = 'drop-presence'
+    # queued presence messages of the same player are replaced by the latest one, the connection is closed if none are
+    COALESCE = 'coalesce'
+    # the connection is closed, the player catches up on reconnecting
+    DISCONNECT = 'disconnect'
+
+
+@dataclass
+class SendQueueMetrics:
+    # messages queued to all connections at the moment
+    queue_depth: int = field(default=0)
+    # the most messages queued to a single connection
+    max_queue_depth: int = field(default=0)
+    sent_messages: int = field(default=0)
+    dropped_messages: int = field(default=0)
+    coalesced_messages: int = field(default=0)
+    disconnects: int = field(default=0)
+
+
+class SendQueue:
+    """Bounded queue of the messages to a connection, sent by its own writer task, so a slow connection delays
+    neither the publisher nor the other connections.
+
+    Game events are never dropped: once the queue is full of them, the connection is closed and the player catches
+    up on reconnecting. Presence messages (keyed by the player) may be dropped or coalesced by the policy.
+    """
+
+    def __init__(self, conn: WebSocketServerProtocol, max_size: int, policy: SlowConsumerPolicy,
+                 metrics: SendQueueMetrics, on_overflow: Callable[[], None]) -> None:
+        self._logger = logging.getLogger()
+
+        self._conn = conn
+        self._max_size = max_size
+        self._policy = policy
+        self._metrics = metrics
+        self._on_overflow = on_overflow
+
+        # serialized messages along with their presence keys
+        self._items: Deque[Tuple[str, Optional[str]]] = deque()
+        self._ready = asyncio.Event()
+        self._closed = False
+        self._task = asyncio.ensure_future(self._write())
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def put(self, raw_msg: str, presence_key: Optional[str] = None) -> None:
+        if self._closed:
+            return
+
+        if len(self._items) >= self._max_size and not self._make_room(presence_key):
+            self._metrics.disconnects += 1
+            self.close()
+            self._on_overflow()
+            return
+
+        self._items.append((raw_msg, presence_key))
+        self._metrics.max_queue_depth = max(self._metrics.max_queue_depth, len(self._items))
+        self._ready.set()
+
+    def close(self) -> None:
+        self._closed = True
+        self._items.clear()
+        self._task.cancel()
+
+    def _make_room(self, presence_key: Optional[str]) -> bool:
+        if self._policy == SlowConsumerPolicy.DROP_PRESENCE:
+            for index, (_, key) in enumerate(self._items):
+                if key is not None:
+                    del self._items[index]
+                    self._metrics.dropped_messages += 1
+                    return True
+
+        elif self._policy == SlowConsumerPolicy.COALESCE:
+            # only the latest presence message of every player is kept, counting the one being queued
+            seen_keys = {presence_key} if presence_key is not None else set()
+            kept: Deque[Tuple[str, Optional[str]]] = deque()
+            for raw_msg, key in reversed(self._items):
+                if key is not None and key in seen_keys:
+                    self._metrics.coalesced_messages += 1
+                    continue
+                if key is not None:
+                    seen_keys.add(key)
+                kept.appendleft((raw_msg, key))
+
+            freed = len(self._items) - len(kept)
+            self._items = kept
+            return freed > 0
+
+        return False
+
+    async def _write(self) -> None:
+        try:
+            while True:
+                await self._ready.wait()
+                while self._items:
+                    raw_msg, _ = self._items.popleft()
+                    await self._conn.send(raw_msg)
+                    self._metrics.sent_messages += 1
+                self._ready.clear()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # the connection is closed, it is unregistered by its handler
+            self._logger.debug('Stopped sending to a closed connection')
@@ -0,0 +1,124 @@
+import asyncio
+import hashlib
+import json
+import logging
+from bisect import bisect
+from typing import List, Optional, Sequence, Tuple, Union, cast
+
+from websockets.client import WebSocketClientProtocol, connect
+from websockets.exceptions import ConnectionClosed
+from websockets.server import WebSocketServerProtocol, serve
+
+from scrabble.serializers.transport.msg import WebsocketMessageSchema
+
+from .liveness import LivenessMonitor
+from .msg import AuthMessageRequest, AuthMessageResponse, AuthMessageResponsePayload
+
+__all__ = [
+    'HashRing',
+    'Router',
+]
+
+
+def _hash(key: str) -> int:
+    # built-in hashes of strings differ between processes
+    return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], 'big')
+
+
+class HashRing:
+    """Consistent hashing of game ids to nodes: every node takes many points of the ring, a game belongs to the node
+    of the next point after the hash of the game id. Adding or removing a node moves only the games of its points."""
+
+    def __init__(self, nodes: Sequence[str], replicas: int = 100) -> None:
+        if not nodes:
+            raise ValueError('Hash ring needs at least one node')
+
+        points: List[Tuple[int, str]] = sorted(
+            (_hash(f'{node}#{replica}'), node)
+            for node in nodes
+            for replica in range(replicas)
+        )
+        self._hashes = [point_hash for point_hash, _ in points]
+        self._nodes = [node for _, node in points]
+
+    def get_node(self, game_id: int) -> str:
+        index = bisect(self._hashes, _hash(str(game_id))) % len(self._hashes)
+        return self._nodes[index]
+
+
+class Router:
+    """Front server proxying every player connection to the worker server owning the game of the player.
+
+    The owner is found by the game id of the authorization request, which is forwarded to the worker as is, the rest
+    of messages are passed through in both directions until either side closes the connection. Authorization requests
+    over `max_msg_size` characters are dropped along with their connections, like the workers drop such messages.
+    """
+
+    def __init__(self, worker_uris: Sequence[str], ping_interval: float = 5.0, ping_timeout: float = 5.0,
+                 max_msg_size: int = 64 * 1024) -> None:
+        self._logger = logging.getLogger()
+
+        self._max_msg_size = max_msg_size
+
+        self._worker_uris = list(worker_uris)
+        self._ring = HashRing([str(index) for index in range(len(self._worker_uris))])
+        self._liveness = LivenessMonitor(ping_interval=ping_interval, ping_timeout=ping_timeout)
+
+    def get_worker_index(self, game_id: int) -> int:
+        return int(self._ring.get_node(game_id))
+
+    def get_worker_uri(self, game_id: int) -> str:
+        return self._worker_uris[self.get_worker_index(game_id)]
+
+    async def start(self, host: Optional[str] = None, port: int = 5678) -> None:
+        # frames are limited to the most bytes the longest accepted message may take in UTF-8, like on the workers
+        await serve(self.serve, host, port, ping_interval=None, ping_timeout=None, max_size=4 * self._max_msg_size)
+        self._liveness.start(asyncio.get_event_loop())
+
+        self._logger.info(f'Starting router of {len(self._worker_uris)} workers at host={host} and port={port}')
+
+    async def serve(self, websocket: WebSocketServerProtocol, path: str) -> None:
+        raw_auth_msg = cast(str, await websocket.recv())
+        if len(raw_auth_msg) > self._max_msg_size:
+            self._logger.warning(f'Rejected authorization request of {len(raw_auth_msg)} characters')
+            return
+
+        auth_msg = WebsocketMessageSchema().load(json.loads(raw_auth_msg))
+        assert isinstance(auth_msg, AuthMessageRequest)
+
+        worker_uri = self.get_worker_uri(auth_msg.payload.game_id)
+        try:
+            # workers are local processes, their connections are not pinged
+            worker = await connect(worker_uri, ping_interval=None)
+        except Exception:
+            self._logger.exception(f'Cannot connect to worker {worker_uri}')
+
+            answer = AuthMessageResponse(payload=AuthMessageResponsePayload(ok=False))
+            await websocket.send(json.dumps(WebsocketMessageSchema().dump(answer)))
+            return
+
+        self._liveness.add(websocket)
+        try:
+            await worker.send(raw_auth_msg)
+
+            tasks = [
+                asyncio.ensure_future(self._pipe(websocket, worker)),
+                asyncio.ensure_future(self._pipe(worker, websocket)),
+            ]
+            _, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in pending:
+                task.cancel()
+        finally:
+            self._liveness.remove(websocket)
+            await worker.close()
+
+    async def _pipe(self, source: Union[WebSocketServerProtocol, WebSocketClientProtocol],
+                    destination: Union[WebSocketServerProtocol, WebSocketClientProtocol]) -> None:
+        try:
+            async for raw_msg in source:
+                # only the player connections are kept alive, the worker connections are local
+                if isinstance(source, WebSocketServerProtocol):
+                    self._liveness.touch(source)
+                await destination.send(raw_msg)
+        except ConnectionClosed:
+            pass
@@ -1,29 +1,50 @@
 import asyncio
+import inspect
 import json
 import logging
-from dataclasses import dataclass
-from typing import Callable, MutableMapping, Optional, Tuple, cast
+from dataclasses import dataclass, replace
+from itertools import count
+from time import monotonic
+from typing import Any, Awaitable, Callable, MutableMapping, MutableSet, Optional, Tuple, Union, cast
 
 import websockets
 from websockets.server import WebSocketServerProtocol
 
+from scrabble.game.api import PlayerMoveEvent
 from scrabble.serializers.transport.msg import WebsocketMessageSchema
 
+from .limits import RecvMetrics, TokenBucket, get_claimed_player, get_rejected_request
+from .liveness import LivenessMetrics, LivenessMonitor
 from .msg import (AuthMessageRequest, AuthMessageResponse, AuthMessageResponsePayload, EndConnectionMessage,
-                  EndConnectionPayload, NewConnectionMessage, NewConnectionPayload, WebsocketMessage)
+                  NewConnectionMessage, PresenceMessage, PresencePayload, WebsocketMessage)
+from .queue import SendQueue, SendQueueMetrics, SlowConsumerPolicy
 
 __all__ = [
     'Server',
     'PlayerConnection',
     'PlayerConnectionID',
     'ConnectionCallback',
+    'NewConnectionCallback',
     'WebsocketMessageCallback',
 ]
 
 PlayerConnectionID = Tuple[str, int]
 ConnectionCallback = Callable[[PlayerConnectionID], None]
+# receives the sequence of the latest event the player already has and whether it is a spectator, returns
+# the sequence of the latest event sent to the player on connecting (if any). The player is answered once
+# the returned awaitable (if any) is done
+NewConnectionCallback = Callable[[PlayerConnectionID, int, bool], Union[Optional[int], Awaitable[Optional[int]]]]
 WebsocketMessageCallback = Callable[[PlayerConnectionID, WebsocketMessage], None]
 
+# presence key of the presence state of the game, which is not a username
+PRESENCE_KEY = '#presence'
+# prefix of the connection IDs of the spectators, which are not usernames, so a spectator does not take the place
+# of a player of the same name
+SPECTATOR_PREFIX = '#spectator-'
+# changes of the presence of a game are published by a single message at most once in that many seconds,
+# so players reconnecting meanwhile are not announced at all
+PRESENCE_DELAY = 1.0
+
 
 @dataclass
 class PlayerConnection:
@@ -42,14 +63,46 @@ class PlayerConnection:
 class Server:
 
     def __init__(self, *,
-                 on_new_conn: Optional[ConnectionCallback] = None,
+                 on_new_conn: Optional[NewConnectionCallback] = None,
                  on_end_conn: Optional[ConnectionCallback] = None,
-                 on_new_msg: Optional[WebsocketMessageCallback] = None):
+                 on_new_msg: Optional[WebsocketMessageCallback] = None,
+                 max_queue_size: int = 1000,
+                 slow_consumer_policy: SlowConsumerPolicy = SlowConsumerPolicy.DROP_PRESENCE,
+                 ping_interval: float = 5.0,
+                 ping_timeout: float = 5.0,
+                 max_msg_size: int = 64 * 1024,
+                 msg_rate: float = 10.0,
+                 msg_burst: int = 20):
         self._logger = logging.getLogger()
 
         self._players_to_connections: MutableMapping[PlayerConnectionID, WebSocketServerProtocol] = {}
         self._connections_to_players: MutableMapping[WebSocketServerProtocol, PlayerConnectionID] = {}
         self._tasks_by_player: MutableMapping[PlayerConnectionID, asyncio.Task] = {}
+        # connections of every game, so publishing to a game does not go through the other games
+        self._connections_by_game: MutableMapping[int, MutableSet[WebSocketServerProtocol]] = {}
+        self._spectators: MutableSet[PlayerConnectionID] = set()
+        self._spectators_counts: MutableMapping[int, int] = {}
+        self._spectator_ids = count(1)
+        # games with the presence changes to be published and the latest published presence of every game
+        self._presence_changed: MutableSet[int] = set()
+        self._published_presence: MutableMapping[int, PresencePayload] = {}
+        # outbound messages of the registered connections
+        self._send_queues: MutableMapping[WebSocketServerProtocol, SendQueue] = {}
+        self._max_queue_size = max_queue_size
+        self._slow_consumer_policy = slow_consumer_policy
+        self._send_metrics = SendQueueMetrics()
+        # keepalive of all the registered connections by a single timer instead of the timers of every connection
+        self._liveness = LivenessMonitor(ping_interval=ping_interval, ping_timeout=ping_timeout)
+        # inbound frames are checked for the size and the rate of their connection before decoding them
+        self._max_msg_size = max_msg_size
+        self._msg_rate = msg_rate
+        self._msg_burst = msg_burst
+        self._recv_buckets: MutableMapping[WebSocketServerProtocol, TokenBucket] = {}
+        # rejected moves are answered at most once in the time a token of the rate limit takes to refill,
+        # so the answers to a flood of frames are bounded by the rate limit too
+        self._rejections_interval = 1 / msg_rate
+        self._rejections_answered: MutableMapping[WebSocketServerProtocol, float] = {}
+        self._recv_metrics = RecvMetrics()
 
         self._on_new_conn = on_new_conn
         self._on_end_conn = on_end_conn
@@ -61,29 +114,83 @@ class Server:
     def from_ws_msg(self, raw_msg: str) -> WebsocketMessage:
         return WebsocketMessageSchema().load(json.loads(raw_msg))
 
+    @property
+    def send_metrics(self) -> SendQueueMetrics:
+        return replace(self._send_metrics, queue_depth=sum(len(queue) for queue in self._send_queues.values()))
+
+    @property
+    def liveness_metrics(self) -> LivenessMetrics:
+        return self._liveness.metrics
+
+    @property
+    def recv_metrics(self) -> RecvMetrics:
+        return replace(self._recv_metrics)
+
     def disconnect(self, player_id: PlayerConnectionID) -> None:
-        self._tasks_by_player[player_id].cancel()
+        task = self._tasks_by_player.get(player_id)
+        if task is not None:
+            task.cancel()
 
-    def add_player_conn(self, player_id: PlayerConnectionID, conn: WebSocketServerProtocol) -> None:
+    def is_spectator(self, player_id: PlayerConnectionID) -> bool:
+        return player_id in self._spectators
+
+    def get_spectators_count(self, game_id: int) -> int:
+        return self._spectators_counts.get(game_id, 0)
+
+    def add_player_conn(self, player_id: PlayerConnectionID, conn: WebSocketServerProtocol,
+                        spectator: bool = False) -> None:
         self._players_to_connections[player_id] = conn
         self._connections_to_players[conn] = player_id
+        self._connections_by_game.setdefault(player_id[1], set()).add(conn)
+        if spectator:
+            self._spectators.add(player_id)
+            self._spectators_counts[player_id[1]] = self.get_spectators_count(player_id[1]) + 1
+        self._send_queues[conn] = SendQueue(conn, self._max_queue_size, self._slow_consumer_policy,
+                                            self._send_metrics, on_overflow=lambda: self._on_slow_consumer(player_id))
+        self._recv_buckets[conn] = TokenBucket(self._msg_rate, self._msg_burst, monotonic())
+        self._liveness.add(conn)
 
     def remove_player_conn(self, player_id: PlayerConnectionID) -> None:
         conn = self._players_to_connections[player_id]
 
         del self._connections_to_players[conn]
         del self._players_to_connections[player_id]
+        if player_id in self._spectators:
+            self._spectators.remove(player_id)
+            self._spectators_counts[player_id[1]] -= 1
+            if not self._spectators_counts[player_id[1]]:
+                del self._spectators_counts[player_id[1]]
+
+        game_connections = self._connections_by_game[player_id[1]]
+        game_connections.discard(conn)
+        if not game_connections:
+            del self._connections_by_game[player_id[1]]
+
+        self._send_queues.pop(conn).close()
+        del self._recv_buckets[conn]
+        self._rejections_answered.pop(conn, None)
+        self._liveness.remove(conn)
+
+    def _on_slow_consumer(self, player_id: PlayerConnectionID) -> None:
+        self._logger.warning(f'Disconnecting slow client {player_id}')
+        self.disconnect(player_id)
 
     async def register(self, ws: WebSocketServerProtocol, path: str) -> Tuple[bool, PlayerConnection]:
         ws_msg = await ws.recv()
+        if len(ws_msg) > self._max_msg_size:
+            self._recv_metrics.rejected_oversized += 1
+            raise ValueError(f'Authorization message of {len(ws_msg)} characters is too long')
         auth_msg = self.from_ws_msg(cast(str, ws_msg))
         assert isinstance(auth_msg, AuthMessageRequest)
 
         player_conn = PlayerConnection(username=auth_msg.payload.username,
                                        game_id=auth_msg.payload.game_id,
                                        conn=ws)
-        player_id = player_conn.player_id
-        username, game_id = player_id
+        game_id = player_conn.game_id
+        spectator = auth_msg.payload.spectator
+        # every spectator connection gets its own ID, only players are identified by their usernames
+        player_id = ((f'{SPECTATOR_PREFIX}{next(self._spectator_ids)}', game_id) if spectator
+                     else player_conn.player_id)
 
         if player_id in self._players_to_connections:
             self._logger.warning(f'Duplicated client {player_id}')
@@ -92,94 +199,211 @@ class Server:
 
             return False, player_conn
         else:
-            self.add_player_conn(player_id, ws)
+            self.add_player_conn(player_id, ws, spectator)
 
+            latest_sequence = None
             if self._on_new_conn is not None:
                 try:
-                    self._on_new_conn(player_id)
+                    result = self._on_new_conn(player_id, auth_msg.payload.last_sequence, spectator)
+                    if inspect.isawaitable(result):
+                        result = await result
+                    latest_sequence = cast(Optional[int], result)
                 except Exception:
 
                     self._logger.exception('Exception raised during new player registration')
 
+                    # the answer is sent directly, as the queue of the connection is closed
+                    self.remove_player_conn(player_id)
+
                     answer = AuthMessageResponse(payload=AuthMessageResponsePayload(ok=False))
                     await self.send(ws, answer)
 
-                    self.remove_player_conn(player_id)
-
                     player_conn.conn = None
                     return False, player_conn
 
-            answer = AuthMessageResponse(payload=AuthMessageResponsePayload(ok=True))
+            answer = AuthMessageResponse(payload=AuthMessageResponsePayload(ok=True, latest_sequence=latest_sequence))
             await self.send(ws, answer)
 
-            # publish new connection to current players
-            new_conn_msg = NewConnectionMessage(payload=NewConnectionPayload(username=username))
-            await self.publish_to_game(new_conn_msg, game_id, except_conn=ws)
-
-            # send existing connections to current player
-            current_connections_futures = []
-            for existing_username, existing_game_id in self._players_to_connections:
-                if existing_game_id == game_id and existing_username != username:
-                    new_conn_msg = NewConnectionMessage(payload=NewConnectionPayload(username=existing_username))
-                    current_connections_futures.append(self.send(ws, new_conn_msg))
-            if current_connections_futures:
-                await asyncio.wait(current_connections_futures)
+            # the new connection gets the whole presence of the game in a single message, the rest of connections
+            # get the change along with the other ones
+            await self.send(ws, PresenceMessage(payload=self.get_presence(game_id)))
+            self._on_presence_changed(game_id)
 
             return True, player_conn
 
     async def unregister(self, ws: WebSocketServerProtocol, path: str) -> None:
         player_id = self._connections_to_players[ws]
-        username, game_id = player_id
+        _, game_id = player_id
 
         self.remove_player_conn(player_id)
         del self._tasks_by_player[player_id]
 
-        end_conn_msg = EndConnectionMessage(payload=EndConnectionPayload(username=username))
-        await self.publish_to_game(end_conn_msg, game_id, except_conn=ws)
+        self._on_presence_changed(game_id)
 
         if self._on_end_conn is not None:
             self._on_end_conn(player_id)
 
     async def publish(self, msg: WebsocketMessage, *,
                       except_conn: Optional[WebSocketServerProtocol] = None) -> None:
-        futures = [
-            conn.send(self.to_ws_msg(msg))
-            for conn in self._connections_to_players
-            if conn != except_conn
-        ]
-        if futures:
-            await asyncio.wait(futures)
+        raw_msg = self.to_ws_msg(msg)
+        for conn in list(self._connections_to_players):
+            if conn != except_conn:
+                self._enqueue(conn, raw_msg, msg)
 
     async def publish_to_game(self, msg: WebsocketMessage, game_id: int, *,
                               except_conn: Optional[WebSocketServerProtocol] = None) -> None:
-        futures = [
-            conn.send(self.to_ws_msg(msg))
-            for conn, player_id in self._connections_to_players.items()
-            if conn != except_conn and player_id[1] == game_id
-        ]
-        if futures:
-            await asyncio.wait(futures)
+        game_connections = self._connections_by_game.get(game_id)
+        if not game_connections:
+            return
+
+        # the message is serialized once for all the players and spectators of the game
+        raw_msg = self.to_ws_msg(msg)
+        for conn in list(game_connections):
+            if conn != except_conn:
+                self._enqueue(conn, raw_msg, msg)
+
+    def get_presence(self, game_id: int) -> PresencePayload:
+        connected = sorted(
+            self._connections_to_players[conn][0]
+            for conn in self._connections_by_game.get(game_id, ())
+            if self._connections_to_players[conn] not in self._spectators
+        )
+        return PresencePayload(connected=connected, spectators=self.get_spectators_count(game_id))
+
+    def _on_presence_changed(self, game_id: int) -> None:
+        if game_id not in self._presence_changed:
+            self._presence_changed.add(game_id)
+            asyncio.get_event_loop().call_later(PRESENCE_DELAY, self._publish_presence, game_id)
+
+    def _publish_presence(self, game_id: int) -> None:
+        self._presence_changed.discard(game_id)
+
+        if game_id not in self._connections_by_game:
+            self._published_presence.pop(game_id, None)
+            return
+
+        # changes cancelled out meanwhile (e.g. a player reconnected) are not published
+        presence = self.get_presence(game_id)
+        if presence == self._published_presence.get(game_id):
+            return
+
+        self._published_presence[game_id] = presence
+        asyncio.ensure_future(self.publish_to_game(PresenceMessage(payload=presence), game_id))
 
     async def send(self, conn: WebSocketServerProtocol, msg: WebsocketMessage) -> None:
-        await conn.send(self.to_ws_msg(msg))
+        if conn in self._send_queues:
+            self._enqueue(conn, self.to_ws_msg(msg), msg)
+        else:
+            # connections not registered (yet) are answered directly
+            await conn.send(self.to_ws_msg(msg))
+
+    def _enqueue(self, conn: WebSocketServerProtocol, raw_msg: str, msg: WebsocketMessage) -> None:
+        # presence messages of a player may be dropped or coalesced for slow connections
+        presence_key = None
+        if isinstance(msg, (NewConnectionMessage, EndConnectionMessage)):
+            presence_key = msg.payload.username
+        elif isinstance(msg, PresenceMessage):
+            presence_key = PRESENCE_KEY
+
+        self._send_queues[conn].put(raw_msg, presence_key)
 
     async def send_player(self, player_id: PlayerConnectionID, msg: WebsocketMessage) -> None:
         conn = self._players_to_connections[player_id]
         await self.send(conn, msg)
 
+    async def send_player_serialized(self, player_id: PlayerConnectionID, raw_msg: str) -> None:
+        """Send the message serialized before, e.g. once for many players."""
+        conn = self._players_to_connections.get(player_id)
+        if conn is not None:
+            self._send_queues[conn].put(raw_msg)
+
     async def start(self, host: Optional[str] = None, port: int = 5678) -> None:
-        await websockets.serve(self.serve, host, port, ping_interval=1, ping_timeout=2)
+        # pings of the websockets library are replaced by the liveness monitor. Frames are limited by the library
+        # to the most bytes the longest accepted message may take in UTF-8, so they are not buffered beyond that
+        await websockets.serve(self.serve, host, port, ping_interval=None, ping_timeout=None,
+                               max_size=4 * self._max_msg_size)
+        self._liveness.start(asyncio.get_event_loop())
 
         self._logger.info(f'Starting server at host={host} and port={port}')
 
+    def _decode(self, conn: WebSocketServerProtocol, raw_msg: Union[str, bytes]) -> Optional[WebsocketMessage]:
+        """Message of the frame or None if the frame is rejected. The checks go from the cheapest ones, so oversized
+        frames and frames over the rate limit are dropped without decoding them. Rejected moves of the player are
+        answered, so the client does not wait for them."""
+        player_id = self._connections_to_players[conn]
+        self._recv_metrics.received_messages += 1
+
+        if len(raw_msg) > self._max_msg_size:
+            self._recv_metrics.rejected_oversized += 1
+            self._logger.warning(f'Rejected message of {len(raw_msg)} characters from {player_id}')
+            self._reject_request(conn, raw_msg, 'Message is too large')
+            return None
+
+        if not self._recv_buckets[conn].take(monotonic()):
+            self._recv_metrics.rejected_rate_limited += 1
+            self._logger.debug(f'Rejected message over the rate limit from {player_id}')
+            self._reject_request(conn, raw_msg, 'Too many messages, retry later')
+            return None
+
+        data = _load_json(raw_msg)
+        if not isinstance(data, dict):
+            self._recv_metrics.rejected_malformed += 1
+            self._logger.warning(f'Rejected malformed message from {player_id}')
+            return None
+
+        claimed_player = get_claimed_player(data)
+        if claimed_player is not None and claimed_player != player_id[0]:
+            self._recv_metrics.rejected_impersonating += 1
+            self._logger.warning(f'Rejected event of player "{claimed_player}" from {player_id}')
+            return None
+
+        try:
+            return WebsocketMessageSchema().load(data)
+        except Exception:
+            # the schemas raise all kinds of errors on unexpected shapes of the data
+            self._recv_metrics.rejected_malformed += 1
+            self._logger.warning(f'Rejected malformed message from {player_id}')
+            self._reject_request(conn, raw_msg, 'Malformed message')
+            return None
+
+    def _reject_request(self, conn: WebSocketServerProtocol, raw_msg: Union[str, bytes], reason: str) -> None:
+        """Answer the move requested by the rejected frame, unless it is not a move of the player of the connection
+        (any move of the game for spectators), it cannot be found or a rejection was answered to the connection
+        shortly before."""
+        now = monotonic()
+        if now < self._rejections_answered.get(conn, float('-inf')) + self._rejections_interval:
+            return
+
+        answer = get_rejected_request(raw_msg, reason)
+        if answer is None:
+            return
+
+        player_id = self._connections_to_players[conn]
+        move = cast(PlayerMoveEvent, answer.payload.event)
+        # spectators are not identified by their usernames, the answer goes back to the connection anyway
+        if move.game_id == player_id[1] and (player_id in self._spectators or move.params.player == player_id[0]):
+            self._rejections_answered[conn] = now
+            self._enqueue(conn, self.to_ws_msg(answer), answer)
+
     async def _recv(self, conn: WebSocketServerProtocol) -> None:
+        msg: Optional[WebsocketMessage] = None
         try:
             async for raw_msg in conn:
-                msg = self.from_ws_msg(cast(str, raw_msg))
+                self._liveness.touch(conn)
+
+                player_id = self._connections_to_players[conn]
+                if player_id in self._spectators:
+                    self._logger.warning(f'Ignored message of spectator {player_id}')
+                    self._reject_request(conn, raw_msg, 'Spectators cannot make moves')
+                    continue
+
+                msg = self._decode(conn, raw_msg)
+                if msg is None:
+                    continue
                 self._logger.debug(f'Received message: "{msg}"')
 
                 if self._on_new_msg is not None:
-                    self._on_new_msg(self._connections_to_players[conn], msg)
+                    self._on_new_msg(player_id, msg)
         except Exception:
             self._logger.exception(f'Error raised on new message "{msg}"')
 
@@ -188,15 +412,23 @@ class Server:
         if ok:
             try:
                 task = asyncio.Task(self._recv(websocket))
-                self._tasks_by_player[player_conn.player_id] = task
+                self._tasks_by_player[self._connections_to_players[websocket]] = task
                 await task
             finally:
                 await self.unregister(websocket, path)
 
     async def stop(self) -> None:
+        self._liveness.stop()
         for player_id in list(self._players_to_connections):
             self.disconnect(player_id)
 
         futures = [client.wait_closed() for client in self._connections_to_players]
         if futures:
             await asyncio.wait(futures, return_when=asyncio.ALL_COMPLETED)
+
+
+def _load_json(raw_msg: Union[str, bytes]) -> Any:
+    try:
+        return json.loads(raw_msg)
+    except ValueError:
+        return None
@@ -0,0 +1,55 @@
+from dataclasses import fields
+from typing import Any, Optional, Tuple, Type, TypeVar
+
+__all__ = [
+    'slotted',
+]
+
+T = TypeVar('T')
+
+
+def _frozen_getstate(self) -> Tuple[Any, ...]:
+    return tuple(getattr(self, f.name) for f in fields(self))
+
+
+def _frozen_setstate(self, state: Tuple[Any, ...]) -> None:
+    # frozen instances forbid regular attribute assignment used by pickle/copy
+    for f, value in zip(fields(self), state):
+        object.__setattr__(self, f.name, value)
+
+
+def slotted(cls: Optional[Type[T]] = None, *,
+            extra: Tuple[str, ...] = ()) -> Any:
+    """Recreate a dataclass with `__slots__` instead of per-instance `__dict__`.
+
+    Python 3.7 dataclasses cannot declare slots for fields with defaults, so the class is rebuilt after
+    `@dataclass` has processed it. `extra` names additional slots for values, which are not dataclass fields
+    (e.g. lazily cached properties). Must be applied on top of `@dataclass`, and base classes must be slotted too.
+    """
+    def wrap(cls: Any) -> Any:
+        inherited_slots = {
+            name
+            for base in cls.__mro__[1:]
+            for name in getattr(base, '__slots__', ())
+        }
+        slots = tuple(f.name for f in fields(cls) if f.name not in inherited_slots) + extra
+
+        cls_dict = dict(cls.__dict__)
+        for name in slots:
+            cls_dict.pop(name, None)
+        cls_dict.pop('__dict__', None)
+        cls_dict.pop('__weakref__', None)
+        cls_dict['__slots__'] = slots
+
+        slotted_cls = type(cls)(cls.__name__, cls.__bases__, cls_dict)
+        slotted_cls.__qualname__ = cls.__qualname__
+
+        if getattr(cls, '__dataclass_params__').frozen:
+            slotted_cls.__getstate__ = _frozen_getstate  # type: ignore
+            slotted_cls.__setstate__ = _frozen_setstate  # type: ignore
+
+        return slotted_cls
+
+    if cls is None:
+        return wrap
+    return wrap(cls)
@@ -0,0 +1,194 @@
+import os
+import shutil
+import sys
+from dataclasses import dataclass, field
+from enum import Enum, unique
+from typing import Iterator, List, Optional, TextIO
+
+from scrabble.analysis import find_events_files, map_files
+from scrabble.game import GameState, GameStateSnapshot
+from scrabble.storage import (get_checkpoint_file_path, get_events_file_game_id, get_index_file_path,
+                              get_snapshots_file_path, load_archived_snapshot, load_snapshots, read_events)
+from scrabble.storage.archive import ARCHIVE_FILE_SUFFIX
+
+__all__ = [
+    'VerificationCheck',
+    'VerificationError',
+    'VerificationResult',
+    'verify_events_file',
+    'verify_directory',
+    'quarantine',
+    'run_verification',
+]
+
+
+@unique
+class VerificationCheck(Enum):
+    READ = 'read'
+    GAME_ID = 'game_id'
+    SEQUENCE = 'sequence'
+    REPLAY = 'replay'
+    SNAPSHOT = 'snapshot'
+
+
+@dataclass
+class VerificationError:
+    check: VerificationCheck
+    message: str
+    # sequence of the offending event (or snapshot), if known
+    sequence: Optional[int] = field(default=None)
+
+    def __str__(self) -> str:
+        location = f'sequence {self.sequence}: ' if self.sequence is not None else ''
+        return f'{location}{self.check.value}: {self.message}'
+
+
+@dataclass
+class VerificationResult:
+    file_path: str
+    game_id: Optional[int] = field(default=None)
+    events: int = field(default=0)
+    errors: List[VerificationError] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+
+def _verify_snapshots(result: VerificationResult, snapshots: List[GameStateSnapshot],
+                      state: GameState) -> List[GameStateSnapshot]:
+    """Compare the snapshots of the state sequence to the replayed state, return the rest of snapshots."""
+    while snapshots and snapshots[0].sequence <= state.latest_event_sequence:
+        snapshot = snapshots.pop(0)
+        if snapshot.sequence < state.latest_event_sequence:
+            continue
+
+        if snapshot.game_id != state.game_id:
+            result.errors.append(VerificationError(VerificationCheck.SNAPSHOT, sequence=snapshot.sequence,
+                                                   message=f'Snapshot of game {snapshot.game_id}'))
+            continue
+
+        scores = {player.username: player.score for player in state.players}
+        snapshot_scores = {player.username: player.score for player in snapshot.players}
+        if scores != snapshot_scores:
+            result.errors.append(VerificationError(VerificationCheck.SNAPSHOT, sequence=snapshot.sequence,
+                                                   message=f'Scores {snapshot_scores} != replayed {scores}'))
+        elif snapshot != state.snapshot():
+            result.errors.append(VerificationError(VerificationCheck.SNAPSHOT, sequence=snapshot.sequence,
+                                                   message='Snapshot differs from the replayed state'))
+
+    return snapshots
+
+
+def verify_events_file(file_path: str) -> VerificationResult:
+    """Check the game log: consistent game ids, contiguous sequences, replayability of every event and consistency
+    of the saved snapshots (incl. players scores) with the replayed state.
+
+    Checking stops at the first broken event.
+    """
+    result = VerificationResult(file_path=file_path, game_id=get_events_file_game_id(file_path))
+
+    try:
+        if file_path.endswith(ARCHIVE_FILE_SUFFIX):
+            snapshots = [load_archived_snapshot(file_path)]
+        else:
+            snapshots = load_snapshots(get_snapshots_file_path(file_path))
+    except Exception as e:
+        result.errors.append(VerificationError(VerificationCheck.READ, message=f'Broken snapshots file: {e}'))
+        snapshots = []
+
+    state: Optional[GameState] = None
+    events = read_events(file_path)
+    while True:
+        sequence = result.events + 1
+        try:
+            event = next(events)
+        except StopIteration:
+            break
+        except Exception as e:
+            result.errors.append(VerificationError(VerificationCheck.READ, sequence=sequence,
+                                                   message=f'{type(e).__name__}: {e}'))
+            return result
+
+        if result.game_id is None:
+            result.game_id = event.game_id
+        if state is None:
+            state = GameState(result.game_id)
+
+        if event.game_id != result.game_id:
+            result.errors.append(VerificationError(VerificationCheck.GAME_ID, sequence=sequence,
+                                                   message=f'Event of game {event.game_id}, expected {result.game_id}'))
+            return result
+        if event.sequence != sequence:
+            result.errors.append(VerificationError(VerificationCheck.SEQUENCE, sequence=sequence,
+                                                   message=f'Event has sequence {event.sequence}'))
+            return result
+
+        try:
+            state.apply_event(event)
+        except Exception as e:
+            result.errors.append(VerificationError(VerificationCheck.REPLAY, sequence=sequence,
+                                                   message=f'{type(e).__name__}: {e}'))
+            return result
+
+        result.events += 1
+        snapshots = _verify_snapshots(result, snapshots, state)
+
+    if result.events == 0:
+        result.errors.append(VerificationError(VerificationCheck.READ, message='No events'))
+    for snapshot in snapshots:
+        result.errors.append(VerificationError(VerificationCheck.SNAPSHOT, sequence=snapshot.sequence,
+                                               message='Snapshot is ahead of the events'))
+
+    return result
+
+
+def verify_directory(directory: str, jobs: Optional[int] = None) -> Iterator[VerificationResult]:
+    """Verify all the events files of the directory (recursively) in parallel."""
+    return map_files(verify_events_file, find_events_files(directory), jobs=jobs)
+
+
+def quarantine(file_path: str, directory: str, quarantine_directory: str) -> str:
+    """Move the events file (with its sidecar files) from the directory to the quarantine one, keeping
+    the relative path.
+
+    Returns the new events file path.
+    """
+    quarantined_path = os.path.join(quarantine_directory, os.path.relpath(file_path, directory))
+    os.makedirs(os.path.dirname(quarantined_path), exist_ok=True)
+
+    for get_sidecar_file_path in (get_snapshots_file_path, get_checkpoint_file_path, get_index_file_path):
+        sidecar_file_path = get_sidecar_file_path(file_path)
+        if os.path.exists(sidecar_file_path):
+            shutil.move(sidecar_file_path, get_sidecar_file_path(quarantined_path))
+    shutil.move(file_path, quarantined_path)
+
+    return quarantined_path
+
+
+def run_verification(directory: str, quarantine_directory: Optional[str] = None, jobs: Optional[int] = None,
+                     fout: Optional[TextIO] = None) -> List[VerificationResult]:
+    """Report every broken game log of the directory, optionally moving it to the quarantine directory.
+
+    Returns the failed results.
+    """
+    fout = fout or sys.stdout
+    failed: List[VerificationResult] = []
+    verified = 0
+
+    for result in verify_directory(directory, jobs=jobs):
+        verified += 1
+        if result.ok:
+            continue
+
+        failed.append(result)
+        for error in result.errors:
+            fout.write(f'{result.file_path}: {error}\n')
+
+        if quarantine_directory is not None:
+            quarantined_path = quarantine(result.file_path, directory, quarantine_directory)
+            fout.write(f'{result.file_path}: moved to {quarantined_path}\n')
+
+    fout.write(f'Verified {verified} games, {len(failed)} failed\n')
+
+    return failed
@@ -0,0 +1,31 @@
+from pytest import fixture
+
+from scrabble.game import BoardSettings, BoardTile, BoardWord, Bonus, WordDirection
+from scrabble.game.api import (GameInitEvent, GameInitParams, GameStartEvent, GameStartParams, PlayerAddLettersEvent,
+                               PlayerAddLettersParams, PlayerMoveEvent, PlayerMoveParams)
+
+
+@fixture
+def game_events():
+    """Events of a short game #7: two players and three moves."""
+    def move(sequence, player, tiles):
+        return PlayerMoveEvent(sequence=sequence, game_id=7, params=PlayerMoveParams(player=player, tiles=[
+            BoardTile(x=x, y=y, letter=letter)
+            for x, y, letter in tiles
+        ]))
+
+    board_settings = BoardSettings(width=15, height=15, init_word=BoardWord('cat', 5, 7, WordDirection.RIGHT),
+                                   bonuses=[Bonus(location_x=6, location_y=8, multiplier=2)])
+    return [
+        GameInitEvent(sequence=1, game_id=7, params=GameInitParams(
+            players=['a', 'b'], board_settings=board_settings, lang='en',
+            letters=list('sonqwertyuiopzxcvbnmt'))),
+        PlayerAddLettersEvent(sequence=2, game_id=7, params=PlayerAddLettersParams(
+            player='a', letters=list('sonqwer'))),
+        PlayerAddLettersEvent(sequence=3, game_id=7, params=PlayerAddLettersParams(
+            player='b', letters=list('tyuiopz'))),
+        GameStartEvent(sequence=4, game_id=7, params=GameStartParams(player_to_start='a')),
+        move(5, 'a', [(8, 7, 's')]),
+        move(6, 'b', [(6, 8, 't')]),
+        move(7, 'a', [(8, 8, 'o'), (8, 9, 'n')]),
+    ]
@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+
+from scrabble.engine import ClientEngine
+from scrabble.game import GameState
+from scrabble.game.api import PlayerMoveEvent, PlayerMoveParams
+from scrabble.transport import EventMessage, EventMessagePayload, EventStatus, Server
+
+
+class _Conn:
+
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, raw_msg):
+        self.sent.append(raw_msg)
+
+
+def test_rate_limited_move_rolled_back(monkeypatch):
+    client_engine = ClientEngine('qu', 10)
+    rollbacks = []
+    monkeypatch.setattr(client_engine, '_rollback_move', lambda: rollbacks.append(client_engine._pending_move))
+
+    move = PlayerMoveEvent(sequence=5, game_id=10, params=PlayerMoveParams(player='qu', exchange_letters=['a']))
+    client_engine._pending_move = move
+    client_engine._pending_request_id = 'r1'
+
+    async def run():
+        server = Server(msg_rate=0.001, msg_burst=1)
+        conn = _Conn()
+        server.add_player_conn(('qu', 10), conn)
+
+        request = server.to_ws_msg(EventMessage(payload=EventMessagePayload(event=move, request_id='r1'),
+                                                status=EventStatus.REQUESTED))
+        # the retry of the move exceeds the rate limit of the player
+        assert server._decode(conn, request) is not None
+        assert server._decode(conn, request) is None
+        await asyncio.sleep(0)
+
+        server.remove_player_conn(('qu', 10))
+        return [server.from_ws_msg(raw_msg) for raw_msg in conn.sent]
+
+    answers = asyncio.run(run())
+    for answer in answers:
+        client_engine._on_client_msg(answer)
+
+    assert [answer.status for answer in answers] == [EventStatus.REJECTED]
+    assert rollbacks == [move]
+
+
+@pytest.mark.parametrize("latest_sequence,catch_up,resent", [
+    # the pending move was approved while disconnected, it comes with the catch-up
+    (5, [4], False),
+    # nothing answers the pending move
+    (4, [], True),
+    (None, [], True),
+])
+def test_pending_move_resent_after_catch_up(game_events, monkeypatch, latest_sequence, catch_up, resent):
+    client_engine = ClientEngine('a', 7)
+    client_engine._state = GameState(7, events=game_events[:4])
+    monkeypatch.setattr(client_engine, '_gui_apply_event', lambda event: None)
+    sent = []
+    monkeypatch.setattr(client_engine, 'send_event', lambda event, request_id: sent.append((event, request_id)))
+
+    move = game_events[4]
+    client_engine._pending_move = move
+    client_engine._pending_request_id = 'r1'
+
+    client_engine._on_server_authorized(latest_sequence)
+    for index in catch_up:
+        # the pending move is not sent before the catch-up is applied
+        assert sent == []
+        client_engine.handle_game_event(EventMessage(payload=EventMessagePayload(event=game_events[index]),
+                                                     status=EventStatus.APPROVED))
+
+    assert sent == ([(move, 'r1')] if resent else [])
+    assert (client_engine._pending_move is not None) == resent
+
+
+@pytest.mark.parametrize("spectator", [False, True])
+def test_spectator_cannot_compose_moves(spectator):
+    client_engine = ClientEngine('a', 7, spectator=spectator)
+    client_engine._window.set_player_turn('a')
+
+    assert client_engine._window._can_change_editor_mode != spectator
@@ -0,0 +1,151 @@
+import json
+
+import pytest
+
+from scrabble.engine import ServerEngine
+from scrabble.game import BoardWord, BoardWords, GameState, WordDirection
+from scrabble.game.api import PlayerMoveEvent, PlayerMoveParams
+from scrabble.storage import FileEventStore
+from scrabble.transport import EventStatus
+
+
+@pytest.fixture
+def make_server_engine(tmp_path):
+    server_engines = []
+
+    def make(**kwargs):
+        server_engine = ServerEngine(FileEventStore(str(tmp_path)), **kwargs)
+        server_engines.append(server_engine)
+        return server_engine
+
+    yield make
+    for server_engine in server_engines:
+        server_engine._writer.close()
+
+
+@pytest.fixture
+def server_engine(make_server_engine):
+    return make_server_engine()
+
+
+@pytest.fixture
+def game_id(server_engine):
+    game_id = server_engine.init_new_game(1)
+    # players connected to the game
+    server_engine._players.update({('a', game_id), ('b', game_id)})
+    return game_id
+
+
+def test_start_game_uppercase_initial_word(server_engine, game_id):
+    server_engine.start_game(game_id, 'Hello')
+
+    assert [word.word for word in server_engine.get_game_state(game_id).board.words] == ['hello']
+
+
+@pytest.mark.parametrize("initial_word,lang", [
+    ("привет", "en"),
+    ("hello", "ru"),
+    ("he11o", "en"),
+])
+def test_start_game_letters_out_of_alphabet(server_engine, game_id, initial_word, lang):
+    with pytest.raises(ValueError, match=f'out of the "{lang}" alphabet'):
+        server_engine.start_game(game_id, initial_word, lang)
+
+    # the game is untouched and may be started with a proper word
+    server_engine.start_game(game_id, 'hello', 'en')
+    assert server_engine.get_game_state(game_id).language == 'en'
+
+
+def test_start_game_unknown_language(server_engine, game_id):
+    with pytest.raises(ValueError, match='Unknown language'):
+        server_engine.start_game(game_id, 'hello', 'de')
+
+
+def test_new_games_evicted_and_restored(make_server_engine):
+    server_engine = make_server_engine(max_resident_games=2)
+    for game_id in (1, 2, 3):
+        server_engine.init_new_game(game_id)
+
+    # the least recently created game is evicted, but still exists
+    with pytest.raises(KeyError):
+        server_engine.get_game_state(1)
+    with pytest.raises(RuntimeError, match='already exists'):
+        server_engine.init_new_game(1)
+
+    server_engine._players.update({('a', 1), ('b', 1)})
+    server_engine.start_game(1, 'hello')
+    assert server_engine.get_game_state(1).latest_event_sequence == 4
+
+
+def test_idle_new_games_dropped(make_server_engine):
+    server_engine = make_server_engine(max_resident_games=1, idle_timeout=0)
+    server_engine.init_new_game(1)
+    server_engine.init_new_game(2)
+
+    # nothing is archived, the resident and the evicted games are dropped
+    assert server_engine.compact() == []
+    for game_id in (1, 2):
+        with pytest.raises(RuntimeError, match='not initialized'):
+            server_engine.start_game(game_id, 'hello')
+        server_engine.init_new_game(game_id)
+
+
+def test_spectator_snapshot_from_latest_snapshot(server_engine, game_id, monkeypatch):
+    server_engine.start_game(game_id, 'hello')
+    events = server_engine._events[game_id]
+    # the latest events are not durable yet and the latest snapshot was taken before them
+    server_engine._durable_events[game_id] = len(events) - 1
+    server_engine._snapshots[game_id] = [GameState(game_id, events=events[:len(events) - 2]).snapshot()]
+
+    applied = []
+    apply_event = GameState.apply_event
+
+    def counted_apply_event(state, event):
+        applied.append(event.sequence)
+        apply_event(state, event)
+
+    monkeypatch.setattr(GameState, 'apply_event', counted_apply_event)
+    snapshot = json.loads(server_engine._get_spectator_snapshot(game_id))['payload']['snapshot']
+
+    # only the durable events after the snapshot are replayed
+    assert applied == [len(events) - 1]
+    assert snapshot['sequence'] == len(events) - 1
+
+
+def test_requested_move_with_words_rejected(server_engine, game_id, monkeypatch):
+    answers = []
+    monkeypatch.setattr(server_engine, '_send', lambda player_id, msg: answers.append(msg))
+    server_engine.start_game(game_id, 'hello')
+    game_state = server_engine.get_game_state(game_id)
+    player = game_state.player_to_move
+    sequence = game_state.latest_event_sequence + 1
+
+    words = BoardWords([BoardWord(word='hell', start_x=0, start_y=0, direction=WordDirection.RIGHT)])
+    server_engine._on_event_request((player, game_id), PlayerMoveEvent(
+        sequence=sequence, game_id=game_id, params=PlayerMoveParams(player=player, words=words)))
+
+    # the words of the requested moves are derived from their tiles only
+    assert [answer.status for answer in answers] == [EventStatus.REJECTED]
+    assert answers[0].payload.reason == 'Moves must place tiles instead of words'
+    assert game_state.latest_event_sequence == sequence - 1
+
+    server_engine._on_event_request((player, game_id), PlayerMoveEvent(
+        sequence=sequence, game_id=game_id, params=PlayerMoveParams(player=player)))
+    assert game_state.latest_event_sequence >= sequence
+
+
+def test_failed_command_does_not_stop_console(server_engine):
+    commands = iter(['load 999', 'start 998 hello', 'new 5', 'q'])
+    server_engine._cmd(read_cmd=lambda: next(commands))
+
+    # the commands after the failed ones are run
+    assert server_engine.get_game_state(5).latest_event_sequence == 0
+
+
+def test_allocated_game_ids_skip_unsaved_games(make_server_engine):
+    server_engine = make_server_engine(max_resident_games=1)
+    # the games with explicit ids are not saved, the first one is evicted while new
+    server_engine.init_new_game(1001)
+    server_engine.init_new_game(1002)
+
+    assert server_engine.init_new_game() == 1003
@@ -0,0 +1,55 @@
+from scrabble.engine import ShardedServerEngine
+
+
+class _Worker:
+
+    def __init__(self, port, alive=True):
+        self.port = port
+        self.alive = alive
+        self.exitcode = None if alive else 1
+
+    def is_alive(self):
+        return self.alive
+
+
+class _Commands:
+
+    def __init__(self):
+        self.sent = []
+        self.closed = False
+
+    def send(self, cmd):
+        if self.closed:
+            raise BrokenPipeError('Closed')
+        self.sent.append(cmd)
+
+    def close(self):
+        self.closed = True
+
+
+def test_dead_workers_restarted(monkeypatch):
+    sharded_engine = ShardedServerEngine(lambda: None, workers=3)
+    monkeypatch.setattr(sharded_engine, '_start_worker', lambda port: (_Worker(port), _Commands()))
+    sharded_engine._worker_ports = [5679, 5680, 5681]
+    sharded_engine._workers = [_Worker(5679), _Worker(5680, alive=False), _Worker(5681)]
+    sharded_engine._commands = [_Commands(), _Commands(), _Commands()]
+    dead_commands = sharded_engine._commands[1]
+
+    sharded_engine._restart_dead_workers()
+
+    # the dead worker is started again at its port, so the router keeps routing its games
+    assert [worker.port for worker in sharded_engine._workers] == [5679, 5680, 5681]
+    assert all(worker.is_alive() for worker in sharded_engine._workers)
+    assert dead_commands.closed
+    sharded_engine._broadcast_cmd('stats')
+    assert [commands.sent for commands in sharded_engine._commands] == [['stats']] * 3
+
+
+def test_commands_to_dead_worker_dropped():
+    sharded_engine = ShardedServerEngine(lambda: None, workers=2)
+    sharded_engine._commands = [_Commands(), _Commands()]
+    sharded_engine._commands[0].close()
+
+    sharded_engine._broadcast_cmd('compact')
+
+    assert [commands.sent for commands in sharded_engine._commands] == [[], ['compact']]
@@ -3,29 +3,45 @@ from datetime import datetime
 
 import pytest
 
-from scrabble.game import BoardWord, BoardWords, WordDirection
+from scrabble.game import BoardTile, BoardWord, BoardWords, WordDirection
 from scrabble.game.api import PlayerMoveEvent, PlayerMoveParams
 from scrabble.serializers.game.api import EventSchema
 
 
-@pytest.mark.parametrize("username,words,exchange_letters", [
-    ("user1", [('word', 1, 1, WordDirection.RIGHT)], ['a', 'b', 'c']),
-    ("user2", [('wordword', 10, 100, WordDirection.DOWN)], []),
+@pytest.mark.parametrize("username,words,exchange_letters,tiles", [
+    ("user1", [('word', 1, 1, WordDirection.RIGHT)], ['a', 'b', 'c'], []),
+    ("user2", [('wordword', 10, 100, WordDirection.DOWN)], [], []),
     ("user3", [('wordqu', 0, 220, WordDirection.RIGHT), ('anotherword', 20, 100, WordDirection.DOWN)],
-     list(string.ascii_lowercase)),
+     list(string.ascii_lowercase), []),
+    ("user4", [], ['a'], [(1, 2, 'a'), (1, 3, 'b')]),
 ])
-def test_player_move_serializer(username, words, exchange_letters):
+def test_player_move_serializer(username, words, exchange_letters, tiles):
     timestamp = int(datetime.timestamp(datetime.now()))
     event = PlayerMoveEvent(timestamp=timestamp, sequence=4, game_id=15,
                             params=PlayerMoveParams(player=username, words=BoardWords(words=[
                                 BoardWord(w[0], w[1], w[2], w[3])
                                 for w in words
-                            ]), exchange_letters=exchange_letters))
+                            ]), exchange_letters=exchange_letters, tiles=[
+                                BoardTile(x=t[0], y=t[1], letter=t[2])
+                                for t in tiles
+                            ]))
     expected_dump = {"name": "PLAYER_MOVE", "timestamp": timestamp, "sequence": 4, "game_id": 15,
                      "params": {"player": username, "words": {"words": [
                          {"word": w[0], "start_x": w[1], "start_y": w[2], "direction": w[3].name}
                          for w in words
-                     ]}, "exchange_letters": exchange_letters}}
+                     ]}, "exchange_letters": exchange_letters, "tiles": [
+                         {"x": t[0], "y": t[1], "letter": t[2]}
+                         for t in tiles
+                     ]}}
 
     assert EventSchema().dump(event) == expected_dump
     assert EventSchema().load(expected_dump) == event
+
+
+def test_player_move_serializer_without_tiles():
+    dumped = {"name": "PLAYER_MOVE", "timestamp": 10, "sequence": 4, "game_id": 15,
+              "params": {"player": "user1", "words": {"words": []}, "exchange_letters": ["a"]}}
+
+    event = EventSchema().load(dumped)
+    assert event.params.tiles == []
+    assert event.params.exchange_letters == ["a"]
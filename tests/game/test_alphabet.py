@@ -0,0 +1,45 @@
+import pytest
+
+from scrabble.game import EMPTY_CELL, Alphabet, get_alphabet
+from scrabble.game.constants import LETTERS_DISTRIBUTION
+
+
+@pytest.mark.parametrize("letters,word", [
+    ('abc', 'cab'),
+    ('abcabc', 'aabbcc'),
+    ('слово', 'вол'),
+])
+def test_alphabet_encode_decode(letters, word):
+    alphabet = Alphabet(letters)
+    encoded = alphabet.encode(word)
+
+    assert isinstance(encoded, bytes)
+    assert EMPTY_CELL not in encoded
+    assert alphabet.decode(encoded) == list(word)
+    assert len(alphabet) == len(set(letters))
+
+
+def test_alphabet_invalid():
+    with pytest.raises(ValueError):
+        Alphabet(['ab'])
+
+    alphabet = Alphabet('abc')
+    with pytest.raises(ValueError):
+        alphabet.encode('abd')
+    with pytest.raises(ValueError):
+        alphabet.letter(EMPTY_CELL)
+    with pytest.raises(ValueError):
+        alphabet.letter(4)
+
+
+@pytest.mark.parametrize("lang", list(LETTERS_DISTRIBUTION))
+def test_language_alphabet(lang):
+    alphabet = get_alphabet(lang)
+
+    assert list(alphabet) == list(LETTERS_DISTRIBUTION[lang])
+    assert all(letter in get_alphabet() for letter in alphabet)
+
+
+def test_unknown_language_alphabet():
+    with pytest.raises(ValueError):
+        get_alphabet('xx')
@@ -1,6 +1,9 @@
+import pickle
+from copy import deepcopy
+
 import pytest
 
-from scrabble.game import Board, BoardSettings, BoardWord, BoardWords, Bonus, WordDirection
+from scrabble.game import Board, BoardSettings, BoardTile, BoardWord, BoardWords, Bonus, WordDirection
 from scrabble.game.exceptions import WordIntersectionError
 from scrabble.serializers.game import BoardSettingsSchema, BonusSchema
 
@@ -220,14 +223,14 @@ def test_board_words(w1: BoardWord, w2: BoardWord, intersects: bool):
 
 
 @pytest.mark.parametrize("word,path", [
-    (BoardWord('word', 0, 0, WordDirection.RIGHT), [(i, 0) for i in range(4)]),
-    (BoardWord('word', 5, 2, WordDirection.RIGHT), [(i, 2) for i in range(5, 9)]),
-    (BoardWord('wordword', 0, 0, WordDirection.RIGHT), [(i, 0) for i in range(8)]),
-    (BoardWord('word', 0, 0, WordDirection.DOWN), [(0, i) for i in range(4)]),
-    (BoardWord('word', 10, 20, WordDirection.DOWN), [(10, i) for i in range(20, 24)]),
-    (BoardWord('wordword', 5, 6, WordDirection.DOWN), [(5, i) for i in range(6, 14)]),
-    (BoardWord('word', 5, 5, WordDirection.RIGHT), [(i, 5) for i in range(5, 9)]),
-    (BoardWord('word', 7, 3, WordDirection.DOWN), [(7, i) for i in range(3, 7)]),
+    (BoardWord('word', 0, 0, WordDirection.RIGHT), tuple((i, 0) for i in range(4))),
+    (BoardWord('word', 5, 2, WordDirection.RIGHT), tuple((i, 2) for i in range(5, 9))),
+    (BoardWord('wordword', 0, 0, WordDirection.RIGHT), tuple((i, 0) for i in range(8))),
+    (BoardWord('word', 0, 0, WordDirection.DOWN), tuple((0, i) for i in range(4))),
+    (BoardWord('word', 10, 20, WordDirection.DOWN), tuple((10, i) for i in range(20, 24))),
+    (BoardWord('wordword', 5, 6, WordDirection.DOWN), tuple((5, i) for i in range(6, 14))),
+    (BoardWord('word', 5, 5, WordDirection.RIGHT), tuple((i, 5) for i in range(5, 9))),
+    (BoardWord('word', 7, 3, WordDirection.DOWN), tuple((7, i) for i in range(3, 7))),
 ])
 def test_board_word_path(word, path):
     assert word.path == path
@@ -326,3 +329,149 @@ def test_played_letters(init_words, words, played_letters):
     if init_words:
         board.insert_words(BoardWords(words=init_words))
     assert sorted(board.get_letters_to_insert_words(BoardWords(words=words))) == sorted(played_letters)
+
+
+def test_board_letter_at():
+    board = Board(settings=BoardSettings(width=20, height=20,
+                                         init_word=BoardWord('abacaba', 5, 5, WordDirection.RIGHT)))
+    board.insert_words(BoardWords(words=[BoardWord('cat', 8, 5, WordDirection.DOWN)]))
+
+    assert board.letter_at(5, 5) == 'a'
+    assert board.letter_at(8, 5) == 'c'
+    assert board.letter_at(8, 7) == 't'
+    assert board.letter_at(8, 8) is None
+    assert board.letter_at(-1, 5) is None
+    assert board.letter_at(5, 20) is None
+
+
+@pytest.mark.parametrize("word", [
+    BoardWord('word', 5, 7, WordDirection.RIGHT),
+    BoardWord('word', 5, 7, WordDirection.DOWN),
+])
+def test_board_word_copy(word):
+    path = word.path
+
+    for copied in (deepcopy(word), pickle.loads(pickle.dumps(word))):
+        assert copied == word
+        assert copied.path == path
+        assert not hasattr(copied, '__dict__')
+
+
+@pytest.mark.parametrize("word,width,cells", [
+    (BoardWord('word', 5, 7, WordDirection.RIGHT), 20, [145, 146, 147, 148]),
+    (BoardWord('word', 5, 7, WordDirection.DOWN), 20, [145, 165, 185, 205]),
+    (BoardWord('w', 0, 0, WordDirection.DOWN), 10, [0]),
+])
+def test_board_word_cells(word, width, cells):
+    assert list(word.cells(width)) == cells
+
+
+def test_board_words_intersection():
+    words = BoardWords(words=[BoardWord('word', 0, 0, WordDirection.RIGHT),
+                              BoardWord('wiki', 0, 0, WordDirection.DOWN)])
+
+    assert words.intersection(BoardWord('dots', 3, 0, WordDirection.DOWN)) == {(3, 0)}
+    assert words.intersection(BoardWord('kid', 0, 2, WordDirection.RIGHT)) == {(0, 2)}
+    assert not words.intersects(BoardWord('kid', 1, 2, WordDirection.RIGHT))
+
+    with pytest.raises(WordIntersectionError):
+        words.intersection(BoardWord('star', 2, 0, WordDirection.DOWN))
+
+    words.add_word(BoardWord('dots', 3, 0, WordDirection.DOWN))
+    assert words.letter_at(3, 3) == 's'
+    with pytest.raises(WordIntersectionError):
+        words.add_word(BoardWord('salt', 0, 3, WordDirection.RIGHT))
+    assert len(words) == 3
+
+
+def _tiles(x, y, letters, direction=WordDirection.RIGHT):
+    dx, dy = (1, 0) if direction == WordDirection.RIGHT else (0, 1)
+    return [BoardTile(x=x + dx * offset, y=y + dy * offset, letter=letter) for offset, letter in enumerate(letters)]
+
+
+@pytest.mark.parametrize("init_word,tiles,words,score", [
+    # extends the existing word
+    (BoardWord('cat', 10, 10, WordDirection.RIGHT), _tiles(13, 10, 's'),
+     [BoardWord('cats', 10, 10, WordDirection.RIGHT)], 4),
+    # crosses the existing word
+    (BoardWord('cat', 10, 10, WordDirection.RIGHT),
+     [BoardTile(11, 9, 'b'), BoardTile(11, 11, 'd')],
+     [BoardWord('bad', 11, 9, WordDirection.DOWN)], 3),
+    # parallel to the existing word, forms perpendicular words
+    (BoardWord('cat', 10, 10, WordDirection.RIGHT), _tiles(10, 11, 'on'),
+     [BoardWord('on', 10, 11, WordDirection.RIGHT),
+      BoardWord('co', 10, 10, WordDirection.DOWN),
+      BoardWord('an', 11, 10, WordDirection.DOWN)], 2 + 2 + 2),
+    # fills the gap in the line
+    (BoardWord('cat', 10, 10, WordDirection.DOWN), [BoardTile(9, 11, 'h'), BoardTile(11, 11, 't')],
+     [BoardWord('hat', 9, 11, WordDirection.RIGHT)], 3),
+    # the first word on the empty board
+    (None, _tiles(3, 3, 'word', WordDirection.DOWN), [BoardWord('word', 3, 3, WordDirection.DOWN)], 4),
+    (None, _tiles(3, 3, 'a'), [BoardWord('a', 3, 3, WordDirection.RIGHT)], 1),
+])
+def test_board_insert_tiles(init_word, tiles, words, score):
+    board = Board(settings=BoardSettings(width=20, height=20, init_word=init_word))
+
+    inserted_words, inserted_score = board.insert_tiles(tiles)
+    assert list(inserted_words) == words
+    assert inserted_score == score
+    for tile in tiles:
+        assert board.letter_at(tile.x, tile.y) == tile.letter
+
+
+def test_board_insert_tiles_bonuses():
+    board = Board(settings=BoardSettings(width=20, height=20,
+                                         init_word=BoardWord('cat', 10, 10, WordDirection.RIGHT),
+                                         bonuses=[Bonus(location_x=10, location_y=11, multiplier=2)]))
+
+    # the bonus is used by the first word only
+    assert board.insert_tiles(_tiles(10, 11, 'on'))[1] == 2 * 2 + 2 + 2
+    assert board.insert_tiles(_tiles(10, 12, 'w', WordDirection.DOWN))[1] == 3
+
+
+@pytest.mark.parametrize("tiles,error", [
+    # not connected to the existing words
+    (_tiles(0, 0, 'word'), WordIntersectionError),
+    # filled cell
+    (_tiles(10, 10, 'c'), WordIntersectionError),
+    (_tiles(13, 10, 'ss', WordDirection.DOWN) + _tiles(13, 11, 's'), WordIntersectionError),
+    # not in a single line
+    ([BoardTile(13, 10, 's'), BoardTile(14, 11, 's')], WordIntersectionError),
+    # gap in the word
+    ([BoardTile(13, 10, 's'), BoardTile(15, 10, 's')], WordIntersectionError),
+    (_tiles(19, 10, 'ab'), ValueError),
+    (_tiles(13, 10, '1'), ValueError),
+])
+def test_board_insert_tiles_invalid(tiles, error):
+    board = Board(settings=BoardSettings(width=20, height=20,
+                                         init_word=BoardWord('cat', 10, 10, WordDirection.RIGHT)))
+
+    with pytest.raises(error):
+        board.insert_tiles(tiles)
+    assert board.letter_at(13, 10) is None
+
+
+def test_board_tiles_to_insert_words():
+    board = Board(settings=BoardSettings(width=20, height=20,
+                                         init_word=BoardWord('cat', 10, 10, WordDirection.RIGHT)))
+    words = BoardWords(words=[BoardWord('bad', 11, 9, WordDirection.DOWN),
+                              BoardWord('do', 11, 11, WordDirection.RIGHT)])
+
+    assert board.get_tiles_to_insert_words(words) == [BoardTile(11, 9, 'b'), BoardTile(11, 11, 'd'),
+                                                      BoardTile(12, 11, 'o')]
+
+
+def test_board_words_index_built_once(monkeypatch):
+    built = []
+    build_cells = BoardWords._build_cells
+    monkeypatch.setattr(BoardWords, '_build_cells', lambda self: built.append(self) or build_cells(self))
+
+    words = BoardWords(words=[BoardWord('word', 0, 0, WordDirection.RIGHT)])
+    assert words.letter_at(1, 0) == 'o'
+    words.add_word(BoardWord('wow', 0, 0, WordDirection.DOWN))
+    assert len(built) == 1
+
+    # the index is built again only after truncating the words
+    words.truncate(1)
+    assert words.letter_at(0, 1) is None
+    assert len(built) == 2
@@ -0,0 +1,114 @@
+import pytest
+
+from scrabble.game import BoardTile, GameState
+from scrabble.game.api import (GameStartEvent, GameStartParams, PlayerAddLettersEvent, PlayerAddLettersParams,
+                               PlayerMoveEvent, PlayerMoveParams)
+from scrabble.serializers.game import GameStateSnapshotSchema
+
+GAME_ID = 7
+
+
+def _move(sequence, player, tiles):
+    return PlayerMoveEvent(sequence=sequence, game_id=GAME_ID, params=PlayerMoveParams(player=player, tiles=[
+        BoardTile(x=x, y=y, letter=letter)
+        for x, y, letter in tiles
+    ]))
+
+
+def test_game_state_snapshot_serializer(game_events):
+    snapshot = GameState(GAME_ID, events=game_events).snapshot()
+    dumped = GameStateSnapshotSchema().dump(snapshot)
+
+    assert GameStateSnapshotSchema().load(dumped) == snapshot
+
+
+def test_game_state_empty_snapshot():
+    snapshot = GameState(GAME_ID).snapshot()
+
+    assert snapshot.sequence == 0
+    assert snapshot.board is None
+    assert GameState.from_snapshot(snapshot).snapshot() == snapshot
+
+
+@pytest.mark.parametrize("snapshot_sequence", [1, 4, 5, 6, 7])
+def test_game_state_from_snapshot(game_events, snapshot_sequence):
+    full_state = GameState(GAME_ID, events=game_events)
+
+    snapshot = GameState(GAME_ID, events=game_events[:snapshot_sequence]).snapshot()
+    snapshot = GameStateSnapshotSchema().load(GameStateSnapshotSchema().dump(snapshot))
+    state = GameState.from_snapshot(snapshot)
+    for event in game_events[snapshot_sequence:]:
+        state.apply_event(event)
+
+    assert state.latest_event_sequence == full_state.latest_event_sequence
+    assert state.snapshot() == full_state.snapshot()
+    assert state.player_to_move == 'b'
+    assert state.get_player_score('a') == full_state.get_player_score('a')
+    assert state.board.letter_at(8, 9) == 'n'
+
+
+def test_game_state_snapshot_is_detached(game_events):
+    state = GameState(GAME_ID, events=game_events[:5])
+    snapshot = state.snapshot()
+
+    state.apply_event(game_events[5])
+
+    assert snapshot.sequence == 5
+    assert snapshot.players[1].letters == list('tyuiopz')
+    assert GameState.from_snapshot(snapshot).board.letter_at(6, 8) is None
+
+
+@pytest.mark.parametrize("invalid_event", [
+    # not the player's turn
+    _move(6, 'a', [(6, 8, 'q')]),
+    # letters the player does not have
+    _move(6, 'b', [(6, 8, 'x')]),
+    # occupied cell
+    _move(6, 'b', [(5, 7, 't')]),
+    # not connected to any word
+    _move(6, 'b', [(0, 0, 't')]),
+    PlayerAddLettersEvent(sequence=6, game_id=GAME_ID, params=PlayerAddLettersParams(player='b', letters=['a'])),
+    GameStartEvent(sequence=6, game_id=GAME_ID, params=GameStartParams(player_to_start='unknown')),
+    # wrong sequence
+    _move(7, 'b', [(6, 8, 't')]),
+])
+def test_game_state_failed_event(game_events, invalid_event):
+    state = GameState(GAME_ID, events=game_events[:5])
+    snapshot = state.snapshot()
+
+    with pytest.raises(Exception):
+        state.apply_event(invalid_event)
+
+    assert state.latest_event_sequence == 5
+    assert state.snapshot() == snapshot
+
+    state.apply_event(game_events[5])
+    assert state.board.letter_at(6, 8) == 't'
+
+
+def test_game_state_is_finished(game_events):
+    state = GameState(GAME_ID, events=game_events)
+    assert not state.is_finished
+    assert not GameState(GAME_ID, events=game_events[:3]).is_finished
+
+    snapshot = state.snapshot()
+    snapshot.letters = ''
+    assert not GameState.from_snapshot(snapshot).is_finished
+
+    snapshot.players[1].letters = []
+    assert GameState.from_snapshot(snapshot).is_finished
+
+
+def test_game_state_last_move_words(game_events):
+    state = GameState(GAME_ID, events=game_events[:4])
+    assert len(state.last_move_words) == 0
+
+    state.apply_event(game_events[4])
+    assert [(word.word, word.start_x, word.start_y) for word in state.last_move_words] == [('cats', 5, 7)]
+
+    # the main word along with the cross words through the placed tiles
+    state.apply_event(game_events[5])
+    state.apply_event(_move(7, 'a', [(7, 8, 'o')]))
+    assert sorted((word.word, word.direction.value) for word in state.last_move_words) == [
+        ('to', 'down'), ('to', 'right'),
+    ]
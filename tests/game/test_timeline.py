@@ -0,0 +1,77 @@
+import pytest
+
+from scrabble.game import GameState, GameTimeline
+
+GAME_ID = 7
+
+
+@pytest.mark.parametrize("keyframe_interval", [1, 2, 3, 25])
+def test_timeline_seek(game_events, keyframe_interval):
+    timeline = GameTimeline(GAME_ID, game_events, keyframe_interval=keyframe_interval)
+    assert timeline.sequence == 0
+    assert timeline.last_sequence == 7
+
+    for sequence in [7, 2, 5, 0, 6, 6, 3, 7, 1]:
+        state = timeline.seek(sequence)
+
+        assert timeline.sequence == sequence
+        assert state.snapshot() == GameState(GAME_ID, events=game_events[:sequence]).snapshot()
+
+
+def test_timeline_step(game_events):
+    timeline = GameTimeline(GAME_ID, game_events, keyframe_interval=2)
+
+    timeline.seek(5)
+    assert timeline.step_forward().board.letter_at(6, 8) == 't'
+    assert timeline.sequence == 6
+    assert timeline.step_back().board.letter_at(6, 8) is None
+    assert timeline.step_back().player_to_move == 'a'
+    assert timeline.sequence == 4
+
+
+def test_timeline_seek_out_of_range(game_events):
+    timeline = GameTimeline(GAME_ID, game_events)
+    timeline.seek(3)
+
+    with pytest.raises(ValueError):
+        timeline.seek(8)
+    with pytest.raises(ValueError):
+        timeline.seek(-1)
+
+    assert timeline.sequence == 3
+
+
+def test_timeline_snapshots(game_events):
+    snapshot = GameState(GAME_ID, events=game_events[:5]).snapshot()
+    # foreign snapshots are ignored
+    foreign_snapshot = GameState(GAME_ID + 1).snapshot()
+    foreign_snapshot.sequence = 6
+
+    timeline = GameTimeline(GAME_ID, game_events[:6], snapshots=[snapshot, foreign_snapshot])
+
+    assert timeline.seek(6).board.letter_at(8, 7) == 's'
+    assert timeline.state.snapshot() == GameState(GAME_ID, events=game_events[:6]).snapshot()
+
+
+def test_timeline_invalid_event(game_events):
+    game_events[5].sequence = 10
+    timeline = GameTimeline(GAME_ID, game_events)
+
+    with pytest.raises(ValueError):
+        timeline.seek(7)
+
+    assert timeline.sequence == 5
+
+
+def test_timeline_add_event(game_events):
+    snapshot = GameState(GAME_ID, events=game_events[:6]).snapshot()
+    timeline = GameTimeline(GAME_ID, game_events[:2], snapshots=[snapshot])
+
+    with pytest.raises(ValueError):
+        timeline.seek(3)
+
+    for event in game_events[2:]:
+        timeline.add_event(event)
+
+    assert timeline.last_sequence == 7
+    assert timeline.seek(7).snapshot() == GameState(GAME_ID, events=game_events).snapshot()
@@ -0,0 +1,35 @@
+import pytest
+
+from scrabble.game import GameState
+from scrabble.serializers.game import GameStateSnapshotSchema
+from scrabble.serializers.game.api import EventSchema
+from scrabble.storage import ArchiveCompression, decode_archive, encode_archive
+
+
+@pytest.fixture
+def serialized_game(game_events):
+    snapshot = GameStateSnapshotSchema().dump(GameState(7, events=game_events).snapshot())
+    return snapshot, [EventSchema().dump(event) for event in game_events]
+
+
+@pytest.mark.parametrize("compression", list(ArchiveCompression))
+def test_archive(serialized_game, compression):
+    snapshot, events = serialized_game
+
+    data = encode_archive(snapshot, events, compression)
+
+    assert decode_archive(data) == (snapshot, events)
+
+
+@pytest.mark.parametrize("damage", [
+    lambda data: data[:-1],
+    lambda data: data[:-5] + b'X' + data[-4:],
+    lambda data: b'XXXX' + data[4:],
+    lambda data: data[:4] + b'\x07' + data[5:],
+    lambda data: data[:6],
+])
+def test_archive_damaged(serialized_game, damage):
+    data = encode_archive(*serialized_game)
+
+    with pytest.raises(ValueError):
+        decode_archive(damage(data))
@@ -0,0 +1,137 @@
+import io
+import json
+from threading import Thread
+
+import pytest
+
+from scrabble.game import GameState
+from scrabble.serializers.game.api import EventSchema
+from scrabble.storage import FileEventStore
+from scrabble.storage import file as file_module
+from scrabble.storage import get_events_file_game_id, get_snapshots_file_path, read_events, read_serialized_events
+
+
+@pytest.fixture
+def serialized_events(game_events):
+    return [EventSchema().dump(event) for event in game_events]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 7, 100, 64 * 1024])
+@pytest.mark.parametrize("indent", [None, 2])
+def test_read_serialized_events_array(serialized_events, chunk_size, indent):
+    fin = io.StringIO('  \n' + json.dumps(serialized_events, indent=indent) + '\n')
+
+    assert list(read_serialized_events(fin, chunk_size=chunk_size)) == serialized_events
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 64 * 1024])
+def test_read_serialized_events_lines(serialized_events, chunk_size):
+    fin = io.StringIO('\n'.join(json.dumps(event) for event in serialized_events) + '\n\n')
+
+    assert list(read_serialized_events(fin, chunk_size=chunk_size)) == serialized_events
+
+
+@pytest.mark.parametrize("content", ['', '  \n', '[]', ' [ ]\n'])
+def test_read_serialized_events_empty(content):
+    assert list(read_serialized_events(io.StringIO(content), chunk_size=2)) == []
+
+
+@pytest.mark.parametrize("content", [
+    '[{"a": 1}, {"a": 2}',
+    '[{"a": 1}, {"a": ',
+    '[{"a": 1} {"a": 2}]',
+    '{"a": 1}\n{"a"',
+])
+def test_read_serialized_events_invalid(content):
+    with pytest.raises(ValueError):
+        list(read_serialized_events(io.StringIO(content), chunk_size=3))
+
+
+def test_read_serialized_events_lazy(serialized_events):
+    fin = io.StringIO(json.dumps(serialized_events) + 'garbage')
+    events = read_serialized_events(fin, chunk_size=16)
+
+    assert next(events) == serialized_events[0]
+    assert fin.tell() < len(fin.getvalue()) // 2
+
+
+def test_read_events(tmp_path, game_events):
+    file_path = tmp_path / 'game_events.json'
+    file_path.write_text(json.dumps([EventSchema().dump(event) for event in game_events]))
+
+    assert list(read_events(str(file_path))) == game_events
+
+
+def test_read_events_not_found(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        list(read_events(str(tmp_path / 'missing.json')))
+
+
+@pytest.mark.parametrize("indent", [None, 2])
+def test_file_store_appends_to_existing_file(tmp_path, serialized_events, game_events, indent):
+    (tmp_path / '7_events.json').write_text(json.dumps(serialized_events[:3], indent=indent) + '\n')
+    store = FileEventStore(str(tmp_path))
+
+    store.append_events(7, game_events[3:])
+
+    assert json.loads((tmp_path / '7_events.json').read_text()) == serialized_events
+
+
+def test_file_store_appends_to_empty_array(tmp_path, serialized_events, game_events):
+    (tmp_path / '7_events.json').write_text('[ ]')
+    store = FileEventStore(str(tmp_path))
+
+    store.append_events(7, game_events)
+
+    assert json.loads((tmp_path / '7_events.json').read_text()) == serialized_events
+
+
+def test_file_store_snapshots_interrupted_save(tmp_path, game_events, monkeypatch):
+    store = FileEventStore(str(tmp_path))
+    store.append_events(7, game_events)
+    snapshot = GameState(7, events=game_events[:2]).snapshot()
+    store.save_snapshot(snapshot)
+
+    def interrupted_dump(obj, fout):
+        fout.write(json.dumps(obj)[:10])
+        raise OSError('No space left on device')
+
+    monkeypatch.setattr(json, 'dump', interrupted_dump)
+    with pytest.raises(OSError):
+        store.save_snapshot(GameState(7, events=game_events[:5]).snapshot())
+    monkeypatch.undo()
+
+    # the snapshots file is left as it was before the save
+    assert FileEventStore(str(tmp_path)).load_snapshots(7) == [snapshot]
+
+
+def test_file_store_reads_in_batches_without_blocking_writes(tmp_path, game_events, monkeypatch):
+    monkeypatch.setattr(file_module, 'READ_BATCH_SIZE', 2)
+    store = FileEventStore(str(tmp_path))
+    store.append_events(7, game_events[:5])
+
+    reader = store.read_events(7)
+    read = [next(reader)]
+    # the lock of the store is held only while reading a batch, so the writer thread goes on meanwhile
+    writer = Thread(target=store.append_events, args=(7, game_events[5:]))
+    writer.start()
+    writer.join(timeout=5)
+    assert not writer.is_alive()
+
+    read.extend(reader)
+    assert read == game_events
+    assert list(store.read_events(7, after_sequence=1, until_sequence=6)) == game_events[1:6]
+    store.close()
+
+
+@pytest.mark.parametrize("file_path,game_id,snapshots_file_path", [
+    ('/games/7_events.log', 7, '/games/7_snapshots.json'),
+    ('/games/7_events.archive', 7, '/games/7_snapshots.json'),
+    ('/games/7_events.json', 7, '/games/7_snapshots.json'),
+    ('/games/7_events.jsonl', 7, '/games/7_snapshots.json'),
+    ('/games/7_snapshots.json', None, '/games/7_snapshots.json_snapshots.json'),
+    ('/games/x_events.log', None, '/games/x_snapshots.json'),
+])
+def test_events_file_naming(file_path, game_id, snapshots_file_path):
+    assert get_events_file_game_id(file_path) == game_id
+    assert get_snapshots_file_path(file_path) == snapshots_file_path
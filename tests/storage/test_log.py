@@ -0,0 +1,179 @@
+import json
+import os
+
+import pytest
+
+from scrabble.serializers.game.api import EventSchema
+from scrabble.storage import (EventLog, EventLogReader, FileEventStore, encode_record, get_checkpoint_file_path,
+                              get_index_file_path, read_events, read_log_records)
+from scrabble.verification import VerificationCheck, verify_events_file
+
+PAYLOADS = [f'{{"record": {i}}}'.encode() * (i + 1) for i in range(5)]
+
+
+@pytest.fixture
+def log_path(tmp_path):
+    return str(tmp_path / '7_events.log')
+
+
+def _write_log(log_path, synced_payloads, unsynced_payloads=()):
+    log = EventLog(log_path)
+    log.append(synced_payloads)
+    log.sync()
+    log.append(list(unsynced_payloads))
+    log.close()
+
+
+def test_event_log_append_and_read(log_path):
+    log = EventLog(log_path)
+    log.append(PAYLOADS[:2])
+    log.append(PAYLOADS[2:])
+
+    assert len(log) == 5
+    assert list(log.read()) == PAYLOADS
+    assert list(log.read(1, 3)) == PAYLOADS[1:3]
+    assert list(log.read(4, 10)) == PAYLOADS[4:]
+    assert list(read_log_records(log_path)) == PAYLOADS
+    log.close()
+
+
+@pytest.mark.parametrize("synced", [0, 3, 5])
+def test_event_log_recovery(log_path, synced):
+    _write_log(log_path, PAYLOADS[:synced], PAYLOADS[synced:])
+
+    log = EventLog(log_path)
+
+    assert list(log.read()) == PAYLOADS
+    # only records after the checkpoint are verified
+    assert log.recovery.records == 5
+    assert log.recovery.verified_records == 5 - synced
+    assert log.recovery.truncated_bytes == 0
+    log.close()
+
+
+@pytest.mark.parametrize("damage", [
+    # torn write
+    lambda data: data[:-3],
+    lambda data: data[:-len(PAYLOADS[4]) - 5],
+    # damaged payload of the 4th record
+    lambda data: data[:-len(PAYLOADS[4]) - 10] + b'X' + data[-len(PAYLOADS[4]) - 9:],
+])
+def test_event_log_recovery_truncates_damaged_tail(log_path, damage):
+    _write_log(log_path, PAYLOADS[:3], PAYLOADS[3:])
+    with open(log_path, 'rb') as fin:
+        data = fin.read()
+    with open(log_path, 'wb') as fout:
+        fout.write(damage(data))
+
+    with pytest.raises(ValueError):
+        list(read_log_records(log_path))
+
+    log = EventLog(log_path)
+    assert log.recovery.records in (3, 4)
+    assert log.recovery.truncated_bytes > 0
+    assert list(log.read()) == PAYLOADS[:log.recovery.records]
+
+    log.append([b'new'])
+    log.close()
+
+    assert list(read_log_records(log_path)) == PAYLOADS[:len(log) - 1] + [b'new']
+
+
+@pytest.mark.parametrize("checkpoint", ['garbage', '{"records": 2, "size": 5}', '{"records": 100, "size": 100000}'])
+def test_event_log_recovery_ignores_invalid_checkpoint(log_path, checkpoint):
+    _write_log(log_path, PAYLOADS)
+    with open(get_checkpoint_file_path(log_path), 'w') as fout:
+        fout.write(checkpoint)
+
+    log = EventLog(log_path)
+
+    assert list(log.read()) == PAYLOADS
+    assert log.recovery.verified_records == 5
+    log.close()
+
+
+def test_file_store_recovers_torn_log(tmp_path, game_events):
+    store = FileEventStore(str(tmp_path))
+    store.append_events(7, game_events[:5])
+    store.sync()
+    store.append_events(7, game_events[5:])
+    store.close()
+
+    file_path = str(tmp_path / '7_events.log')
+    os.truncate(file_path, os.path.getsize(file_path) - 1)
+
+    result = verify_events_file(file_path)
+    assert [(error.check, error.sequence) for error in result.errors] == [(VerificationCheck.READ, 7)]
+
+    store = FileEventStore(str(tmp_path))
+    assert store.last_sequence(7) == 6
+    assert list(store.read_events(7, after_sequence=4)) == game_events[4:6]
+
+    store.append_events(7, game_events[6:])
+    store.close()
+
+    assert list(read_events(file_path)) == game_events
+    assert json.loads(next(read_log_records(file_path))) == EventSchema().dump(game_events[0])
+
+
+@pytest.mark.parametrize("start,end", [(0, None), (2, 4), (4, 5), (5, None), (3, 100)])
+def test_event_log_reader(log_path, start, end):
+    _write_log(log_path, PAYLOADS[:3], PAYLOADS[3:])
+
+    with EventLogReader(log_path) as reader:
+        assert len(reader) == 5
+        assert list(reader.read(start, end)) == PAYLOADS[start:end]
+
+
+def test_event_log_reader_without_index(log_path):
+    _write_log(log_path, PAYLOADS[:3], PAYLOADS[3:])
+    # the index is behind the log
+    os.truncate(get_index_file_path(log_path), 2 * 8 + 3)
+    # a record being written
+    with open(log_path, 'ab') as fout:
+        fout.write(b'\x00\x00\x00\x10')
+
+    with EventLogReader(log_path) as reader:
+        assert list(reader.read(1)) == PAYLOADS[1:]
+
+    os.remove(get_index_file_path(log_path))
+    with EventLogReader(log_path) as reader:
+        assert list(reader.read()) == PAYLOADS
+
+
+def test_event_log_reader_damaged_record(log_path):
+    _write_log(log_path, PAYLOADS)
+    with open(log_path, 'r+b') as fout:
+        fout.seek(-2, os.SEEK_END)
+        fout.write(b'XX')
+
+    with EventLogReader(log_path) as reader:
+        assert list(reader.read(0, 4)) == PAYLOADS[:4]
+        with pytest.raises(ValueError):
+            list(reader.read(4))
+
+
+def test_event_log_recovery_uses_index(log_path):
+    _write_log(log_path, PAYLOADS)
+    # damaged headers are not read, as the offsets of the synced records come from the index
+    with open(log_path, 'r+b') as fout:
+        fout.seek(len(encode_record(PAYLOADS[0])))
+        fout.write(b'\xff' * 4)
+
+    log = EventLog(log_path)
+    assert log.recovery.verified_records == 0
+    assert len(log) == 5
+    log.close()
+
+
+def test_read_events_range(tmp_path, game_events):
+    store = FileEventStore(str(tmp_path))
+    store.append_events(7, game_events)
+    store.close()
+
+    file_path = str(tmp_path / '7_events.log')
+    assert list(read_events(file_path, after_sequence=2, until_sequence=5)) == game_events[2:5]
+    assert list(read_events(file_path, after_sequence=5)) == game_events[5:]
+
+    (tmp_path / '8_events.json').write_text(json.dumps([EventSchema().dump(event) for event in game_events]))
+    assert list(read_events(str(tmp_path / '8_events.json'), after_sequence=2, until_sequence=5)) == game_events[2:5]
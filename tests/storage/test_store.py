@@ -0,0 +1,195 @@
+import os
+from copy import deepcopy
+
+import pytest
+
+from scrabble.game import GameState
+from scrabble.storage import ArchiveCompression, FileEventStore, SQLiteEventStore, find_snapshot
+
+
+@pytest.fixture(params=['file', 'sqlite'])
+def store(request, tmp_path):
+    if request.param == 'sqlite':
+        store = SQLiteEventStore(str(tmp_path / 'events.db'))
+    else:
+        store = FileEventStore(str(tmp_path))
+
+    yield store
+    store.close()
+
+
+def _with_game_id(events, game_id, timestamp=None):
+    for event in events:
+        event.game_id = game_id
+        if timestamp is not None:
+            event.timestamp = timestamp
+    return events
+
+
+def test_store_append_and_read(store, game_events):
+    assert not store.game_exists(7)
+    assert store.last_sequence(7) == 0
+    assert list(store.read_events(7)) == []
+
+    store.append_events(7, game_events[:3])
+    store.append_event(7, game_events[3])
+    store.append_events(7, game_events[4:])
+    store.append_events(7, [])
+
+    assert store.game_exists(7)
+    assert store.last_sequence(7) == 7
+    assert list(store.read_events(7)) == game_events
+    assert list(store.read_events(7, after_sequence=4)) == game_events[4:]
+    assert list(store.read_events(7, after_sequence=2, until_sequence=5)) == game_events[2:5]
+    assert list(store.read_events(7, after_sequence=7)) == []
+
+
+def test_store_append_invalid(store, game_events):
+    store.append_events(7, game_events[:3])
+
+    with pytest.raises(ValueError):
+        # a gap
+        store.append_events(7, game_events[4:])
+    with pytest.raises(ValueError):
+        # a duplicate
+        store.append_events(7, game_events[2:4])
+    with pytest.raises(ValueError):
+        # another game
+        store.append_events(8, game_events[:1])
+
+    assert list(store.read_events(7)) == game_events[:3]
+
+
+def test_store_reopen(store, game_events, tmp_path):
+    store.append_events(7, game_events[:4])
+    store.close()
+
+    if isinstance(store, SQLiteEventStore):
+        reopened = SQLiteEventStore(str(tmp_path / 'events.db'))
+    else:
+        reopened = FileEventStore(str(tmp_path))
+
+    assert reopened.last_sequence(7) == 4
+    reopened.append_events(7, game_events[4:])
+    assert list(reopened.read_events(7)) == game_events
+    reopened.close()
+
+
+def test_store_list_games(store, game_events):
+    other_game_events = deepcopy(game_events)
+    other_game_events[0].params.players = ['b', 'c']
+
+    store.append_events(7, _with_game_id(game_events[:2], 7, timestamp=100))
+    store.append_events(3, _with_game_id(other_game_events[:1], 3, timestamp=200))
+
+    assert store.list_games() == [3, 7]
+    assert store.list_games(player='b') == [3, 7]
+    assert store.list_games(player='a') == [7]
+    assert store.list_games(player='unknown') == []
+    assert store.list_games(updated_since=150) == [3]
+    assert store.list_games(player='a', updated_since=150) == []
+
+
+def test_store_snapshots(store, game_events):
+    store.append_events(7, game_events)
+    assert store.load_snapshots(7) == []
+
+    snapshots = [GameState(7, events=game_events[:sequence]).snapshot() for sequence in (2, 5)]
+    for snapshot in snapshots:
+        store.save_snapshot(snapshot)
+
+    assert store.load_snapshots(7) == snapshots
+    assert store.load_snapshots(8) == []
+    assert find_snapshot(store.load_snapshots(7), 4) == snapshots[0]
+    assert find_snapshot(store.load_snapshots(7)) == snapshots[1]
+    assert find_snapshot(store.load_snapshots(7), 1) is None
+
+
+def test_store_snapshots_pruned(store, game_events):
+    store.append_events(7, game_events)
+    snapshots = [GameState(7, events=game_events[:sequence]).snapshot() for sequence in (2, 4, 5, 7)]
+    for snapshot in snapshots:
+        store.save_snapshot(snapshot)
+
+    # only the latest snapshots are kept, so the snapshots do not grow along with the game
+    assert store.load_snapshots(7) == snapshots[-2:]
+    store.close()
+    reopened = (SQLiteEventStore(store._path) if isinstance(store, SQLiteEventStore)
+                else FileEventStore(store._directory))
+    try:
+        assert reopened.load_snapshots(7) == snapshots[-2:]
+    finally:
+        reopened.close()
+
+
+@pytest.mark.parametrize("compression", list(ArchiveCompression))
+def test_store_archive(store, game_events, compression):
+    store.append_events(7, _with_game_id(game_events, 7, timestamp=100))
+    store.save_snapshot(GameState(7, events=game_events[:3]).snapshot())
+    snapshot = GameState(7, events=game_events).snapshot()
+
+    with pytest.raises(ValueError):
+        store.archive_game(7, GameState(7, events=game_events[:6]).snapshot(), compression)
+
+    store.archive_game(7, snapshot, compression)
+
+    assert store.is_archived(7)
+    assert not store.is_archived(8)
+    assert store.game_exists(7)
+    assert store.last_sequence(7) == 7
+    assert list(store.read_events(7)) == game_events
+    assert list(store.read_events(7, after_sequence=2, until_sequence=5)) == game_events[2:5]
+    assert store.load_snapshots(7) == [snapshot]
+    assert store.list_games(player='a', updated_since=100) == [7]
+    assert store.list_games(updated_since=101) == []
+
+
+def test_store_unarchive_on_append(store, game_events):
+    store.append_events(7, game_events[:6])
+    snapshot = GameState(7, events=game_events[:6]).snapshot()
+    store.archive_game(7, snapshot)
+
+    store.append_events(7, game_events[6:])
+
+    assert not store.is_archived(7)
+    assert list(store.read_events(7)) == game_events
+    assert store.load_snapshots(7) == [snapshot]
+    store.sync()
+
+
+def test_store_allocate_game_id(store, tmp_path, game_events):
+    first_game_id = store.allocate_game_id()
+    assert first_game_id == 1001
+
+    # games saved with explicit ids are skipped
+    store.append_events(1002, _with_game_id(deepcopy(game_events), 1002))
+    assert store.allocate_game_id() == 1003
+    store.close()
+
+    # the counter is shared by stores of the same storage and kept across restarts
+    if isinstance(store, SQLiteEventStore):
+        stores = [SQLiteEventStore(str(tmp_path / 'events.db')) for _ in range(2)]
+    else:
+        stores = [FileEventStore(str(tmp_path)) for _ in range(2)]
+
+    game_ids = [stores[i % 2].allocate_game_id() for i in range(10)]
+    assert game_ids == list(range(1004, 1014))
+    for other_store in stores:
+        other_store.close()
+
+
+def test_sqlite_store_sync_fsyncs_wal(tmp_path, game_events, monkeypatch):
+    store = SQLiteEventStore(str(tmp_path / 'events.db'))
+    store.append_events(7, game_events)
+
+    synced_file_sizes = []
+    fsync = os.fsync
+    monkeypatch.setattr(os, 'fsync', lambda fd: synced_file_sizes.append(os.fstat(fd).st_size) or fsync(fd))
+    store.sync()
+    monkeypatch.undo()
+
+    # the commits are only in the WAL, which is synced along with the database file
+    wal_size = (tmp_path / 'events.db-wal').stat().st_size
+    assert wal_size > 0
+    assert synced_file_sizes == [wal_size, (tmp_path / 'events.db').stat().st_size]
+    store.close()
@@ -0,0 +1,125 @@
+from copy import deepcopy
+
+import pytest
+
+from scrabble.game import GameState
+from scrabble.storage import Durability, EventLog, FileEventStore, GroupCommitWriter
+
+
+class _CountingStore(FileEventStore):
+
+    def __init__(self, directory):
+        super().__init__(directory)
+        self.appends = 0
+        self.syncs = 0
+
+    def append_events(self, game_id, events):
+        self.appends += 1
+        super().append_events(game_id, events)
+
+    def sync(self):
+        self.syncs += 1
+        super().sync()
+
+
+@pytest.fixture
+def store(tmp_path):
+    return _CountingStore(str(tmp_path))
+
+
+def test_writer_group_commit(store, game_events):
+    other_game_events = deepcopy(game_events)
+    for event in other_game_events:
+        event.game_id = 8
+
+    writer = GroupCommitWriter(store)
+    # writes queued before the start are committed at once
+    futures = [writer.write_event(7, event) for event in game_events]
+    futures += [writer.write_event(8, event) for event in other_game_events]
+    futures.append(writer.write_snapshot(GameState(7, events=game_events).snapshot()))
+    writer.start()
+
+    for future in futures:
+        assert future.result(timeout=5) is None
+    writer.close()
+
+    assert list(store.read_events(7)) == game_events
+    assert list(store.read_events(8)) == other_game_events
+    assert [snapshot.sequence for snapshot in store.load_snapshots(7)] == [7]
+    assert store.appends == 2
+    assert store.syncs == 1
+
+    metrics = writer.metrics
+    assert metrics.commits == 1
+    assert metrics.events == 14
+    assert metrics.snapshots == 1
+    assert metrics.failed_writes == 0
+    assert metrics.queue_depth == 0
+    assert metrics.max_queue_depth == 15
+    assert metrics.max_commit_latency >= metrics.average_commit_latency > 0
+
+
+@pytest.mark.parametrize("durability, syncs", [
+    (Durability.EVENT, 7),
+    (Durability.OS, 0),
+])
+def test_writer_durability(store, game_events, durability, syncs):
+    writer = GroupCommitWriter(store, durability=durability)
+    writer.start()
+
+    for event in game_events:
+        writer.write_event(7, event).result(timeout=5)
+    writer.close()
+
+    assert list(store.read_events(7)) == game_events
+    assert store.syncs == syncs
+
+
+def test_writer_os_durability_checkpoints(store, tmp_path, game_events):
+    writer = GroupCommitWriter(store, durability=Durability.OS)
+    writer.start()
+
+    for event in game_events:
+        writer.write_event(7, event).result(timeout=5)
+    writer.close()
+    store.close()
+
+    # the log is not synced, but its recovery starts at the checkpoint of the latest commit
+    log = EventLog(str(tmp_path / '7_events.log'))
+    assert store.syncs == 0
+    assert log.recovery.records == len(game_events)
+    assert log.recovery.verified_records == 0
+    log.close()
+
+
+def test_writer_interval_durability(store, game_events):
+    writer = GroupCommitWriter(store, durability=Durability.INTERVAL, interval=0.5)
+    writer.start()
+
+    futures = [writer.write_event(7, event) for event in game_events]
+    writer.flush(timeout=5)
+
+    assert all(future.done() for future in futures)
+    assert store.syncs == 1
+    assert writer.metrics.commits == 1
+    writer.close()
+
+
+def test_writer_failed_write(store, game_events):
+    writer = GroupCommitWriter(store)
+    writer.start()
+
+    writer.write_event(7, game_events[0]).result(timeout=5)
+    # sequence gap
+    future = writer.write_event(7, game_events[2])
+    other_event = deepcopy(game_events[0])
+    other_event.game_id = 8
+    other_future = writer.write_event(8, other_event)
+
+    with pytest.raises(ValueError):
+        future.result(timeout=5)
+    assert other_future.result(timeout=5) is None
+    writer.close()
+
+    assert writer.metrics.failed_writes == 1
+    assert store.last_sequence(7) == 1
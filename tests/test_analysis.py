@@ -0,0 +1,102 @@
+import csv
+import io
+import json
+
+import pytest
+
+from scrabble.analysis import (AnalysisSummary, analyze_directory, analyze_events_file, find_events_files, run_analysis,
+                               summarize, write_stats_csv, write_stats_json)
+from scrabble.serializers.game.api import EventSchema
+
+
+@pytest.fixture
+def games_dir(tmp_path, game_events):
+    serialized_events = [EventSchema().dump(event) for event in game_events]
+
+    (tmp_path / '7_events.json').write_text(json.dumps(serialized_events))
+    (tmp_path / 'archive').mkdir()
+    (tmp_path / 'archive' / '8_events.jsonl').write_text('\n'.join(json.dumps(event) for event in serialized_events))
+    # broken at the 6th event
+    (tmp_path / 'archive' / '9_events.json').write_text(json.dumps(serialized_events[:5] + serialized_events[6:]))
+    (tmp_path / '7_snapshots.json').write_text('[]')
+
+    return tmp_path
+
+
+def test_find_events_files(games_dir):
+    assert find_events_files(str(games_dir)) == [
+        str(games_dir / '7_events.json'),
+        str(games_dir / 'archive' / '8_events.jsonl'),
+        str(games_dir / 'archive' / '9_events.json'),
+    ]
+
+
+def test_analyze_events_file(games_dir):
+    stats = analyze_events_file(str(games_dir / '7_events.json'))
+
+    assert stats.error is None
+    assert stats.game_id == 7
+    assert stats.events == 7
+    assert stats.moves == 3
+    assert stats.passes == 0
+    # "cats", "at", "son"
+    assert stats.words == 3
+    assert stats.average_word_length == pytest.approx(3)
+    assert stats.bonuses == 1
+    assert stats.bonuses_used == 1
+    assert stats.letters_drawn == 14
+    assert stats.scores == {'a': 7, 'b': 4}
+    assert stats.winner == 'a'
+
+
+def test_analyze_broken_events_file(games_dir):
+    stats = analyze_events_file(str(games_dir / 'archive' / '9_events.json'))
+
+    assert stats.error is not None
+    assert stats.events == 5
+    assert stats.scores == {'a': 4, 'b': 0}
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_analyze_directory(games_dir, jobs):
+    games_stats = list(analyze_directory(str(games_dir), jobs=jobs))
+
+    assert [stats.game_id for stats in games_stats] == [7, 7, 7]
+    assert [stats.error is None for stats in games_stats] == [True, True, False]
+
+    summary = summarize(games_stats)
+    assert summary.games == 3
+    assert summary.failed_games == 1
+    assert summary.moves == 3 + 3 + 1
+    assert summary.max_score == 7
+    assert summary.average_moves_per_game == pytest.approx(7 / 3)
+
+
+def test_summarize_empty():
+    assert summarize([]) == AnalysisSummary()
+
+
+def test_write_stats(games_dir):
+    games_stats = list(analyze_directory(str(games_dir), jobs=1))
+
+    fout = io.StringIO()
+    write_stats_csv(fout, games_stats)
+    rows = list(csv.DictReader(io.StringIO(fout.getvalue())))
+    assert len(rows) == 3
+    assert rows[0]['scores'] == 'a:7;b:4'
+    assert rows[0]['average_word_length'] == '3.0'
+
+    fout = io.StringIO()
+    write_stats_json(fout, games_stats)
+    assert json.loads(fout.getvalue())[0]['scores'] == {'a': 7, 'b': 4}
+
+
+def test_run_analysis(games_dir, tmp_path):
+    summary = run_analysis(str(games_dir), fmt='json', output_path=str(tmp_path / 'games.json'),
+                           summary_path=str(tmp_path / 'summary.json'), jobs=1)
+
+    assert len(json.loads((tmp_path / 'games.json').read_text())) == 3
+    assert json.loads((tmp_path / 'summary.json').read_text())['games'] == summary.games == 3
+
+    with pytest.raises(ValueError):
+        run_analysis(str(games_dir), fmt='xml')
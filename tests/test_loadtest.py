@@ -0,0 +1,73 @@
+import os
+import random
+
+import pytest
+
+from scrabble.game import GameState
+from scrabble.loadtest import LoadTestReport, MoveKind, _make_storage_path, make_move, merge_reports, percentile
+
+
+@pytest.fixture
+def started_game(game_events):
+    return GameState(7, events=game_events[:4])
+
+
+@pytest.mark.parametrize("values,q,expected", [
+    ([], 50, 0.0),
+    ([5.0], 99, 5.0),
+    ([1.0, 2.0, 3.0, 4.0], 50, 2.0),
+    ([1.0, 2.0, 3.0, 4.0], 95, 4.0),
+    (list(range(1, 101)), 99, 99),
+    (list(range(1, 101)), 0, 1),
+])
+def test_percentile(values, q, expected):
+    assert percentile(values, q) == expected
+
+
+def test_make_pass_move(started_game):
+    move = make_move(started_game, 'a', MoveKind.PASS)
+
+    assert move.sequence == 5
+    assert move.params.player == 'a'
+    assert move.params.tiles == []
+    started_game.apply_event(move)
+    assert started_game.player_to_move == 'b'
+
+
+def test_make_random_moves(started_game):
+    rng = random.Random(1)
+    placed = 0
+
+    for _ in range(10):
+        player = started_game.player_to_move
+        move = make_move(started_game, player, MoveKind.RANDOM, rng)
+        assert move.params.player == player
+        assert move.sequence == started_game.latest_event_sequence + 1
+        # the moves are legal, the state is not changed by trying them
+        started_game.apply_event(move)
+        placed += len(move.params.tiles)
+
+    assert placed > 0
+
+
+def test_merge_reports():
+    merged = merge_reports([
+        LoadTestReport(games=2, connections=4, duration=5.0, moves=10, deliveries=20, latencies=[0.1, 0.2],
+                       generator_cpu=1.0),
+        LoadTestReport(games=1, connections=2, duration=5.5, moves=4, rejected_moves=1, timed_out_moves=1,
+                       deliveries=8, latencies=[0.3], generator_cpu=0.5),
+    ])
+
+    assert merged == LoadTestReport(games=3, connections=6, duration=5.5, moves=14, rejected_moves=1,
+                                    timed_out_moves=1, deliveries=28, latencies=[0.1, 0.2, 0.3], generator_cpu=1.5)
+    assert 'p50 200.0ms' in merged.format()
+
+
+def test_storage_paths_of_runs_differ(tmp_path):
+    storage_path = tmp_path / 'runs'
+
+    # every run gets a new directory, the games of the earlier runs are kept
+    first = _make_storage_path(str(storage_path))
+    second = _make_storage_path(str(storage_path))
+    assert first != second
+    assert sorted(os.listdir(storage_path)) == sorted([os.path.basename(first), os.path.basename(second)])
@@ -0,0 +1,128 @@
+import io
+import json
+
+import pytest
+
+from scrabble.game import GameState
+from scrabble.serializers.game import GameStateSnapshotSchema
+from scrabble.serializers.game.api import EventSchema
+from scrabble.storage import FileEventStore
+from scrabble.verification import VerificationCheck, quarantine, run_verification, verify_events_file
+
+
+@pytest.fixture
+def serialized_events(game_events):
+    return [EventSchema().dump(event) for event in game_events]
+
+
+@pytest.fixture
+def write_events(tmp_path):
+    def write(file_name, serialized_events):
+        file_path = tmp_path / file_name
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_path.write_text(json.dumps(serialized_events))
+        return str(file_path)
+
+    return write
+
+
+def test_verify_events_file_ok(write_events, serialized_events, game_events, tmp_path):
+    file_path = write_events('7_events.json', serialized_events)
+    snapshots = [GameState(7, events=game_events[:sequence]).snapshot() for sequence in (3, 6)]
+    (tmp_path / '7_snapshots.json').write_text(json.dumps([GameStateSnapshotSchema().dump(s) for s in snapshots]))
+
+    result = verify_events_file(file_path)
+
+    assert result.ok
+    assert result.game_id == 7
+    assert result.events == 7
+
+
+def test_verify_json_lines_events_file_snapshots(serialized_events, game_events, tmp_path):
+    file_path = tmp_path / '7_events.jsonl'
+    file_path.write_text('\n'.join(json.dumps(serialized_event) for serialized_event in serialized_events))
+    # the snapshot of the JSON lines log does not match its events
+    snapshot = GameState(7, events=game_events[:5]).snapshot()
+    (tmp_path / '7_snapshots.json').write_text(json.dumps([dict(GameStateSnapshotSchema().dump(snapshot), sequence=3)]))
+
+    result = verify_events_file(str(file_path))
+
+    assert result.game_id == 7
+    assert [(error.check, error.sequence) for error in result.errors] == [(VerificationCheck.SNAPSHOT, 3)]
+
+
+@pytest.mark.parametrize("file_name,change,check,sequence", [
+    # a gap in sequences
+    ('7_events.json', lambda events: events[:3] + events[4:], VerificationCheck.SEQUENCE, 4),
+    # an event of another game
+    ('7_events.json', lambda events: events[:5] + [dict(events[5], game_id=8)] + events[6:],
+     VerificationCheck.GAME_ID, 6),
+    # the file name does not match the events
+    ('8_events.json', lambda events: events, VerificationCheck.GAME_ID, 1),
+    # the move of a player out of turn
+    ('7_events.json', lambda events: events[:5] + [dict(events[6], sequence=6)], VerificationCheck.REPLAY, 6),
+    ('7_events.json', lambda events: events[:2] + [{"name": "UNKNOWN"}], VerificationCheck.READ, 3),
+    ('7_events.json', lambda events: [], VerificationCheck.READ, None),
+])
+def test_verify_events_file_broken(write_events, serialized_events, file_name, change, check, sequence):
+    result = verify_events_file(write_events(file_name, change(serialized_events)))
+
+    assert not result.ok
+    assert [(error.check, error.sequence) for error in result.errors] == [(check, sequence)]
+
+
+def test_verify_events_file_inconsistent_snapshot(write_events, serialized_events, game_events, tmp_path):
+    file_path = write_events('7_events.json', serialized_events[:6])
+    snapshot = GameState(7, events=game_events[:5]).snapshot()
+    snapshot.players[0].score += 10
+    ahead_snapshot = GameState(7, events=game_events).snapshot()
+    (tmp_path / '7_snapshots.json').write_text(json.dumps([
+        GameStateSnapshotSchema().dump(snapshot),
+        GameStateSnapshotSchema().dump(ahead_snapshot),
+    ]))
+
+    result = verify_events_file(file_path)
+
+    assert [(error.check, error.sequence) for error in result.errors] == [
+        (VerificationCheck.SNAPSHOT, 5),
+        (VerificationCheck.SNAPSHOT, 7),
+    ]
+    assert 'Scores' in result.errors[0].message
+
+
+def test_quarantine(write_events, serialized_events, tmp_path):
+    file_path = write_events('games/archive/7_events.json', serialized_events)
+    (tmp_path / 'games' / 'archive' / '7_snapshots.json').write_text('[]')
+
+    quarantined_path = quarantine(file_path, str(tmp_path / 'games'), str(tmp_path / 'quarantine'))
+
+    assert quarantined_path == str(tmp_path / 'quarantine' / 'archive' / '7_events.json')
+    assert (tmp_path / 'quarantine' / 'archive' / '7_snapshots.json').exists()
+    assert not (tmp_path / 'games' / 'archive' / '7_events.json').exists()
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_run_verification(write_events, serialized_events, tmp_path, jobs):
+    write_events('games/7_events.json', serialized_events)
+    write_events('games/archive/7_events.json', serialized_events[:3] + serialized_events[4:])
+
+    fout = io.StringIO()
+    failed = run_verification(str(tmp_path / 'games'), quarantine_directory=str(tmp_path / 'quarantine'),
+                              jobs=jobs, fout=fout)
+
+    assert [result.file_path for result in failed] == [str(tmp_path / 'games' / 'archive' / '7_events.json')]
+    assert 'sequence 4: sequence' in fout.getvalue()
+    assert fout.getvalue().endswith('Verified 2 games, 1 failed\n')
+    assert (tmp_path / 'quarantine' / 'archive' / '7_events.json').exists()
+    assert (tmp_path / 'games' / '7_events.json').exists()
+
+
+def test_verify_archived_game(tmp_path, game_events):
+    store = FileEventStore(str(tmp_path))
+    store.append_events(7, game_events)
+    store.archive_game(7, GameState(7, events=game_events).snapshot())
+
+    result = verify_events_file(str(tmp_path / '7_events.archive'))
+
+    assert result.ok
+    assert result.events == 7
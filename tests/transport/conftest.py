@@ -16,7 +16,8 @@ def auth_msg_request_obj():
 @fixture
 def dumped_auth_msg_request():
     def gen(username, game_id):
-        return {"type": "AUTH_REQUEST", "payload": {"username": username, "game_id": game_id}}
+        return {"type": "AUTH_REQUEST",
+                "payload": {"username": username, "game_id": game_id, "last_sequence": 0, "spectator": False}}
 
     return gen
 
@@ -32,7 +33,7 @@ def auth_msg_response_obj():
 @fixture
 def dumped_auth_msg_response():
     def gen(ok):
-        return {"type": "AUTH_RESPONSE", "payload": {"ok": ok}}
+        return {"type": "AUTH_RESPONSE", "payload": {"ok": ok, "latest_sequence": None}}
 
     return gen
 
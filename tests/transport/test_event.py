@@ -31,3 +31,29 @@ def test_auth_response_msg_serializer(ok, auth_msg_response_obj, dumped_auth_msg
     dumped = WebsocketMessageSchema().dump(auth_msg_response_obj(ok))
     assert dumped == dumped_auth_msg_response(ok)
     assert WebsocketMessageSchema().load(dumped) == auth_msg_response_obj(ok)
+
+
+def test_rejected_event_serializer():
+    event = GameStartEvent(sequence=4, game_id=10, timestamp=10, params=GameStartParams(player_to_start="user1"))
+    event_msg = EventMessage(payload=EventMessagePayload(event=event, reason="Stale", latest_sequence=5),
+                             status=EventStatus.REJECTED)
+    dumped = WebsocketMessageSchema().dump(event_msg)
+    assert dumped["payload"]["reason"] == "Stale"
+    assert dumped["payload"]["latest_sequence"] == 5
+    assert WebsocketMessageSchema().load(dumped) == event_msg
+
+    # messages of the servers without the rejection details
+    del dumped["payload"]["reason"], dumped["payload"]["latest_sequence"]
+    loaded = WebsocketMessageSchema().load(dumped)
+    assert loaded.payload.reason is None and loaded.payload.latest_sequence is None
+
+
+def test_event_request_id_serializer():
+    event = GameStartEvent(sequence=4, game_id=10, timestamp=10, params=GameStartParams(player_to_start="user1"))
+    event_msg = EventMessage(payload=EventMessagePayload(event=event, request_id="1f2e"), status=EventStatus.REQUESTED)
+    dumped = WebsocketMessageSchema().dump(event_msg)
+    assert dumped["payload"]["request_id"] == "1f2e"
+    assert WebsocketMessageSchema().load(dumped) == event_msg
+
+    del dumped["payload"]["request_id"]
+    assert WebsocketMessageSchema().load(dumped).payload.request_id is None
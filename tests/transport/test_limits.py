@@ -0,0 +1,193 @@
+import asyncio
+import json
+
+import pytest
+
+from scrabble.game.api import PlayerMoveEvent, PlayerMoveParams
+from scrabble.serializers.transport.msg import WebsocketMessageSchema
+from scrabble.transport import (EventMessage, EventMessagePayload, EventStatus, Server, TokenBucket, get_claimed_player,
+                                get_rejected_request)
+from scrabble.transport import server as server_module
+
+
+def test_token_bucket():
+    bucket = TokenBucket(rate=2, burst=3, now=0)
+    assert [bucket.take(0) for _ in range(4)] == [True, True, True, False]
+
+    # tokens are refilled by the rate up to the burst
+    assert bucket.take(0.5)
+    assert not bucket.take(0.5)
+    assert [bucket.take(10) for _ in range(4)] == [True, True, True, False]
+
+
+def test_token_bucket_invalid():
+    with pytest.raises(ValueError):
+        TokenBucket(rate=0, burst=3, now=0)
+
+
+@pytest.mark.parametrize("data,player", [
+    ({"type": "EVENT", "payload": {"event": {"name": "PLAYER_MOVE", "params": {"player": "qu"}}}}, "qu"),
+    ({"type": "EVENT", "payload": {"event": {"name": "GAME_INIT", "params": {"players": ["qu"]}}}}, None),
+    ({"type": "AUTH_REQUEST", "payload": {"username": "qu", "game_id": 10}}, None),
+    ({"type": "EVENT", "payload": {"event": {"params": ["qu"]}}}, None),
+    ({"type": "EVENT", "payload": {"event": []}}, None),
+    ([], None),
+])
+def test_get_claimed_player(data, player):
+    assert get_claimed_player(data) == player
+
+
+def _move(player, game_id=10, request_id=None):
+    event = PlayerMoveEvent(sequence=5, game_id=game_id, params=PlayerMoveParams(player=player))
+    msg = EventMessage(payload=EventMessagePayload(event=event, request_id=request_id), status=EventStatus.REQUESTED)
+    return json.dumps(WebsocketMessageSchema().dump(msg))
+
+
+def _long_move(request_id, game_id=10):
+    params = PlayerMoveParams(player="qu", exchange_letters=["a"] * 300)
+    event = PlayerMoveEvent(sequence=5, game_id=game_id, params=params)
+    msg = EventMessage(payload=EventMessagePayload(event=event, request_id=request_id), status=EventStatus.REQUESTED)
+    return json.dumps(WebsocketMessageSchema().dump(msg))
+
+
+@pytest.mark.parametrize("raw_msg,request_id", [
+    (_move("qu", request_id="r1"), "r1"),
+    (_move("qu"), None),
+    (_long_move("r1"), "r1"),
+    (_long_move("r1").encode(), "r1"),
+])
+def test_get_rejected_request(raw_msg, request_id):
+    answer = get_rejected_request(raw_msg, "Too many messages")
+
+    assert answer.status == EventStatus.REJECTED
+    assert answer.payload.reason == "Too many messages"
+    assert answer.payload.request_id == request_id
+    move = answer.payload.event
+    assert (move.params.player, move.sequence, move.game_id) == ("qu", 5, 10)
+
+
+@pytest.mark.parametrize("raw_msg", [
+    _move("qu").replace('"REQUESTED"', '"APPROVED"'),
+    _move("qu").replace('"sequence": 5', '"sequence": "5"'),
+    _move("qu").replace('"PLAYER_MOVE"', '"GAME_INIT"'),
+    _move("qu")[:-1],
+    json.dumps(json.loads(_move("qu")), indent=2, sort_keys=True),
+    "[]",
+    "x" * 1001,
+])
+def test_get_rejected_request_unreadable(raw_msg):
+    assert get_rejected_request(raw_msg, "Malformed message") is None
+
+
+class _Conn:
+
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, raw_msg):
+        self.sent.append(json.loads(raw_msg))
+
+
+def test_server_decode_rejections():
+    async def run():
+        server = Server(max_msg_size=1000, msg_rate=0.001, msg_burst=4)
+        conn = _Conn()
+        server.add_player_conn(("qu", 10), conn)
+
+        decoded = [
+            server._decode(conn, _move("qu")),
+            server._decode(conn, "x" * 1001),
+            server._decode(conn, _move("other")),
+            server._decode(conn, "[]"),
+            server._decode(conn, _move("qu")),
+            server._decode(conn, _move("qu")),
+        ]
+        server.remove_player_conn(("qu", 10))
+        return decoded, server.recv_metrics
+
+    decoded, metrics = asyncio.run(run())
+
+    assert decoded[0].payload.event.params.player == "qu"
+    # oversized frames do not take tokens, the rest of rejections do
+    assert decoded[1:4] == [None, None, None]
+    assert decoded[4] == decoded[0]
+    assert decoded[5] is None
+    assert metrics.received_messages == 6
+    assert metrics.rejected_oversized == 1
+    assert metrics.rejected_impersonating == 1
+    assert metrics.rejected_malformed == 1
+    assert metrics.rejected_rate_limited == 1
+
+
+def test_server_rejected_requests_answered(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(server_module, 'monotonic', lambda: now[0])
+
+    async def run():
+        server = Server(max_msg_size=1000, msg_rate=1, msg_burst=2)
+        conn = _Conn()
+        server.add_player_conn(("qu", 10), conn)
+
+        malformed = json.loads(_move("qu"))
+        malformed["payload"]["event"]["params"]["tiles"] = "oops"
+        malformed = json.dumps(malformed)
+        # a rejection is answered at most once a second (the time a token takes to refill), frames which are not
+        # moves of the player are dropped without an answer
+        frames = [
+            (0, _move("qu", request_id="r1")), (0, _long_move("r2")), (0, malformed.replace("null", '"r3"', 1)),
+            (0, "[]"), (1.5, malformed.replace("null", '"r4"', 1)), (1.5, _move("qu", request_id="r5")),
+            (2.6, _long_move("r6", game_id=11)), (2.6, _long_move("r7")),
+        ]
+        decoded = []
+        for now[0], raw_msg in frames:
+            decoded.append(server._decode(conn, raw_msg))
+        await asyncio.sleep(0)
+
+        server.remove_player_conn(("qu", 10))
+        return decoded, conn.sent
+
+    decoded, sent = asyncio.run(run())
+
+    assert decoded[0] is not None
+    assert decoded[1:] == [None] * 7
+    assert [(msg["status"], msg["payload"]["request_id"], msg["payload"]["reason"]) for msg in sent] == [
+        ("REJECTED", "r2", "Message is too large"),
+        ("REJECTED", "r4", "Malformed message"),
+        ("REJECTED", "r7", "Message is too large"),
+    ]
+    assert all(msg["payload"]["event"]["params"]["player"] == "qu" and msg["payload"]["event"]["sequence"] == 5
+               for msg in sent)
+
+
+class _FramesConn(_Conn):
+
+    def __init__(self, frames):
+        super().__init__()
+        self._frames = frames
+
+    async def __aiter__(self):
+        for raw_msg in self._frames:
+            yield raw_msg
+
+
+def test_server_spectator_moves_rejected():
+    received = []
+
+    async def run():
+        server = Server(max_msg_size=1000, on_new_msg=lambda player_id, msg: received.append(msg))
+        conn = _FramesConn([_move("qu", request_id="r1"), _move("qu", game_id=11, request_id="r2")])
+        server.add_player_conn((f"{server_module.SPECTATOR_PREFIX}1", 10), conn, spectator=True)
+
+        await server._recv(conn)
+        await asyncio.sleep(0)
+
+        server.remove_player_conn((f"{server_module.SPECTATOR_PREFIX}1", 10))
+        return conn.sent
+
+    sent = asyncio.run(run())
+
+    # the move is rolled back by the client of the spectator, moves of other games are dropped
+    assert received == []
+    assert [(msg["status"], msg["payload"]["request_id"], msg["payload"]["reason"]) for msg in sent] == [
+        ("REJECTED", "r1", "Spectators cannot make moves"),
+    ]
@@ -0,0 +1,76 @@
+import pytest
+
+from scrabble.transport import LivenessMonitor, TimerWheel
+
+
+@pytest.mark.parametrize("ticks", [1, 3, 4, 9])
+def test_timer_wheel_expires(ticks):
+    wheel = TimerWheel(4)
+    wheel.schedule('a', ticks)
+
+    expired_at = [tick for tick in range(1, 12) if 'a' in wheel.advance()]
+    assert expired_at == [ticks]
+    assert len(wheel) == 0
+
+
+def test_timer_wheel_reschedule_and_cancel():
+    wheel = TimerWheel(4)
+    wheel.schedule('a', 1)
+    wheel.schedule('b', 1)
+    wheel.schedule('a', 2)
+    wheel.cancel('b')
+
+    assert 'b' not in wheel
+    assert wheel.advance() == []
+    assert wheel.advance() == ['a']
+
+
+class _Conn:
+    remote_address = ('127.0.0.1', 5678)
+
+    async def ping(self):
+        ...
+
+    async def close(self, code, reason):
+        ...
+
+
+class _Loop:
+
+    def __init__(self):
+        self.now = 0.0
+        self.tasks = []
+
+    def time(self):
+        return self.now
+
+    def call_later(self, delay, callback):
+        return None
+
+    def create_task(self, coro):
+        self.tasks.append(coro.__name__)
+        coro.close()
+
+
+def test_liveness_monitor():
+    loop = _Loop()
+    monitor = LivenessMonitor(ping_interval=3, ping_timeout=2)
+    monitor.start(loop)
+
+    active_conn, idle_conn = _Conn(), _Conn()
+    monitor.add(active_conn)
+    monitor.add(idle_conn)
+
+    for _ in range(5):
+        loop.now += 1
+        monitor.touch(active_conn)
+        monitor._on_tick()
+
+    # the idle connection is pinged after 3 seconds and closed 2 seconds later, the active one is never pinged
+    assert loop.tasks == ['_ping', 'close']
+
+    metrics = monitor.metrics
+    assert metrics.connections == 1
+    assert metrics.pings_sent == 1
+    assert metrics.pings_skipped >= 1
+    assert metrics.timeouts == 1
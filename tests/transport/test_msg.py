@@ -1,6 +1,10 @@
+import json
+
 import pytest
 
+from scrabble.game import GameState
 from scrabble.serializers.transport.msg import WebsocketMessageSchema
+from scrabble.transport import PresenceMessage, PresencePayload, SnapshotMessage, SnapshotPayload
 
 
 @pytest.mark.parametrize("username,game_id", [
@@ -14,6 +18,15 @@ def test_auth_request_msg_serializer(username, game_id, auth_msg_request_obj, du
     assert WebsocketMessageSchema().load(dumped) == auth_msg_request_obj(username, game_id)
 
 
+def test_auth_request_msg_serializer_last_sequence():
+    dumped = {"type": "AUTH_REQUEST", "payload": {"username": "qu", "game_id": 10, "last_sequence": 12}}
+    assert WebsocketMessageSchema().load(dumped).payload.last_sequence == 12
+
+    # requests of the clients without the catch-up
+    del dumped['payload']['last_sequence']
+    assert WebsocketMessageSchema().load(dumped).payload.last_sequence == 0
+
+
 @pytest.mark.parametrize("ok", [True, False])
 def test_auth_response_msg_serializer(ok, auth_msg_response_obj, dumped_auth_msg_response):
     dumped = WebsocketMessageSchema().dump(auth_msg_response_obj(ok))
@@ -33,3 +46,27 @@ def test_end_connection_msg_serializer(username, end_connection_msg_obj, dumped_
     dumped = WebsocketMessageSchema().dump(end_connection_msg_obj(username))
     assert dumped == dumped_end_connection_msg(username)
     assert WebsocketMessageSchema().load(dumped) == end_connection_msg_obj(username)
+
+
+def test_auth_request_msg_serializer_spectator():
+    dumped = {"type": "AUTH_REQUEST", "payload": {"username": "qu", "game_id": 10, "spectator": True}}
+    assert WebsocketMessageSchema().load(dumped).payload.spectator
+
+    del dumped['payload']['spectator']
+    assert not WebsocketMessageSchema().load(dumped).payload.spectator
+
+
+def test_presence_msg_serializer():
+    msg = PresenceMessage(payload=PresencePayload(connected=["qu", "empty"], spectators=120))
+    dumped = WebsocketMessageSchema().dump(msg)
+    assert dumped == {"type": "PRESENCE", "payload": {"connected": ["qu", "empty"], "spectators": 120}}
+    assert WebsocketMessageSchema().load(dumped) == msg
+
+
+def test_snapshot_msg_serializer(game_events):
+    snapshot = GameState(7, events=game_events).snapshot()
+    msg = SnapshotMessage(payload=SnapshotPayload(snapshot=snapshot))
+    loaded = WebsocketMessageSchema().load(json.loads(json.dumps(WebsocketMessageSchema().dump(msg))))
+
+    assert loaded == msg
+    assert GameState.from_snapshot(loaded.payload.snapshot).snapshot() == snapshot
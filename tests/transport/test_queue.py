@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+from scrabble.transport import SendQueue, SendQueueMetrics, SlowConsumerPolicy
+
+
+class _Conn:
+
+    def __init__(self):
+        self.sent = []
+        self.stalled = asyncio.Event()
+
+    async def send(self, raw_msg):
+        # the connection does not accept anything until it is released
+        await self.stalled.wait()
+        self.sent.append(raw_msg)
+
+
+def _run(policy, messages, max_size=3):
+    async def run():
+        conn = _Conn()
+        metrics = SendQueueMetrics()
+        overflows = []
+        queue = SendQueue(conn, max_size, policy, metrics, on_overflow=lambda: overflows.append(True))
+
+        # the first message is taken by the writer, which is stuck sending it
+        queue.put('first')
+        await asyncio.sleep(0)
+        for raw_msg, presence_key in messages:
+            queue.put(raw_msg, presence_key)
+
+        conn.stalled.set()
+        for _ in range(10):
+            await asyncio.sleep(0)
+        queue.close()
+        return conn.sent, metrics, bool(overflows)
+
+    return asyncio.run(run())
+
+
+def test_send_queue_sends_in_order():
+    sent, metrics, overflow = _run(SlowConsumerPolicy.DISCONNECT, [('a', None), ('b', 'alice'), ('c', None)])
+
+    assert sent == ['first', 'a', 'b', 'c']
+    assert not overflow
+    assert metrics.sent_messages == 4
+    assert metrics.max_queue_depth == 3
+
+
+@pytest.mark.parametrize("policy, expected_sent, dropped, coalesced, overflow", [
+    (SlowConsumerPolicy.DROP_PRESENCE, ['first', 'e1', 'bob', 'e2'], 1, 0, False),
+    (SlowConsumerPolicy.COALESCE, ['first', 'e1', 'bob', 'alice-2'], 0, 1, False),
+    (SlowConsumerPolicy.DISCONNECT, [], 0, 0, True),
+])
+def test_send_queue_full(policy, expected_sent, dropped, coalesced, overflow):
+    messages = [('alice-1', 'alice'), ('e1', None), ('bob', 'bob')]
+    if policy == SlowConsumerPolicy.COALESCE:
+        messages.append(('alice-2', 'alice'))
+    else:
+        messages.append(('e2', None))
+
+    sent, metrics, was_overflow = _run(policy, messages)
+
+    assert was_overflow == overflow
+    assert metrics.dropped_messages == dropped
+    assert metrics.coalesced_messages == coalesced
+    assert metrics.disconnects == int(overflow)
+    if not overflow:
+        assert sent == expected_sent
+
+
+@pytest.mark.parametrize("policy", [SlowConsumerPolicy.DROP_PRESENCE, SlowConsumerPolicy.COALESCE])
+def test_send_queue_full_of_events(policy):
+    # game events are never dropped
+    _, metrics, overflow = _run(policy, [('e1', None), ('e2', None), ('e3', None), ('e4', None)])
+
+    assert overflow
+    assert metrics.disconnects == 1
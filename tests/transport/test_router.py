@@ -0,0 +1,74 @@
+import asyncio
+import json
+from collections import Counter
+
+import pytest
+
+from scrabble.serializers.transport.msg import WebsocketMessageSchema
+from scrabble.transport import AuthMessageRequest, AuthMessageRequestPayload, HashRing, Router
+from scrabble.transport import router as router_module
+
+
+def test_hash_ring_balance():
+    ring = HashRing(['0', '1', '2', '3'])
+
+    owners = Counter(ring.get_node(game_id) for game_id in range(1, 10001))
+    assert set(owners) == {'0', '1', '2', '3'}
+    assert min(owners.values()) > 1500
+
+
+def test_hash_ring_moves_only_games_of_removed_node():
+    ring = HashRing(['0', '1', '2', '3'])
+    smaller_ring = HashRing(['0', '1', '2'])
+
+    for game_id in range(1, 1001):
+        if ring.get_node(game_id) != '3':
+            assert smaller_ring.get_node(game_id) == ring.get_node(game_id)
+
+
+def test_hash_ring_empty():
+    with pytest.raises(ValueError):
+        HashRing([])
+
+
+def test_router_worker_uri():
+    router = Router(['ws://127.0.0.1:5679', 'ws://127.0.0.1:5680'])
+
+    # the owner of a game does not depend on the process
+    assert router.get_worker_uri(1001) == Router(['ws://127.0.0.1:5679', 'ws://127.0.0.1:5680']).get_worker_uri(1001)
+    worker_uris = {router.get_worker_uri(game_id) for game_id in range(1, 100)}
+    assert worker_uris == {'ws://127.0.0.1:5679', 'ws://127.0.0.1:5680'}
+
+
+class _AuthConn:
+
+    def __init__(self, raw_auth_msg):
+        self._raw_auth_msg = raw_auth_msg
+        self.sent = []
+
+    async def recv(self):
+        return self._raw_auth_msg
+
+    async def send(self, raw_msg):
+        self.sent.append(raw_msg)
+
+
+def test_router_drops_oversized_auth(monkeypatch):
+    connected = []
+
+    async def connect(uri, **kwargs):
+        connected.append(uri)
+        raise OSError('Worker is not running')
+
+    monkeypatch.setattr(router_module, 'connect', connect)
+    router = Router(['ws://127.0.0.1:5679'], max_msg_size=200)
+
+    # the oversized request is not even decoded, the connection is closed without reaching any worker
+    asyncio.run(router.serve(_AuthConn('x' * 201), '/'))
+    assert connected == []
+
+    auth_msg = AuthMessageRequest(payload=AuthMessageRequestPayload(username='qu', game_id=10))
+    conn = _AuthConn(json.dumps(WebsocketMessageSchema().dump(auth_msg)))
+    asyncio.run(router.serve(conn, '/'))
+    assert connected == ['ws://127.0.0.1:5679']
+    assert len(conn.sent) == 1
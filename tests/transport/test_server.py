@@ -0,0 +1,102 @@
+import asyncio
+import json
+
+from scrabble.transport import Server
+from scrabble.transport import server as server_module
+
+
+class _Conn:
+
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, raw_msg):
+        self.sent.append(json.loads(raw_msg))
+
+
+def test_server_presence_debounced(monkeypatch):
+    monkeypatch.setattr(server_module, 'PRESENCE_DELAY', 0.01)
+
+    async def run():
+        server = Server()
+        alice, bob, viewer = _Conn(), _Conn(), _Conn()
+
+        async def changed(*connections):
+            for player_id, conn in connections:
+                if conn is None:
+                    server.remove_player_conn(player_id)
+                else:
+                    server.add_player_conn(player_id, conn, spectator=conn is viewer)
+                server._on_presence_changed(10)
+            await asyncio.sleep(0.05)
+
+        await changed((("alice", 10), alice), (("bob", 10), bob))
+        # bob reconnects within the delay, nothing changes for the rest of the game
+        await changed((("bob", 10), None), (("bob", 10), bob))
+        await changed((("viewer", 10), viewer))
+
+        for player_id in (("alice", 10), ("bob", 10), ("viewer", 10)):
+            server.remove_player_conn(player_id)
+        return alice.sent
+
+    assert asyncio.run(run()) == [
+        {"type": "PRESENCE", "payload": {"connected": ["alice", "bob"], "spectators": 0}},
+        {"type": "PRESENCE", "payload": {"connected": ["alice", "bob"], "spectators": 1}},
+    ]
+
+
+class _AuthConn(_Conn):
+
+    def __init__(self, username, game_id, spectator=False):
+        super().__init__()
+        self._auth_msg = json.dumps({"type": "AUTH_REQUEST",
+                                     "payload": {"username": username, "game_id": game_id, "last_sequence": 0,
+                                                 "spectator": spectator}})
+
+    async def recv(self):
+        return self._auth_msg
+
+
+def test_server_spectator_named_as_player():
+    async def run():
+        new_connections = []
+        server = Server(on_new_conn=lambda player_id, last_sequence, spectator: new_connections.append(
+            (player_id, spectator)))
+
+        player, viewer, duplicate = _AuthConn('alice', 10), _AuthConn('alice', 10, True), _AuthConn('alice', 10)
+        results = [(await server.register(conn, ''))[0] for conn in (viewer, player, duplicate)]
+        presence = server.get_presence(10)
+
+        for conn in (viewer, player):
+            server.remove_player_conn(server._connections_to_players[conn])
+        return results, new_connections, presence, duplicate.sent
+
+    results, new_connections, presence, duplicate_sent = asyncio.run(run())
+
+    # the spectator neither blocks the player of the same name nor is taken for a duplicate of the player
+    assert results == [True, True, False]
+    assert [spectator for _, spectator in new_connections] == [True, False]
+    assert new_connections[0][0] != ('alice', 10)
+    assert new_connections[1][0] == ('alice', 10)
+    assert presence.connected == ['alice'] and presence.spectators == 1
+    assert duplicate_sent == [{"type": "AUTH_RESPONSE", "payload": {"ok": False, "latest_sequence": None}}]
+
+
+def test_server_auth_response_latest_sequence():
+    async def run():
+        async def on_new_conn(player_id, last_sequence, spectator):
+            return 7
+
+        server = Server(on_new_conn=on_new_conn)
+        conn = _AuthConn('alice', 10)
+        ok, _ = await server.register(conn, '')
+        await asyncio.sleep(0)
+
+        server.remove_player_conn(('alice', 10))
+        return ok, conn.sent
+
+    ok, sent = asyncio.run(run())
+
+    # the player is told where the events sent on connecting end
+    assert ok
+    assert sent[0] == {"type": "AUTH_RESPONSE", "payload": {"ok": True, "latest_sequence": 7}}